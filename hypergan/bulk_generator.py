@@ -0,0 +1,92 @@
+# Headless bulk sample generation
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from hypergan.gan_component import ValidationException
+from hypergan.inputs.image_pack import PackWriter
+from hypergan.samplers.sample_writer import write_image
+
+def to_pixels(images):
+    """ Maps generator output in [-1, 1] to uint8 pixels, the inverse of the input pipeline's scaling """
+    return np.clip((images + 1.) * 127.5 + .5, 0, 255).astype(np.uint8)
+
+def write_files(images, output, format, first):
+    for i, image in enumerate(to_pixels(images)):
+        write_image(np.squeeze(image, axis=-1) if image.shape[-1] == 1 else image, os.path.join(output, "%08d.%s" % (first + i, format)))
+
+class BulkGenerator:
+    """
+    BulkGenerator writes `count` generated images to `output`, either as individual image files
+    or, with `pack` set, as one `ImagePack` that `hypergan train` can read directly.
+
+    The generator runs a full batch per `session.run` on the calling thread while a pool of
+    `workers` threads converts, encodes and writes earlier batches (pack shards are copied in
+    order on the calling thread).  At most `2 * workers` batches are in flight.  With `seed`
+    set the latents are drawn from `numpy.random.RandomState(seed)`, so a run can be reproduced.
+    """
+    def __init__(self, gan, workers=4, report_every=10.):
+        self.gan = gan
+        self.workers = workers
+        self.report_every = report_every
+        self.z_t = getattr(gan.latent, "z", None)
+        if self.z_t is None:
+            self.z_t = gan.latent.sample
+        self.g_t = gan.generator.sample
+        self.batch_size = self.z_t.get_shape().as_list()[0] or gan.batch_size()
+
+    def latent_batches(self, seed):
+        random = np.random.RandomState(seed)
+        shape = [self.batch_size] + self.z_t.get_shape().as_list()[1:]
+        while True:
+            yield self.gan.latent.numpy_sample(shape, random)
+
+    def generate(self, count, output, format="png", seed=None, pack=False, shard_size=4096):
+        """ Returns images per second """
+        if count <= 0:
+            raise ValidationException("Nothing to generate, count must be positive")
+        output = os.path.expanduser(output)
+        os.makedirs(output, exist_ok=True)
+        if seed is None:
+            run = self.gan.session.make_callable(self.g_t)
+            latents = None
+        else:
+            run = self.gan.session.make_callable(self.g_t, feed_list=[self.z_t])
+            latents = self.latent_batches(seed)
+
+        writer = None
+        pending = []
+        written = 0
+        start = time.time()
+        last_report = start
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while written < count:
+                images = run(next(latents)) if latents is not None else run()
+                images = images[:count - written]
+                if pack:
+                    if writer is None:
+                        height, width, channels = images.shape[1:]
+                        writer = PackWriter(output, count, width, height, channels, shard_size=shard_size)
+                    pending.append(pool.submit(to_pixels, images))
+                else:
+                    pending.append(pool.submit(write_files, images, output, format, written))
+                written += len(images)
+                while len(pending) >= 2 * self.workers:
+                    self.finish(pending.pop(0), writer)
+                if time.time() - last_report > self.report_every:
+                    last_report = time.time()
+                    print("[generate] %d/%d images, %.1f images/sec" % (written, count, written / (last_report - start)))
+            for future in pending:
+                self.finish(future, writer)
+        if writer is not None:
+            writer.close(source="generated", seed=seed)
+        rate = count / max(time.time() - start, 1e-9)
+        print("[generate] Wrote %d images to %s, %.1f images/sec" % (count, output, rate))
+        return rate
+
+    def finish(self, future, writer):
+        # pack shards are written in order on this thread, the workers only convert to pixels
+        result = future.result()
+        if writer is not None:
+            writer.write(result)
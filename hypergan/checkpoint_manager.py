@@ -0,0 +1,112 @@
+# Saves checkpoints from a background thread
+import os
+import queue
+import threading
+import time
+import numpy as np
+import tensorflow as tf
+
+def latest_checkpoint(save_file):
+    """ Returns the newest of `save_file` and its rotated `save_file-<step>` checkpoints, or None """
+    save_file = os.path.expanduser(save_file)
+    candidates = []
+    if os.path.isfile(save_file + ".index"):
+        candidates.append(save_file)
+    for path in rotated_checkpoints(save_file):
+        if os.path.isfile(path + ".index"):
+            candidates.append(path)
+    if len(candidates) == 0:
+        return None
+    return max(candidates, key=lambda path: os.path.getmtime(path + ".index"))
+
+def rotated_checkpoints(save_file):
+    """ `save_file-<step>` checkpoints listed in the checkpoint state file, oldest first """
+    ckpt = tf.train.get_checkpoint_state(os.path.dirname(save_file))
+    if ckpt is None:
+        return []
+    prefix = os.path.basename(save_file) + "-"
+    return [path for path in ckpt.all_model_checkpoint_paths if os.path.basename(path).startswith(prefix)]
+
+class CheckpointManager:
+    """
+    CheckpointManager saves a GAN without stalling the training loop.
+
+    `save` copies every variable to host memory with a single `session.run` and returns.  A
+    background thread loads the copy into a shadow graph on the CPU and writes it with one
+    reused Saver, so training keeps updating the real variables while the checkpoint is written.
+
+    Checkpoints are written to `save_file-<step>` and only the newest `keep` are kept.  At most
+    one write is pending at a time; a save requested while a write is pending waits for it.
+    """
+    def __init__(self, gan, save_file, keep=5):
+        self.gan = gan
+        self.save_file = os.path.expanduser(save_file)
+        self.keep = keep
+        self.variables = sorted(gan.variables(), key=lambda v: v.op.name)
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            with tf.device("/cpu:0"):
+                self.shadows = [tf.Variable(tf.zeros(v.get_shape(), dtype=v.dtype.base_dtype), trainable=False, name=v.op.name) for v in self.variables]
+            self.saver = tf.train.Saver(dict([(v.op.name, s) for v, s in zip(self.variables, self.shadows)]), max_to_keep=keep, save_relative_paths=True)
+        self.session = tf.Session(graph=self.graph)
+        os.makedirs(os.path.dirname(self.save_file), exist_ok=True)
+        # continue rotating checkpoints left by earlier runs
+        self.saver.recover_last_checkpoints(rotated_checkpoints(self.save_file))
+
+        self.last_snapshot_seconds = None
+        self.last_write_seconds = None
+        self.last_path = None
+        self.error = None
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def save(self, wait=False):
+        """
+        Snapshots the variables and queues them for writing.  Returns False, without writing, if a
+        variable is NaN.  With `wait` the call returns after the checkpoint is on disk.
+        """
+        start = time.time()
+        values, step = self.gan.session.run([self.variables, self.gan.steps])
+        for variable, value in zip(self.variables, values):
+            if np.issubdtype(value.dtype, np.floating) and np.any(np.isnan(value)):
+                print("[Error] NAN detected in", variable.name, ".  Refusing to save")
+                return False
+        self.last_snapshot_seconds = time.time() - start
+        self.queue.put((step, values))
+        if wait:
+            self.wait()
+        return True
+
+    def wait(self):
+        """ Blocks until pending checkpoints are written """
+        self.queue.join()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self):
+        self.wait()
+        self.queue.put(None)
+        self.thread.join()
+        self.session.close()
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            step, values = item
+            try:
+                start = time.time()
+                for shadow, value in zip(self.shadows, values):
+                    shadow.load(value, self.session)
+                self.last_path = self.saver.save(self.session, self.save_file, global_step=step, write_meta_graph=False)
+                self.last_write_seconds = time.time() - start
+                print("[hypergan] Saved %s (blocked training %.0fms, wrote in %.2fs)" % (self.last_path, 1000.0 * self.last_snapshot_seconds, self.last_write_seconds))
+            except Exception as e:
+                print("[hypergan] Error writing checkpoint", e)
+                self.error = e
+            finally:
+                self.queue.task_done()
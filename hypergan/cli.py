@@ -11,12 +11,18 @@ from .inputs import *
 from .viewer import GlobalViewer
 from .configuration import Configuration
 import hypergan as hg
+import threading
 import time
 
 import os
 import shutil
 import sys
 
+from hypergan.bulk_generator import BulkGenerator
+from hypergan.checkpoint_manager import CheckpointManager
+from hypergan.samplers.sample_writer import SampleWriter
+from hypergan.server import GANServer, http_server, load_test
+from hypergan.inputs.image_pack import pack_directory
 from hypergan.losses.supervised_loss import SupervisedLoss
 from hypergan.multi_component import MultiComponent
 from time import sleep
@@ -42,6 +48,8 @@ class CLI:
 
         self.sampler_name = args.sampler
         self.sampler = None
+        self.checkpoints = None
+        self.writer = None
         self.validate()
         if self.args.save_file:
             self.save_file = self.args.save_file
@@ -70,7 +78,7 @@ class CLI:
 
         to create a video of the learning process.
         """
-        sample_file="samples/%s/%06d.png" % (self.config_name, self.samples)
+        sample_file="samples/%s/%06d.%s" % (self.config_name, self.samples, self.args.sample_format or "png")
         self.create_path(sample_file)
         self.lazy_create()
         sample_list = self.sampler.sample(sample_file, allow_save and self.args.save_samples)
@@ -86,6 +94,7 @@ class CLI:
             self.sampler = self.gan.sampler_for(self.sampler_name)(self.gan)
             if(self.sampler == None):
                 raise ValidationException("No sampler found by the name '"+self.sampler_name+"'")
+            self.sampler.writer = self.sample_writer()
 
     def step(self):
         bgan = self.gan
@@ -108,17 +117,53 @@ class CLI:
 
         self.steps+=1
 
+    def checkpoint_manager(self):
+        """ The CheckpointManager for the current gan, recreated when the gan is replaced """
+        if self.checkpoints is not None and self.checkpoints.gan is not self.gan:
+            self.checkpoints.close()
+            self.checkpoints = None
+        if self.checkpoints is None:
+            self.checkpoints = CheckpointManager(self.gan, self.save_file, keep=self.args.keep_checkpoints or 5)
+        return self.checkpoints
+
+    def save(self, wait=False):
+        if not self.checkpoint_manager().save(wait=wait):
+            exit()
+
     def create_path(self, filename):
         return os.makedirs(os.path.expanduser(os.path.dirname(filename)), exist_ok=True)
 
     def build(self):
-        return self.gan.build()
-    def serve(self, gan):
-        return gan_server(self.gan.session, config)
+        return self.gan.build(quantize=self.args.quantize)
+    def serve(self):
+        """ Serves the generator over HTTP (or a unix socket) until interrupted """
+        gan_server = GANServer(self.gan, max_wait=(self.args.max_wait or 2) / 1000.)
+        server = http_server(gan_server, host=self.args.host or "127.0.0.1", port=self.args.port or 8080, socket=self.args.socket)
+        print("[hypergan] Serving", self.config_name, "at", self.args.socket or "http://%s:%d" % server.server_address[:2], "batch size", gan_server.batch_size)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            if self.args.benchmark:
+                if self.args.socket:
+                    raise ValidationException("--benchmark needs a TCP port, not --socket")
+                url = "http://%s:%d" % server.server_address[:2]
+                print("[hypergan] Client", load_test(url, requests=self.args.benchmark, concurrency=self.args.concurrency or 8))
+                print("[hypergan] Server", gan_server.report())
+            else:
+                while True:
+                    time.sleep(60)
+                    print("[hypergan] Server", gan_server.report())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
+            gan_server.close()
 
     def sample_forever(self):
         while not self.gan.destroy:
             self.sample()
+            self.update_viewer()
             GlobalViewer.tick()
 
 
@@ -134,6 +179,7 @@ class CLI:
             i+=1
             start_time = time.time()
             self.step()
+            self.update_viewer()
             GlobalViewer.tick()
 
             if (self.args.save_every != None and
@@ -141,11 +187,39 @@ class CLI:
                 self.args.save_every > 0 and
                 i % self.args.save_every == 0):
                 print(" |= Saving network")
-                self.gan.save(self.save_file)
+                self.save()
             if self.args.ipython:
                 self.check_stdin()
             end_time = time.time()
 
+    def generate(self):
+        output = self.args.output or "generated/" + self.config_name
+        if self.args.pack:
+            output = self.args.output or output + ".pack"
+        generator = BulkGenerator(self.gan, workers=self.args.workers or 4)
+        return generator.generate(self.args.count or 1000, output, format=self.args.sample_format or "png", seed=self.args.seed, pack=self.args.pack)
+
+    def sample_writer(self):
+        """ The background SampleWriter, started on first use.  None with `--sample_queue 0` """
+        if self.writer is None and self.args.sample_queue != 0:
+            self.writer = SampleWriter(self.args.sample_queue or 4)
+        return self.writer
+
+    def update_viewer(self):
+        if self.writer is not None:
+            self.writer.update_viewer()
+
+    def close_trainer(self):
+        # trainers can hold worker processes
+        trainer = getattr(self.gan, "trainer", None)
+        if hasattr(trainer, "close"):
+            trainer.close()
+
+    def close_writer(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
     def check_stdin(self):
         try:
             input = sys.stdin.read()
@@ -168,6 +242,18 @@ class CLI:
 
         return
 
+    def pack(self):
+        size = [int(x) for x in (self.args.size or "64x64x3").split("x")] + [None, None, None]
+        return pack_directory(self.args.directory,
+                output=self.args.output,
+                channels=size[2] or 3,
+                format=self.args.format or 'png',
+                width=size[0] or 64,
+                height=size[1] or 64,
+                crop=self.args.crop,
+                resize=self.args.resize,
+                shard_size=self.args.shard_size or 4096)
+
     def add_supervised_loss(self):
         if self.args.classloss:
             print("[discriminator] Class loss is on.  Semi-supervised learning mode activated.")
@@ -178,6 +264,12 @@ class CLI:
             print("[discriminator] Class loss is off.  Unsupervised learning mode activated.")
 
     def run(self):
+        try:
+            self.run_method()
+        finally:
+            self.close_writer()
+
+    def run_method(self):
         if self.method == 'train':
             self.add_supervised_loss() # TODO I think this is broken now(after moving create out)
             self.gan.session.run(tf.global_variables_initializer())
@@ -186,8 +278,13 @@ class CLI:
                 print("Initializing new model")
             else:
                 print("Model loaded")
-            self.train()
-            self.gan.save(self.save_file)
+            try:
+                self.train()
+            finally:
+                self.close_trainer()
+            self.close_writer()
+            self.save(wait=True)
+            self.checkpoints.close()
             tf.reset_default_graph()
             self.gan.session.close()
         elif self.method == 'build':
@@ -196,8 +293,18 @@ class CLI:
             else:
                 print("Model loaded")
             self.build()
+        elif self.method == 'generate':
+            if not self.gan.load(self.save_file):
+                raise ValidationException("Could not load model: " + self.save_file)
+            self.generate()
+        elif self.method == 'serve':
+            if not self.gan.load(self.save_file):
+                raise ValidationException("Could not load model: " + self.save_file)
+            self.serve()
         elif self.method == 'new':
             self.new()
+        elif self.method == 'pack':
+            self.pack()
         elif self.method == 'sample':
             self.add_supervised_loss()
             if not self.gan.load(self.save_file):
@@ -7,6 +7,7 @@ import os
 import operator
 from functools import reduce
 
+from hypergan.layer_spec import layer_spec
 from hypergan.ops.tensorflow.extended_ops import bicubic_interp_2d
 from .gan_component import GANComponent
 
@@ -18,6 +19,7 @@ class ConfigurableComponent:
         self.layers = []
         self.skip_connections = skip_connections
         self.layer_options = {}
+        self.layer_variables = []
         self.layer_ops = {
             "activation": self.layer_activation,
             "adaptive_instance_norm": self.layer_adaptive_instance_norm,
@@ -93,22 +95,13 @@ class ConfigurableComponent:
         self.replace_controls=replace_controls
         config = self.config
 
+        net = self.ops.cast_compute(net)
         for layer in config.layers:
             net = self.parse_layer(net, layer)
             self.layers += [net]
 
-        return net
-
-    def parse_args(self, strs):
-        options = {}
-        args = []
-        for x in strs:
-            if '=' in x:
-                lhs, rhs = x.split('=', 1)
-                options[lhs]=self.gan.configurable_param(rhs)
-            else:
-                args.append(self.gan.configurable_param(x))
-        return args, options
+        print("number of params in component ", self.count_number_trainable_params(sum(self.layer_variables, [])))
+        return self.ops.cast_output(net)
 
     def parse_layer(self, net, layer):
         config = self.config
@@ -127,34 +120,26 @@ class ConfigurableComponent:
             return net
 
         else:
-            parens = re.findall('\(.*?\)',layer)
-            for i, paren in enumerate(parens):
-                layer = layer.replace(paren, "PAREN"+str(i))
-            d = layer.split(' ')
-            for i, _d in enumerate(d):
-                for j, paren in enumerate(parens):
-                    d[i] = d[i].replace("PAREN"+str(j), paren)
-            op = d[0]
-            args, options = self.parse_args(d[1:])
+            spec = layer_spec(layer, self.layer_ops)
+            args, options = spec.evaluate(self.gan)
         
-            net = self.build_layer(net, op, args, options)
+            net = self.build_layer(net, spec.op, args, options)
             return net
             
 
     def build_layer(self, net, op, args, options):
         if self.layer_ops[op]:
-            before = self.variables()
-            before_count = self.count_number_trainable_params()
+            # ops.weights and ops.biases only grow, so the layer's variables are the new tail of each
+            weights_before, biases_before = len(self.ops.weights), len(self.ops.biases)
             net = self.layer_ops[op](net, args, options)
             if 'name' in options:
                 self.set_layer(options['name'], net)
 
-            after = self.variables()
-            new = set(after) - set(before)
+            new = self.ops.biases[biases_before:] + self.ops.weights[weights_before:]
             for j in new:
                 self.layer_options[j]=options
-            after_count = self.count_number_trainable_params()
-            print("number of params in layer ", op, args, after_count-before_count)
+            self.layer_variables.append(new)
+            print("number of params in layer ", op, args, self.count_number_trainable_params(new))
         else:
             print("ConfigurableComponent: Op not defined", op)
 
@@ -166,9 +151,9 @@ class ConfigurableComponent:
         self.gan.named_layers[name] = net
         self.named_layers[name]     = net
 
-    def count_number_trainable_params(self):
+    def count_number_trainable_params(self, variables=None):
         '''
-        Counts the number of trainable variables.
+        Counts the number of trainable variables in `variables`, all of the component's variables by default.
         '''
         def get_nb_params_shape(shape):
             '''
@@ -180,8 +165,12 @@ class ConfigurableComponent:
                 nb_params = nb_params*int(dim)
             return nb_params
 
+        if variables is None:
+            variables = self.variables()
         tot_nb_params = 0
-        for trainable_variable in tf.trainable_variables():
+        for trainable_variable in set(variables):
+            if not getattr(trainable_variable, "trainable", True):
+                continue
             shape = trainable_variable.get_shape() # e.g [D,F] or [W,H,C]
             current_nb_params = get_nb_params_shape(shape)
             tot_nb_params = tot_nb_params + current_nb_params
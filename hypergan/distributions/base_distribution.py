@@ -1,4 +1,6 @@
-from hypergan.gan_component import GANComponent
+from hypergan.gan_component import GANComponent, ValidationException
 
 class BaseDistribution(GANComponent):
-    pass
+    def numpy_sample(self, shape, random=None):
+        """ Draws latent values of `shape` on the host, from `random` (a numpy.random.RandomState) when given """
+        raise ValidationException(self.__class__.__name__ + " cannot be sampled outside the graph")
@@ -30,7 +30,8 @@ class UniformDistribution(BaseDistribution):
         batch_size = self.gan.batch_size()
         if self.z is None:
             output_shape = self.output_shape or [batch_size, int(config.z)]
-            self.z = tf.random_uniform(output_shape, config.min or -1, config.max or 1, dtype=ops.dtype)
+            low, high = self.bounds()
+            self.z = tf.random_uniform(output_shape, low, high, dtype=ops.dtype)
 
         if 'projections' in config:
             for projection in config.projections:
@@ -40,6 +41,15 @@ class UniformDistribution(BaseDistribution):
         self.sample = tf.concat(axis=len(self.z.get_shape())-1, values=projections)
         return self.sample
 
+    def bounds(self):
+        """ The (min, max) range `z` is drawn from """
+        return self.config.min or -1, self.config.max or 1
+
+    def numpy_sample(self, shape, random=None):
+        """ Draws values for `z` of `shape` on the host, from `random` (a numpy.random.RandomState) when given """
+        low, high = self.bounds()
+        return (random or np.random).uniform(low, high, shape).astype(self.ops.dtype.as_numpy_dtype)
+
     def lookup(self, projection):
         if callable(projection):
             return projection
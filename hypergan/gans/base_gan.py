@@ -3,17 +3,21 @@ from hyperchamber import Config
 from hypergan.ops import TensorflowOps
 from hypergan.gan_component import ValidationException, GANComponent
 from hypergan.skip_connections import SkipConnections
+from hypergan.checkpoint_manager import latest_checkpoint
+from hypergan.restore_planner import RestorePlanner
+from hypergan.variable_roles import VariableRoles
 
 import re
 import os
+import time
 import inspect
 import hypergan as hg
 import tensorflow as tf
 import numpy as np
 
 from tensorflow.python.framework import ops
-from tensorflow.python.tools import freeze_graph
-from tensorflow.python.tools import optimize_for_inference_lib
+from hypergan.inference_graph import freeze_inference_graph, compare_latency, random_feed
+from hypergan.inputs.placeholder_input import PlaceholderInput
 
 from hypergan.samplers.static_batch_sampler import StaticBatchSampler
 from hypergan.samplers.progressive_sampler import ProgressiveSampler
@@ -32,11 +36,23 @@ from hypergan.samplers.segment_sampler import SegmentSampler
 from hypergan.samplers.y_sampler import YSampler
 from hypergan.samplers.gang_sampler import GangSampler
 
+def copy_config(config):
+    """ A deep copy of `config` as plain dicts and lists """
+    if isinstance(config, dict):
+        return dict([(k, copy_config(v)) for k, v in config.items()])
+    if isinstance(config, list):
+        return [copy_config(v) for v in config]
+    return config
+
 class BaseGAN(GANComponent):
     def __init__(self, config=None, inputs=None, device='/gpu:0', ops_config=None, ops_backend=TensorflowOps, graph=None,
-            batch_size=None, width=None, height=None, channels=None, debug=None, session=None, name="hypergan"):
-        """ Initialized a new GAN."""
+            batch_size=None, width=None, height=None, channels=None, debug=None, session=None, name="hypergan", inference=False):
+        """
+        Initialized a new GAN.  With `inference` set only the parts needed to sample are built, no
+        discriminator, loss or trainer.
+        """
         self.inputs = inputs
+        self.inference = inference
         self.device = device
         self.ops_backend = ops_backend
         self.ops_config = ops_config
@@ -56,6 +72,8 @@ class BaseGAN(GANComponent):
 
         if config == None:
             config = hg.Configuration.default()
+        # components write tensors into their config, keep a clean copy to build from again
+        self.source_config = copy_config(config)
 
         if debug and not isinstance(self.session, tf_debug.LocalCLIDebugWrapperSession):
             self.session = tf_debug.LocalCLIDebugWrapperSession(self.session)
@@ -191,10 +209,20 @@ class BaseGAN(GANComponent):
         return self.trainable_d_vars(), self.trainable_g_vars()
 
     def trainable_d_vars(self):
-        return list(set(self.d_vars()).intersection(tf.trainable_variables()))
+        return list(self.variable_roles().trainable_d_vars)
 
     def trainable_g_vars(self):
-        return list(set(self.g_vars()).intersection(tf.trainable_variables()))
+        return list(self.variable_roles().trainable_g_vars)
+
+    def variable_roles(self):
+        """ The cached VariableRoles index, rebuilt when components, variables or trainable variables are added """
+        key = (len(self.components),
+               sum([len(c.ops.weights) + len(c.ops.biases) for c in self.components if getattr(c, "ops", None) is not None]),
+               len(tf.get_collection_ref(tf.GraphKeys.TRAINABLE_VARIABLES)))
+        if getattr(self, "_variable_roles_key", None) != key:
+            self._variable_roles = VariableRoles(self)
+            self._variable_roles_key = key
+        return self._variable_roles
 
     def save(self, save_file):
         if(np.any(np.isnan(self.session.run(self.loss.d_fake)))):
@@ -204,77 +232,31 @@ class BaseGAN(GANComponent):
         with self.graph.as_default():
             print("[hypergan] Saving network to ", save_file)
             os.makedirs(os.path.expanduser(os.path.dirname(save_file)), exist_ok=True)
-            saver = tf.train.Saver(self.variables())
-            print("Saving " +str(len(self.variables()))+ " variables: ")
-            missing = set(tf.global_variables()) - set(self.variables())
-            missing = [ o for o in missing if "dontsave" not in o.name ]
-            if(len(missing) > 0):
-                print("[hypergan] Warning: Variables on graph but not saved:", missing)
-            saver.save(self.session, save_file)
+            if getattr(self, "_saver", None) is None:
+                self._saver = tf.train.Saver(self.variables())
+                print("Saving " +str(len(self.variables()))+ " variables: ")
+                missing = set(tf.global_variables()) - set(self.variables())
+                missing = [ o for o in missing if "dontsave" not in o.name ]
+                if(len(missing) > 0):
+                    print("[hypergan] Warning: Variables on graph but not saved:", missing)
+            self._saver.save(self.session, save_file)
 
 
     def load(self, save_file):
-        save_file = os.path.expanduser(save_file)
-        if os.path.isfile(save_file) or os.path.isfile(save_file + ".index" ):
-            print("[hypergan] |= Loading network from "+ save_file)
-            dir = os.path.dirname(save_file)
-            print("[hypergan] |= Loading checkpoint from "+ dir)
-            ckpt = tf.train.get_checkpoint_state(os.path.expanduser(dir))
-            if ckpt and ckpt.model_checkpoint_path:
-                self.optimistic_restore(self.session, save_file, self.variables())
-                return True
-            else:
-                return False
-        else:
+        """ Restores `save_file`, or the newest `save_file-<step>` written by a CheckpointManager """
+        save_file = latest_checkpoint(save_file)
+        if save_file is None:
             return False
+        print("[hypergan] |= Loading network from "+ save_file)
+        self.optimistic_restore(self.session, save_file, self.variables())
+        return True
 
     def optimistic_restore(self, session, save_file, variables):
-        reader = tf.train.NewCheckpointReader(save_file)
-        saved_shapes = reader.get_variable_to_shape_map()
-        var_names = sorted([(var.name, var.name.split(':')[0]) for var in variables
-                if var.name.split(':')[0] in saved_shapes])
-        restore_vars = []
-        post_restore_vars = []
-        name2var = dict(zip(map(lambda x:x.name.split(':')[0], variables), variables))
-        with tf.variable_scope('', reuse=True):
-            for var_name, saved_var_name in var_names:
-                curr_var = name2var[saved_var_name]
-                var_shape = curr_var.get_shape().as_list()
-                if saved_shapes[saved_var_name] is None:
-                    print(" (load) No variable found, weights discarded", saved_var_name)
-                if saved_shapes[saved_var_name] != var_shape:
-                    #print(" (load) Shapes do not match, weights discarded", saved_var_name, var_shape, " vs loaded ", saved_shapes[saved_var_name])
-                    print(" (load) Shapes do not match, extra reinitialized", saved_var_name, var_shape, " vs loaded ", saved_shapes[saved_var_name], curr_var)
-                    saved_var = tf.zeros(saved_shapes[saved_var_name])
-                    s1 = self.ops.shape(curr_var)
-                    s2 = saved_shapes[saved_var_name]
-                    new_var = saved_var
-
-                    for i, (_s1, _s2) in enumerate(zip(s1, s2)):
-                        if _s1 > _s2:
-                            s3 = self.ops.shape(new_var)
-                            ns = [i for i in s3]
-                            ns[i] = s1[i] - s2[i]
-
-                            curr_var_remainder = tf.slice(curr_var, [0 for i in s1], ns)
-                            new_var = tf.concat([new_var, curr_var_remainder], axis=i)
-
-                        elif _s2 > _s1:
-                            ns = [-1 for i in s1]
-                            ns[i] = _s1
-
-                            new_var = tf.slice(curr_var, [0 for i in s1], ns)
-
-                    post_restore_op = tf.assign(curr_var, new_var)
-                    post_restore_vars.append([post_restore_op, saved_var, reader.get_tensor(saved_var_name)])
-
-                if var_shape == saved_shapes[saved_var_name]:
-                    restore_vars.append(curr_var)
-        saver = tf.train.Saver(restore_vars)
-        saver.restore(session, save_file)
-
-        for op, var, val in post_restore_vars:
-            self.gan.session.run(op, {var: val})
+        planner = getattr(self, "_restore_planner", None)
+        if planner is None or set(planner.variables) != set(variables):
+            planner = RestorePlanner(variables)
+            self._restore_planner = planner
+        planner.restore(session, save_file)
 
     def variables(self):
         return list(set(self.ops.variables() + sum([c.variables() for c in self.components], []))) + [self.global_step, self.steps]
@@ -372,7 +354,29 @@ class BaseGAN(GANComponent):
     def exit(self):
         self.destroy = True
 
-    def build(self, input_nodes=None, output_nodes=None):
+    def rebuild_seconds(self, save_file):
+        """
+        Seconds to build this GAN from its configuration in a new graph, restore `save_file` and
+        run the output nodes once.  This is what loading the frozen graph (`frozen_startup`) replaces.
+        """
+        shape = self.inputs.x.get_shape().as_list()
+        start = time.time()
+        with tf.Graph().as_default():
+            inputs = PlaceholderInput(shape[0], width=shape[2], height=shape[1], channels=shape[3])
+            gan = self.__class__(config=hc.Config(copy_config(self.source_config)), inputs=inputs)
+            try:
+                if not gan.load(save_file):
+                    raise ValidationException("Could not load model: " + save_file)
+                gan.session.run(gan.output_nodes(), random_feed(gan.input_nodes(), shape[0]))
+            finally:
+                gan.session.close()
+        return time.time() - start
+
+    def build(self, input_nodes=None, output_nodes=None, quantize=False):
+        """
+        Writes to `builds/`: the full graph as `<name>.pbtxt`, a frozen inference graph for
+        `input_nodes` -> `output_nodes` as `<name>.pb` and a TFLite model.  Closes the session.
+        """
         if input_nodes is None:
             input_nodes = self.gan.input_nodes()
         if output_nodes is None:
@@ -383,8 +387,15 @@ class BaseGAN(GANComponent):
             return os.makedirs(os.path.expanduser(os.path.dirname(filename)), exist_ok=True)
         create_path(build_file)
         tf.train.write_graph(self.gan.session.graph, 'builds', save_file_text)
-        inputs = [x.name.split(":")[0] for x in input_nodes]
-        outputs = [x.name.split(":")[0] for x in output_nodes]
+        frozen_file = "builds/"+self.name+".pb"
+        graph_def = freeze_inference_graph(self.session, input_nodes, output_nodes, quantize=quantize)
+        with open(frozen_file, "wb") as f:
+            f.write(graph_def.SerializeToString())
+        print("[build] Frozen graph: %d nodes (full graph %d), %d bytes" % (len(graph_def.node), len(self.session.graph.as_graph_def().node), os.path.getsize(frozen_file)))
+        report = compare_latency(self.session, input_nodes, output_nodes, frozen_file, batch_size=self.batch_size())
+        if getattr(self, "save_file", None) is not None:
+            report["rebuild_startup"] = self.rebuild_seconds(self.save_file)
+        print("[build] " + ", ".join(["%s %.2fms" % (k, v * 1000) for k, v in sorted(report.items())]))
 
         with self.gan.session as sess:
             converter = tf.lite.TFLiteConverter.from_session(sess, self.gan.input_nodes(), self.gan.output_nodes())
@@ -398,7 +409,7 @@ class BaseGAN(GANComponent):
         self.gan.session.close()
         [print("Input: ", x) for x in self.gan.input_nodes()]
         [print("Output: ", y) for y in self.gan.output_nodes()]
-        print("Written to "+tflite_file)
+        print("Written to "+frozen_file+" and "+tflite_file)
 
 
     def get_registered_samplers(self=None):
@@ -38,6 +38,8 @@ class StandardGAN(BaseGAN):
     * discriminator
     * loss
     * trainer
+
+    The training components are not built with `inference=True`.
     """
     def __init__(self, *args, **kwargs):
         self.discriminator = None
@@ -75,6 +77,11 @@ class StandardGAN(BaseGAN):
             self.generator = self.create_component(config.generator, name="generator", input=z)
             self.autoencoded_x = self.generator.sample
 
+            if self.inference:
+                self.android_output = tf.reshape(self.generator.sample, [-1])
+                self.session.run(tf.global_variables_initializer())
+                return
+
             x, g = self.inputs.x, self.generator.sample
             if self.ops.shape(x) == self.ops.shape(g):
                 self.discriminator = self.create_component(config.discriminator, name="discriminator", input=tf.concat([x,g],axis=0))
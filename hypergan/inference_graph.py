@@ -0,0 +1,96 @@
+# Frozen inference graphs for deployment
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.python.tools import optimize_for_inference_lib
+
+try:
+    from tensorflow.tools.graph_transforms import TransformGraph
+except ImportError:
+    TransformGraph = None
+
+def node_name(tensor):
+    return tensor.name.split(":")[0]
+
+def freeze_inference_graph(session, input_nodes, output_nodes, quantize=False):
+    """
+    A GraphDef computing `output_nodes` from `input_nodes` with the variables of `session` folded
+    in as constants.
+
+    Everything the outputs do not depend on (optimizers, losses, the discriminator, the input
+    pipeline) is stripped and `input_nodes` become placeholders.  When graph transforms are
+    available constants are folded, and `quantize` stores weights as 8 bit.
+    """
+    inputs = [node_name(x) for x in input_nodes]
+    outputs = [node_name(y) for y in output_nodes]
+    graph_def = tf.graph_util.convert_variables_to_constants(session, session.graph.as_graph_def(), outputs)
+    graph_def = optimize_for_inference_lib.optimize_for_inference(graph_def, inputs, outputs,
+            [x.dtype.base_dtype.as_datatype_enum for x in input_nodes])
+    if TransformGraph is not None:
+        transforms = ["remove_nodes(op=Identity, op=CheckNumerics)", "fold_constants(ignore_errors=true)", "fold_batch_norms", "fold_old_batch_norms"]
+        if quantize:
+            transforms.append("quantize_weights")
+        transforms.append("strip_unused_nodes")
+        graph_def = TransformGraph(graph_def, inputs, outputs, transforms)
+    elif quantize:
+        print("[build] Warning: graph transforms are not available in this tensorflow, weights are not quantized")
+    return graph_def
+
+def load_inference_graph(path, input_names, output_names):
+    """ Imports a frozen graph written by `freeze_inference_graph`.  Returns (session, inputs, outputs) """
+    graph_def = tf.GraphDef()
+    with open(path, "rb") as f:
+        graph_def.ParseFromString(f.read())
+    graph = tf.Graph()
+    with graph.as_default():
+        tf.import_graph_def(graph_def, name="")
+    session = tf.Session(graph=graph)
+    inputs = [graph.get_tensor_by_name(name + ":0") for name in input_names]
+    outputs = [graph.get_tensor_by_name(name + ":0") for name in output_names]
+    return session, inputs, outputs
+
+def mean_latency(session, outputs, feed_dict, runs=20):
+    run = session.make_callable(outputs, feed_list=list(feed_dict.keys()))
+    values = list(feed_dict.values())
+    run(*values)
+    start = time.time()
+    for i in range(runs):
+        run(*values)
+    return (time.time() - start) / runs
+
+def random_feed(input_nodes, batch_size=1):
+    """
+    Uniform [-1, 1] values for `input_nodes`.  An unknown batch dimension is `batch_size`, inputs
+    with other unknown dimensions are left out.
+    """
+    feed_dict = {}
+    for x in input_nodes:
+        shape = x.get_shape()
+        if shape.dims is None:
+            print("[build] Warning: not feeding", x.name, "of unknown shape")
+            continue
+        shape = shape.as_list()
+        if len(shape) > 0 and shape[0] is None:
+            shape[0] = batch_size
+        if None in shape:
+            print("[build] Warning: not feeding", x.name, "of unknown shape", shape)
+            continue
+        feed_dict[x] = np.random.uniform(-1, 1, shape).astype(x.dtype.base_dtype.as_numpy_dtype)
+    return feed_dict
+
+def compare_latency(session, input_nodes, output_nodes, path, runs=20, batch_size=1):
+    """
+    Times loading the frozen graph at `path` and running it against running the same nodes in
+    the full `session`.  Returns a dict of seconds.
+    """
+    feed_dict = random_feed(input_nodes, batch_size)
+    feed_values = list(feed_dict.values())
+
+    start = time.time()
+    frozen_session, frozen_inputs, frozen_outputs = load_inference_graph(path, [node_name(x) for x in feed_dict], [node_name(y) for y in output_nodes])
+    frozen_session.run(frozen_outputs, dict(zip(frozen_inputs, feed_values)))
+    report = {"frozen_startup": time.time() - start}
+    report["frozen_latency"] = mean_latency(frozen_session, frozen_outputs, dict(zip(frozen_inputs, feed_values)), runs)
+    report["session_latency"] = mean_latency(session, output_nodes, feed_dict, runs)
+    frozen_session.close()
+    return report
@@ -1,50 +1,153 @@
 # Loads an image with the tensorflow input pipeline
 import glob
+import io
 import os
+import numpy as np
 import tensorflow as tf
+from PIL import Image
 import hypergan.inputs.resize_image_patch
 from tensorflow.python.ops import array_ops
 from natsort import natsorted, ns
 from hypergan.gan_component import ValidationException, GANComponent
+from hypergan.inputs.image_pack import ImagePack, is_pack
+from hypergan.inputs.input_wait_timer import InputWaitTimer
+from hypergan.inputs.manifest import Manifest, IMAGE_EXTENSIONS
+
+AUTOTUNE = tf.data.experimental.AUTOTUNE
+
+def image_dataset(filenames, parse_function, batch_size, sequential=False, parallel_calls=None, prefetch=None, shuffle_buffer=None, interleave=None):
+    """
+    The batched, repeating filename pipeline shared by the image loaders.
+
+    `parallel_calls` and `prefetch` autotune when not set.  `shuffle_buffer` defaults to the number of files.
+    `interleave` reads from that many files at once, decoding `parallel_calls` of them in parallel, and
+    unless `sequential` lets them arrive out of order.
+    """
+    dataset = tf.data.Dataset.from_tensor_slices(tf.convert_to_tensor(filenames, dtype=tf.string))
+    if not sequential:
+        print("Shuffling data")
+        dataset = dataset.shuffle(shuffle_buffer or len(filenames))
+    if interleave:
+        def _parse_one(filename):
+            return tf.data.Dataset.from_tensors(filename).map(parse_function)
+        dataset = dataset.interleave(_parse_one, cycle_length=interleave, num_parallel_calls=parallel_calls or AUTOTUNE)
+        if not sequential and hasattr(tf.data, "Options"):
+            options = tf.data.Options()
+            options.experimental_deterministic = False
+            dataset = dataset.with_options(options)
+    else:
+        dataset = dataset.map(parse_function, num_parallel_calls=parallel_calls or AUTOTUNE)
+    dataset = dataset.batch(batch_size, drop_remainder=True)
+    dataset = dataset.repeat()
+    dataset = dataset.prefetch(prefetch or AUTOTUNE)
+    return dataset
+
+def parse_formats(format):
+    """
+    `format` is an extension, a comma separated list of extensions or `all`.  Returns a list of extensions.
+    """
+    if isinstance(format, str):
+        if format == 'all':
+            return IMAGE_EXTENSIONS
+        format = format.split(",")
+    formats = [f.strip() for f in format]
+    for f in formats:
+        if f.lower() not in IMAGE_EXTENSIONS:
+            raise ValidationException("[loader] Failed to load format " + f + ".  Supported formats are " + ",".join(IMAGE_EXTENSIONS))
+    return formats
+
+def decode_any(image_string, filename, formats, channels):
+    """
+    Decodes a uint8 `[height, width, channels]` image, choosing a decoder from the extension of `filename`.
+
+    jpg, png and gif (first frame) decode in graph.  bmp and webp are decoded with PIL.
+    """
+    def _decode_jpeg():
+        return tf.image.decode_jpeg(image_string, channels=channels)
+
+    def _decode_png():
+        return tf.image.decode_png(image_string, channels=channels)
+
+    def _decode_gif():
+        image = tf.image.decode_gif(image_string)[0]
+        if channels == 1:
+            image = tf.image.rgb_to_grayscale(image)
+        elif channels == 4:
+            image = tf.concat([image, tf.fill(tf.concat([tf.shape(image)[:2], [1]], axis=0), tf.constant(255, dtype=tf.uint8))], axis=2)
+        return image
+
+    def _decode_pil():
+        mode = {1: 'L', 3: 'RGB', 4: 'RGBA'}[channels]
+        def _decode(data):
+            image = np.array(Image.open(io.BytesIO(data)).convert(mode), dtype=np.uint8)
+            return np.reshape(image, image.shape[:2] + (channels,))
+        image = tf.py_func(_decode, [image_string], tf.uint8, stateful=False)
+        image.set_shape([None, None, channels])
+        return image
+
+    decoders = {
+        'jpg': _decode_jpeg,
+        'jpeg': _decode_jpeg,
+        'png': _decode_png,
+        'gif': _decode_gif,
+        'bmp': _decode_pil,
+        'webp': _decode_pil
+    }
+    extensions = sorted(set([f.lower() for f in formats]))
+    if len(extensions) == 1:
+        return decoders[extensions[0]]()
+    cases = [(tf.strings.regex_full_match(filename, "(?i).*\\."+ext), decoders[ext]) for ext in extensions[1:]]
+    return tf.case(cases, default=decoders[extensions[0]], exclusive=True)
+
+def get_next(iterator, input_stats=False, name="loader"):
+    """ `iterator.get_next()`, timed by an `InputWaitTimer` when `input_stats` is set.  Returns (tensor, timer or None) """
+    if input_stats:
+        timer = InputWaitTimer(name)
+        return timer.get_next(iterator), timer
+    return iterator.get_next(), None
 
 class ImageLoader:
     """
     ImageLoader loads a set of images into a tensorflow input pipeline.
+
+    `directory` can also be an image pack written by `hypergan pack`, in which case images
+    are streamed from the pack without decoding.
     """
 
     def __init__(self, batch_size):
         self.batch_size = batch_size
 
-    def create(self, directory, channels=3, format='jpg', width=64, height=64, crop=False, resize=False, sequential=False):
+    def find_files(self, directory, format, manifest=True):
+        formats = parse_formats(format)
+        if manifest:
+            return Manifest(directory).dataset_files(formats)
+
         directories = glob.glob(directory+"/*")
         directories = [d for d in directories if os.path.isdir(d)]
 
         if(len(directories) == 0):
-            directories = [directory] 
+            directories = [directory]
 
         # Create a queue that produces the filenames to read.
         if(len(directories) == 1):
             # No subdirectories, use all the images in the passed in path
-            filenames = glob.glob(directory+"/*."+format)
+            filenames = sum([glob.glob(directory+"/*."+f) for f in formats], [])
         else:
-            filenames = glob.glob(directory+"/**/*."+format)
-
-        filenames = natsorted(filenames)
+            filenames = sum([glob.glob(directory+"/**/*."+f) for f in formats], [])
 
-        print("[loader] ImageLoader found", len(filenames))
-        self.file_count = len(filenames)
-        if self.file_count == 0:
-            raise ValidationException("No images found in '" + directory + "'")
-        filenames = tf.convert_to_tensor(filenames, dtype=tf.string)
+        return natsorted(filenames)
 
+    def image_parser(self, channels=3, format='jpg', width=64, height=64, crop=False, resize=False):
+        """ Returns a function from filename to a float32 `[height, width, channels]` image in [0, 255] """
+        formats = parse_formats(format)
         def parse_function(filename):
             image_string = tf.read_file(filename)
-            if format == 'jpg':
+            if formats == ['jpg']:
                 image = tf.image.decode_jpeg(image_string, channels=channels)
-            elif format == 'png':
+            elif formats == ['png']:
                 image = tf.image.decode_png(image_string, channels=channels)
             else:
-                print("[loader] Failed to load format", format)
+                image = decode_any(image_string, filename, formats, channels)
             image = tf.cast(image, tf.float32)
             # Image processing for evaluation.
             # Crop the central [height, width] of the image.
@@ -53,25 +156,61 @@ class ImageLoader:
             elif resize:
                 image = tf.image.resize_images(image, [height, width], 1)
 
-            image = image / 127.5 - 1.
             tf.Tensor.set_shape(image, [height,width,channels])
 
             return image
+        return parse_function
+
+    def create(self, directory, channels=3, format='jpg', width=64, height=64, crop=False, resize=False, sequential=False,
+            parallel_calls=None, prefetch=None, shuffle_buffer=None, interleave=None, input_stats=False, manifest=True):
+        if is_pack(directory):
+            return self.create_from_pack(directory, channels=channels, width=width, height=height, sequential=sequential, prefetch=prefetch, input_stats=input_stats)
+
+        if not os.path.isdir(os.path.expanduser(directory)):
+            raise ValidationException("No images found in '" + directory + "'")
+        filenames = self.find_files(directory, format, manifest=manifest)
+
+        print("[loader] ImageLoader found", len(filenames))
+        self.file_count = len(filenames)
+        if self.file_count == 0:
+            raise ValidationException("No images found in '" + directory + "'")
+
+        load_image = self.image_parser(channels=channels, format=format, width=width, height=height, crop=crop, resize=resize)
+        def parse_function(filename):
+            return load_image(filename) / 127.5 - 1.
 
         # Generate a batch of images and labels by building up a queue of examples.
-        dataset = tf.data.Dataset.from_tensor_slices(filenames)
-        if not sequential:
-            print("Shuffling data")
-            dataset = dataset.shuffle(self.file_count)
-        dataset = dataset.map(parse_function, num_parallel_calls=4)
-        dataset = dataset.batch(self.batch_size, drop_remainder=True)
-        dataset = dataset.repeat()
-        dataset = dataset.prefetch(1)
+        self.dataset = image_dataset(filenames, parse_function, self.batch_size, sequential=sequential,
+                parallel_calls=parallel_calls, prefetch=prefetch, shuffle_buffer=shuffle_buffer, interleave=interleave)
+
+        self.iterator = self.dataset.make_one_shot_iterator()
+        x, self.input_wait = get_next(self.iterator, input_stats)
+        self.x = tf.reshape(x, [self.batch_size, height, width, channels])
+
+    def create_from_pack(self, directory, channels=3, width=64, height=64, sequential=False, prefetch=None, input_stats=False):
+        pack = ImagePack(directory)
+        if pack.shape() != [height, width, channels]:
+            raise ValidationException("Image pack '" + directory + "' is " + "x".join([str(x) for x in [pack.width, pack.height, pack.channels]]) + ", expected " + "x".join([str(x) for x in [width, height, channels]]))
+
+        print("[loader] ImageLoader found pack with", pack.count)
+        self.pack = pack
+        self.file_count = pack.count
+        if self.file_count < self.batch_size:
+            raise ValidationException("Not enough images in '" + directory + "' for a batch")
+
+        def batches():
+            return pack.batches(self.batch_size, shuffle=not sequential)
+
+        shape = [self.batch_size, height, width, channels]
+        dataset = tf.data.Dataset.from_generator(batches, tf.uint8, tf.TensorShape(shape))
+        dataset = dataset.map(lambda x: tf.cast(x, tf.float32) / 127.5 - 1.)
+        dataset = dataset.prefetch(prefetch or AUTOTUNE)
 
         self.dataset = dataset
 
         self.iterator = self.dataset.make_one_shot_iterator()
-        self.x = tf.reshape( self.iterator.get_next(), [self.batch_size, height, width, channels])
+        x, self.input_wait = get_next(self.iterator, input_stats)
+        self.x = tf.reshape(x, shape)
 
     def inputs(self):
         return [self.x,self.x]
@@ -0,0 +1,153 @@
+# A decoded, pre-resized image dataset stored as memory mapped uint8 shards
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from hypergan.gan_component import ValidationException
+
+class ImagePack:
+    """
+    ImagePack reads a directory written by `pack_directory`.
+
+    A pack is an `index.json` and a list of `shard-NNNNN.npy` files.  Each shard is a
+    `[count, height, width, channels]` uint8 array that is opened with `mmap_mode='r'`, so
+    reading a batch costs a memory copy instead of a file read and image decode.
+    """
+    INDEX = "index.json"
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        if not is_pack(self.path):
+            raise ValidationException("No image pack found in '" + path + "'")
+        with open(os.path.join(self.path, ImagePack.INDEX)) as f:
+            self.index = json.load(f)
+        self.width = self.index["width"]
+        self.height = self.index["height"]
+        self.channels = self.index["channels"]
+        self.count = self.index["count"]
+        self.shard_size = self.index["shard_size"]
+        self.shards = [np.load(os.path.join(self.path, shard["file"]), mmap_mode='r') for shard in self.index["shards"]]
+
+    def shape(self):
+        return [self.height, self.width, self.channels]
+
+    def gather(self, indices):
+        """ Returns the uint8 images at `indices` as one `[len(indices), height, width, channels]` array """
+        out = np.empty([len(indices)] + self.shape(), dtype=np.uint8)
+        indices = np.asarray(indices)
+        shard_ids = indices // self.shard_size
+        for shard_id in np.unique(shard_ids):
+            positions = np.where(shard_ids == shard_id)[0]
+            offsets = indices[positions] - shard_id * self.shard_size
+            # sorted reads keep the access pattern sequential within a shard
+            order = np.argsort(offsets)
+            out[positions[order]] = self.shards[shard_id][offsets[order]]
+        return out
+
+    def batches(self, batch_size, shuffle=True):
+        """ Yields uint8 batches forever.  Remainders are dropped, matching `drop_remainder=True` """
+        while True:
+            if shuffle:
+                order = np.random.permutation(self.count)
+            else:
+                order = np.arange(self.count)
+            for i in range(0, self.count - batch_size + 1, batch_size):
+                yield self.gather(order[i:i+batch_size])
+
+class PackWriter:
+    """
+    Writes `count` uint8 `[height, width, channels]` images as an `ImagePack` in `output`.
+    Call `write` with batches of images, then `close` to write the index.
+    """
+    def __init__(self, output, count, width, height, channels, shard_size=4096):
+        self.output = output
+        self.count = count
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.shard_size = shard_size
+        self.shards = []
+        self.shard = None
+        self.written = 0
+        os.makedirs(output, exist_ok=True)
+
+    def write(self, images):
+        images = np.asarray(images)
+        i = 0
+        while i < len(images):
+            offset = self.written % self.shard_size
+            if offset == 0:
+                self.next_shard()
+            n = min(len(images) - i, self.shard_size - offset, self.count - self.written)
+            if n <= 0:
+                raise ValidationException("PackWriter was given more than " + str(self.count) + " images")
+            self.shard[offset:offset+n] = images[i:i+n]
+            self.written += n
+            i += n
+
+    def next_shard(self):
+        if self.shard is not None:
+            self.shard.flush()
+        count = min(self.shard_size, self.count - self.written)
+        shard_file = "shard-%05d.npy" % len(self.shards)
+        self.shard = np.lib.format.open_memmap(os.path.join(self.output, shard_file), mode='w+', dtype=np.uint8, shape=(count, self.height, self.width, self.channels))
+        self.shards.append({"file": shard_file, "count": count})
+
+    def close(self, **index):
+        """ Flushes the last shard and writes `index.json`, with `index` as extra fields """
+        if self.shard is not None:
+            self.shard.flush()
+            self.shard = None
+        index.update({
+            "width": self.width,
+            "height": self.height,
+            "channels": self.channels,
+            "count": self.written,
+            "shard_size": self.shard_size,
+            "shards": self.shards
+        })
+        with open(os.path.join(self.output, ImagePack.INDEX), "w") as f:
+            json.dump(index, f, indent=2)
+
+def is_pack(path):
+    return os.path.isfile(os.path.join(os.path.expanduser(path), ImagePack.INDEX))
+
+def default_pack_path(directory, width, height, channels):
+    return os.path.normpath(os.path.expanduser(directory)) + "-%dx%dx%d.pack" % (width, height, channels)
+
+def pack_directory(directory, output=None, channels=3, format='jpg', width=64, height=64, crop=False, resize=False, shard_size=4096, batch_size=256):
+    """
+    Decodes, crops/resizes every image in `directory` once and writes the result as an `ImagePack`.
+
+    Images are processed exactly as `ImageLoader` would, so training on the pack matches
+    training on the directory.  Returns the output path.
+    """
+    from hypergan.inputs.image_loader import ImageLoader
+
+    output = output or default_pack_path(directory, width, height, channels)
+    loader = ImageLoader(batch_size)
+    filenames = loader.find_files(directory, format)
+    if len(filenames) == 0:
+        raise ValidationException("No images found in '" + directory + "'")
+    parse_function = loader.image_parser(channels=channels, format=format, width=width, height=height, crop=crop, resize=resize)
+
+    writer = PackWriter(output, len(filenames), width, height, channels, shard_size=shard_size)
+    print("[pack] Packing", len(filenames), "images from", directory, "to", output)
+    with tf.Graph().as_default():
+        dataset = tf.data.Dataset.from_tensor_slices(tf.convert_to_tensor(filenames, dtype=tf.string))
+        dataset = dataset.map(lambda f: tf.cast(parse_function(f), tf.uint8), num_parallel_calls=tf.data.experimental.AUTOTUNE)
+        dataset = dataset.batch(batch_size)
+        dataset = dataset.prefetch(2)
+        next_batch = dataset.make_one_shot_iterator().get_next()
+
+        with tf.Session() as sess:
+            while True:
+                try:
+                    images = sess.run(next_batch)
+                except tf.errors.OutOfRangeError:
+                    break
+                writer.write(images)
+
+    writer.close(source=os.path.abspath(os.path.expanduser(directory)), format=format, crop=crop, resize=resize)
+    print("[pack] Wrote", writer.written, "images in", len(writer.shards), "shards")
+    return output
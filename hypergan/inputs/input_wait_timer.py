@@ -0,0 +1,50 @@
+import time
+import numpy as np
+import tensorflow as tf
+
+class InputWaitTimer:
+    """
+    Measures how long each session.run blocks on `iterator.get_next()`.
+
+    A high wait time means the trainer is starved by the input pipeline.  Averages are
+    printed every `report_every` steps.
+    """
+    def __init__(self, name="loader", report_every=100):
+        self.name = name
+        self.report_every = report_every
+        self.last = 0.0
+        self.total = 0.0
+        self.count = 0
+        self._start = None
+        self._window = 0.0
+
+    def get_next(self, iterator):
+        """ Calls `iterator.get_next()` wrapped in timing ops """
+        def _start():
+            self._start = time.time()
+            return np.int32(0)
+
+        def _stop(shape):
+            self.record(time.time() - self._start)
+            return shape
+
+        start = tf.py_func(_start, [], tf.int32, stateful=True)
+        with tf.control_dependencies([start]):
+            x = iterator.get_next()
+        stop = tf.py_func(_stop, [tf.shape(x)], tf.int32, stateful=True)
+        with tf.control_dependencies([stop]):
+            return tf.identity(x)
+
+    def record(self, seconds):
+        self.last = seconds
+        self.total += seconds
+        self.count += 1
+        self._window += seconds
+        if self.report_every and self.count % self.report_every == 0:
+            print("[%s] waited on input %.2fms/step (last %d steps)" % (self.name, 1000.0 * self._window / self.report_every, self.report_every))
+            self._window = 0.0
+
+    def mean(self):
+        if self.count == 0:
+            return 0.0
+        return self.total / self.count
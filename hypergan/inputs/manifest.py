@@ -0,0 +1,147 @@
+# A persisted file listing for large image directories
+import hashlib
+import json
+import os
+import time
+from natsort import natsorted
+from PIL import Image
+
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'webp', 'bmp', 'gif']
+
+def manifest_path(directory):
+    """ The manifest file for `directory`, in a cache directory when `directory` is not writable """
+    directory = os.path.abspath(os.path.expanduser(directory))
+    if os.access(directory, os.W_OK):
+        return os.path.join(directory, Manifest.FILENAME)
+    cache = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "hypergan", "manifests")
+    return os.path.join(cache, hashlib.sha1(directory.encode("utf-8")).hexdigest() + ".json")
+
+class Manifest:
+    """
+    Manifest caches the image files (size, mtime, width, height) of a dataset directory and
+    its immediate subdirectories in `.hypergan-manifest.json`.  When the dataset directory is
+    not writable the manifest is kept under `~/.cache/hypergan/manifests` instead.
+
+    On later runs only directories whose mtime changed are listed again.  Every cached file is
+    still stat'd, so files rewritten in place are noticed, but only new or modified files have
+    their dimensions read.
+    """
+    FILENAME = ".hypergan-manifest.json"
+    VERSION = 1
+
+    # Directories modified this recently are rescanned next time, mtimes can be coarse
+    SETTLE_SECONDS = 2
+
+    def __init__(self, directory, read_dimensions=True):
+        self.directory = directory
+        self.path = manifest_path(directory)
+        self.read_dimensions = read_dimensions
+        self.directories = {}
+        self.scanned = {}
+        self.changed = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            return
+        if manifest.get("version") == Manifest.VERSION:
+            self.directories = manifest["directories"]
+
+    def save(self):
+        if not self.changed:
+            return
+        tmp = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, "w") as f:
+                json.dump({"version": Manifest.VERSION, "directories": self.scanned}, f)
+            os.replace(tmp, self.path)
+        except (IOError, OSError) as e:
+            print("[loader] Warning: could not write manifest", self.path, e)
+        self.changed = False
+
+    def scan(self, relpath=""):
+        """ Returns the cached listing of `relpath`, listing the directory again only if it changed """
+        if relpath in self.scanned:
+            return self.scanned[relpath]
+        path = os.path.join(os.path.expanduser(self.directory), relpath)
+        mtime = os.stat(path).st_mtime
+        cached = self.directories.get(relpath)
+        if cached is not None and cached["mtime"] == mtime:
+            self.scanned[relpath] = self.refresh(path, cached)
+            return self.scanned[relpath]
+
+        old_files = (cached or {}).get("files", {})
+        files = {}
+        subdirectories = []
+        for entry in os.scandir(path):
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                subdirectories.append(entry.name)
+                continue
+            if entry.name.split('.')[-1].lower() not in IMAGE_EXTENSIONS or not entry.is_file():
+                continue
+            stat = entry.stat()
+            old = old_files.get(entry.name)
+            if old is not None and old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+                files[entry.name] = old
+            else:
+                files[entry.name] = self.describe(entry.path, stat)
+
+        if time.time() - mtime < Manifest.SETTLE_SECONDS:
+            mtime = None
+        listing = {"mtime": mtime, "subdirectories": natsorted(subdirectories), "files": files}
+        self.scanned[relpath] = listing
+        self.changed = True
+        return listing
+
+    def refresh(self, path, listing):
+        """ `listing` of an unchanged directory, with the files rewritten in place described again """
+        files = {}
+        for name, old in listing["files"].items():
+            try:
+                stat = os.stat(os.path.join(path, name))
+            except OSError:
+                self.changed = True
+                continue
+            if old["size"] == stat.st_size and old["mtime"] == stat.st_mtime:
+                files[name] = old
+            else:
+                files[name] = self.describe(os.path.join(path, name), stat)
+                self.changed = True
+        return dict(listing, files=files)
+
+    def describe(self, path, stat):
+        width, height = None, None
+        if self.read_dimensions:
+            try:
+                with Image.open(path) as image:
+                    width, height = image.size
+            except (IOError, OSError):
+                pass
+        return {"size": stat.st_size, "mtime": stat.st_mtime, "width": width, "height": height}
+
+    def files(self, formats, relpath=""):
+        """ Files in `relpath` with one of the `formats` extensions, as glob would return them """
+        if isinstance(formats, str):
+            formats = [formats]
+        listing = self.scan(relpath)
+        base = self.directory if relpath == "" else os.path.join(self.directory, relpath)
+        return [base + "/" + name for name in listing["files"] if name.split('.')[-1] in formats]
+
+    def dataset_files(self, formats):
+        """
+        Lists the dataset the same way `ImageLoader` always has: images in the directory itself,
+        or images one level down when there are class subdirectories.
+        """
+        subdirectories = self.scan()["subdirectories"]
+        if len(subdirectories) <= 1:
+            filenames = self.files(formats)
+        else:
+            filenames = sum([self.files(formats, subdirectory) for subdirectory in subdirectories], [])
+        self.save()
+        return natsorted(filenames)
@@ -6,6 +6,8 @@ from natsort import natsorted, ns
 import hypergan.inputs.resize_image_patch
 from tensorflow.python.ops import array_ops
 from hypergan.gan_component import ValidationException, GANComponent
+from hypergan.inputs.image_loader import ImageLoader, image_dataset, get_next, parse_formats
+from hypergan.inputs.manifest import Manifest
 
 class MultiImageLoader:
     """
@@ -17,46 +19,35 @@ class MultiImageLoader:
         self.batch_size = batch_size
 
 
-    def create(self, directories, channels=3, format='jpg', width=64, height=64, crop=False, resize=False, sequential=False):
-        filenames_list = [natsorted(glob.glob(directory+"/*."+format)) for directory in directories]
+    def find_files(self, directory, format, manifest=True):
+        formats = parse_formats(format)
+        if manifest:
+            manifest = Manifest(directory)
+            filenames = manifest.files(formats)
+            manifest.save()
+            return natsorted(filenames)
+        return natsorted(sum([glob.glob(directory+"/*."+f) for f in formats], []))
+
+    def create(self, directories, channels=3, format='jpg', width=64, height=64, crop=False, resize=False, sequential=False,
+            parallel_calls=None, prefetch=None, shuffle_buffer=None, interleave=None, input_stats=False, manifest=True):
+        filenames_list = [self.find_files(directory, format, manifest) for directory in directories]
 
         imgs = []
 
         self.datasets = []
+        self.input_waits = []
+        load_image = ImageLoader(self.batch_size).image_parser(channels=channels, format=format, width=width, height=height, crop=crop, resize=resize)
         def parse_function(filename):
-            image_string = tf.read_file(filename)
-            if format == 'jpg':
-                image = tf.image.decode_jpeg(image_string, channels=channels)
-            elif format == 'png':
-                image = tf.image.decode_png(image_string, channels=channels)
-            else:
-                print("[loader] Failed to load format", format)
-            image = tf.cast(image, tf.float32)
-            # Image processing for evaluation.
-            # Crop the central [height, width] of the image.
-            if crop:
-                image = hypergan.inputs.resize_image_patch.resize_image_with_crop_or_pad(image, height, width, dynamic_shape=True)
-            elif resize:
-                image = tf.image.resize_images(image, [height, width], 1)
-
-            image = image / 127.5 - 1.
-            tf.Tensor.set_shape(image, [height,width,channels])
-            return image
+            return load_image(filename) / 127.5 - 1.
 
-        for filenames in filenames_list:
+        for i, filenames in enumerate(filenames_list):
             self.file_count = len(filenames)
-            filenames = tf.convert_to_tensor(filenames, dtype=tf.string)
-
-            dataset = tf.data.Dataset.from_tensor_slices(filenames)
-            if not sequential:
-                print("Shuffling data")
-                dataset = dataset.shuffle(self.file_count)
-            dataset = dataset.map(parse_function, num_parallel_calls=4)
-            dataset = dataset.batch(self.batch_size, drop_remainder=True)
-            dataset = dataset.repeat()
-            dataset = dataset.prefetch(1)
+            dataset = image_dataset(filenames, parse_function, self.batch_size, sequential=sequential,
+                    parallel_calls=parallel_calls, prefetch=prefetch, shuffle_buffer=shuffle_buffer, interleave=interleave)
             shape = [self.batch_size, height, width, channels]
-            self.datasets.append(tf.reshape(dataset.make_one_shot_iterator().get_next(), shape))
+            x, input_wait = get_next(dataset.make_one_shot_iterator(), input_stats, name="loader "+str(i))
+            self.input_waits.append(input_wait)
+            self.datasets.append(tf.reshape(x, shape))
 
         self.xs = self.datasets
         self.xa = self.datasets[0]
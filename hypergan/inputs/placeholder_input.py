@@ -0,0 +1,14 @@
+import tensorflow as tf
+
+class PlaceholderInput:
+    """
+    PlaceholderInput stands in for a dataset when only the generator is used, such as with
+    `hypergan serve`.  `x` is a placeholder that defaults to zeros of the given shape.
+    """
+    def __init__(self, batch_size, width=64, height=64, channels=3):
+        self.batch_size = batch_size
+        shape = [batch_size, height, width, channels]
+        self.x = tf.placeholder_with_default(tf.zeros(shape), shape, name="x")
+
+    def inputs(self):
+        return [self.x,self.x]
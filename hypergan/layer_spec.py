@@ -0,0 +1,78 @@
+# Parses configuration layer strings such as "conv 64 stride=2 activation=null" once
+import re
+from collections import namedtuple
+from hypergan.gan_component import ValidationException
+
+INT = re.compile(r"^\d+$")
+FLOAT = re.compile(r"^\d+?\.\d+?$")
+PARENS = re.compile(r"\(.*?\)")
+
+class ParamExpression(namedtuple('ParamExpression', ['source'])):
+    """ A value such as `decay(range=1:0 steps=1000)`, evaluated with `BaseGAN.configurable_param` on every build """
+    pass
+
+class LayerSpec(namedtuple('LayerSpec', ['source', 'op', 'args', 'options'])):
+    """
+    A parsed layer string.  `args` is a tuple and `options` a tuple of (name, value) pairs where
+    each value is an int, float, string or `ParamExpression`.
+    """
+    def evaluate(self, gan):
+        """ Returns fresh `(args, options)` for building the layer.  Layers may modify `options` """
+        def _value(value):
+            if isinstance(value, ParamExpression):
+                return gan.configurable_param(value.source)
+            return value
+        args = [_value(arg) for arg in self.args]
+        options = dict([(name, _value(value)) for name, value in self.options])
+        return args, options
+
+def parse_value(token):
+    if INT.match(token):
+        return int(token)
+    if FLOAT.match(token):
+        return float(token)
+    if "(" in token:
+        return ParamExpression(token)
+    return token
+
+def parse_layer_string(layer):
+    """ Parses `layer` into a `LayerSpec`, raising a ValidationException if it is malformed """
+    if layer.count("(") != layer.count(")"):
+        raise ValidationException("Unbalanced parentheses in layer '" + layer + "'")
+    parens = PARENS.findall(layer)
+    tokens = layer
+    for i, paren in enumerate(parens):
+        tokens = tokens.replace(paren, "PAREN"+str(i))
+    tokens = tokens.split(' ')
+    for i, token in enumerate(tokens):
+        for j, paren in enumerate(parens):
+            tokens[i] = tokens[i].replace("PAREN"+str(j), paren)
+
+    args = []
+    options = []
+    for token in tokens[1:]:
+        if '=' in token:
+            name, value = token.split('=', 1)
+            if name == '':
+                raise ValidationException("Option without a name '" + token + "' in layer '" + layer + "'")
+            options.append((name, parse_value(value)))
+        else:
+            args.append(parse_value(token))
+    return LayerSpec(layer, tokens[0], tuple(args), tuple(options))
+
+_layer_specs = {}
+
+def layer_spec(layer, layer_ops=None):
+    """
+    The cached `LayerSpec` for the string `layer`.  Layer strings are immutable so the string is
+    its own cache key, shared by every component and every `reuse=True` rebuild.
+
+    When `layer_ops` is given the op is checked against it.
+    """
+    spec = _layer_specs.get(layer)
+    if spec is None:
+        spec = parse_layer_string(layer)
+        _layer_specs[layer] = spec
+    if layer_ops is not None and spec.op not in layer_ops:
+        raise ValidationException("Unknown layer type '" + spec.op + "' in layer '" + layer + "'.  Available layers are " + ", ".join(sorted(layer_ops.keys())))
+    return spec
@@ -3,9 +3,10 @@ import tensorflow as tf
 def layer_norm_1(component, net):
     ops = component.ops
     scope = ops.generate_name()
+    count = variable_count()
     with tf.variable_scope(scope, reuse=ops._reuse):
         net = tf.contrib.layers.layer_norm(net, scope=scope, center=True, scale=True, variables_collections=tf.GraphKeys.LOCAL_VARIABLES)
-        vars = lookup_vars(scope)
+        vars = variables_since(count)
     if not ops._reuse:
         ops.add_weights(vars)
 
@@ -26,6 +27,7 @@ def batch_norm_1(component, net):
     scale = config.batch_norm_scale or False
     epsilon = config.batch_norm_epsilon or 0.001
     scope = ops.generate_name()
+    count = variable_count()
     with tf.variable_scope(scope, reuse=ops._reuse):
         net = tf.contrib.layers.batch_norm(net, 
                 decay = decay,
@@ -35,17 +37,15 @@ def batch_norm_1(component, net):
                 is_training = True,
                 scope=scope
                 )
-        vars = lookup_vars(scope)
+        vars = variables_since(count)
     if not ops._reuse:
         ops.add_weights(vars)
     return net
 
 
-def lookup_vars(name):
-    vars = tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)
-    filtered = []
-    for var in vars:
-        if var.name.startswith(name):
-            filtered.append(var)
-    return filtered
+def variable_count():
+    return len(tf.get_collection_ref(tf.GraphKeys.GLOBAL_VARIABLES))
 
+def variables_since(count):
+    """ The global variables created after `variable_count()` returned `count` """
+    return tf.get_collection_ref(tf.GraphKeys.GLOBAL_VARIABLES)[count:]
@@ -9,7 +9,7 @@ from tensorflow.python.ops.variables import RefVariable
 from hypergan.ops.tensorflow import layer_regularizers
 from hypergan.ops.tensorflow.activations import lrelu, selu
 from hypergan.ops.tensorflow.extended_ops import *
-from hypergan.ops.tensorflow.sn import spectral_normed_weight
+from hypergan.ops.tensorflow.sn import spectral_normed_weight, shared_spectral_normed_weight
 class TensorflowOps:
     def __init__(self, config={}, device="/gpu:0"):
         config = hc.Config(config)
@@ -18,6 +18,8 @@ class TensorflowOps:
         initializer = self.config_option("initializer", "he_normal")
 
         self.dtype = self.parse_dtype(dtype)
+        # Weights are stored in `dtype` and cast to `compute_dtype` where they are used
+        self.compute_dtype = self.parse_dtype(self.config_option("compute_dtype", dtype))
         self.scope_count = 0
         self.description = ''
         self.weights = []
@@ -136,16 +138,6 @@ class TensorflowOps:
         else:
             return name
 
-    def parse_dtype(self, dtype):
-        if type(dtype) == Function:
-            return dtype
-        if dtype == 'float32':
-            return tf.float32
-        elif dtype == 'float16':
-            return tf.float16
-        else:
-            raise Exception("dtype not defined: "+str(dtype))
-
     def get_weight(self, shape=None, name=None, initializer=None, trainable=None):
         if name == None:
             name = "w"
@@ -158,7 +150,7 @@ class TensorflowOps:
         if hasattr(self, 'runtime_coef'):
             weight *= self.runtime_coef
             delattr(self, "runtime_coef") # todo, better way to pass variables from initialiszer
-        return weight
+        return self.cast_compute(weight)
 
     def get_bias(self, shape, constant=0.0, name=None, trainable=None):
         if name == None:
@@ -166,16 +158,32 @@ class TensorflowOps:
         bias = tf.get_variable(name, shape, initializer=tf.constant_initializer(constant, dtype=self.dtype), dtype=self.dtype, trainable=trainable)
         if not self._reuse:
             self.biases.append(bias)
-        return bias
+        return self.cast_compute(bias)
     
     def parse_dtype(self, dtype):
+        if isinstance(dtype, tf.DType):
+            return dtype
         if dtype == 'float32':
             return tf.float32
         elif dtype == 'float16':
             return tf.float16
+        elif dtype == 'bfloat16':
+            return tf.bfloat16
         else:
             raise Exception("dtype not defined: "+str(dtype))
 
+    def cast_compute(self, net):
+        """ Casts `net` to `compute_dtype`.  A no-op unless reduced precision is configured """
+        if net.dtype.base_dtype == self.compute_dtype:
+            return net
+        return tf.cast(net, self.compute_dtype)
+
+    def cast_output(self, net):
+        """ Casts `net` back to the storage `dtype` so losses and other components see full precision """
+        if net.dtype.base_dtype == self.dtype:
+            return net
+        return tf.cast(net, self.dtype)
+
     def cosine_conv2d(self, net, filter_w, filter_h, stride_w, stride_h, output_dim):
         with tf.variable_scope(self.generate_name(), reuse=self._reuse):
             w = self.get_weight([filter_h, filter_w, net.get_shape()[-1], output_dim])
@@ -267,31 +275,9 @@ class TensorflowOps:
 
 
     def spectralnorm_conv2d(self, net, filter_w, filter_h, stride_w, stride_h, output_dim, padding='SAME'):
-        def spectral_norm(w, iteration=1):
-           w_shape = w.shape.as_list()
-           w = tf.reshape(w, [-1, w_shape[-1]])
-
-           u = tf.get_variable("u", [1, w_shape[-1]], initializer=tf.truncated_normal_initializer(), trainable=False)
-
-           u_hat = u
-           v_hat = None
-           for i in range(iteration):
-               v_ = tf.matmul(u_hat, tf.transpose(w))
-               v_hat =tf.nn.l2_normalize(v_, [0,1])
-
-               u_ = tf.matmul(v_hat, w)
-               u_hat =tf.nn.l2_normalize(u_, [0,1])
-
-           sigma = tf.matmul(tf.matmul(v_hat, w), tf.transpose(u_hat))
-           w_norm = w / sigma
-
-           with tf.control_dependencies([u.assign(u_hat)]):
-               w_norm = tf.reshape(w_norm, w_shape)
-
-           return w_norm
         with tf.variable_scope(self.generate_name(), reuse=self._reuse):
             w = self.get_weight([filter_h, filter_w, net.get_shape()[-1], output_dim])
-            conv = tf.nn.conv2d(net, strides=[1, stride_h, stride_w, 1], padding=padding, filter=spectral_norm(w))
+            conv = tf.nn.conv2d(net, strides=[1, stride_h, stride_w, 1], padding=padding, filter=shared_spectral_normed_weight(w))
             biases = self.get_bias([output_dim])
             conv = tf.nn.bias_add(conv, biases)
             return conv
@@ -319,6 +305,7 @@ class TensorflowOps:
 
     def conv2d(self, net, filter_w, filter_h, stride_w, stride_h, output_dim, padding="SAME", initializer=None, name=None, trainable=True, bias=True):
         self.assert_tensor(net)
+        net = self.cast_compute(net)
 
 
         layer_regularizer = self.config_option("layer_regularizer")
@@ -349,6 +336,7 @@ class TensorflowOps:
 
     def deconv2d(self, net, filter_w, filter_h, stride_w, stride_h, output_dim, initializer=None, name=None, trainable=True, bias=True):
         self.assert_tensor(net)
+        net = self.cast_compute(net)
         shape = self.shape(net)
         layer_regularizer = self.config_option("layer_regularizer")
         if layer_regularizer == 'weight_norm':
@@ -387,6 +375,7 @@ class TensorflowOps:
             return (tf.matmul(net, v_norm) * g+b)
 
     def linear(self, net, output_dim, initializer=None, name=None, trainable=True, bias=True):
+        net = self.cast_compute(net)
         linear_type = self.config_option("linear_type")
         if linear_type == 'cosine':
             return self.cosine_linear(net, output_dim)
@@ -505,7 +494,7 @@ class TensorflowOps:
                           dtype=tf.float32,
                           trainable=trainable)
                 pos = tf.nn.relu(_x)
-                neg = alphas * (_x - abs(_x)) * 0.5
+                neg = self.cast_compute(alphas) * (_x - abs(_x)) * 0.5
 
             if not self._reuse:
                 self.biases += [alphas]
@@ -554,7 +543,8 @@ class TensorflowOps:
                           _x.get_shape()[-1],
                           initializer=tf.random_normal_initializer(mean=0.0,stddev=0.01),
                           dtype=tf.float32)
-                net = activation(_x - alphas) + alphas
+                _alphas = self.cast_compute(alphas)
+                net = activation(_x - _alphas) + _alphas
 
             #TODO this is wrong - need to add to biases only on no reuse
             self.add_weights(alphas)
@@ -576,7 +566,7 @@ class TensorflowOps:
                           [1],
                           initializer=tf.random_normal_initializer(mean=0.0,stddev=0.01),
                           dtype=tf.float32)
-                net = activation(_x) + alphas
+                net = activation(_x) + self.cast_compute(alphas)
 
             #TODO this is wrong - need to add to biases only on no reuse
             self.add_weights(alphas)
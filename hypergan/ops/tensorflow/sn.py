@@ -1,5 +1,6 @@
 import tensorflow as tf
 import warnings
+import weakref
 
 
 NO_OPS = 'NO_OPS'
@@ -46,3 +47,60 @@ def spectral_normed_weight(W, u=None, num_iters=1, update_collection=None, with_
     return W_bar, sigma
   else:
     return W_bar
+
+
+# graph -> (variable scope name, weight variables) -> normalized weight
+_shared_weights = weakref.WeakKeyDictionary()
+
+VARIABLE_OPS = ["Variable", "VariableV2", "VarHandleOp"]
+
+def _weight_variables(W):
+  """ Names of the variables `W` is computed from, through reads, casts and scaling """
+  found = set()
+  visited = set()
+  pending = [W.op]
+  while pending:
+    op = pending.pop()
+    if op in visited:
+      continue
+    visited.add(op)
+    if op.type in VARIABLE_OPS:
+      found.add(op.name)
+    else:
+      pending.extend([x.op for x in op.inputs])
+  return tuple(sorted(found))
+
+def shared_spectral_normed_weight(W, iterations=1):
+  """
+  `W` divided by its largest singular value, estimated with `iterations` power iteration steps
+  from a persistent `u` variable in the current variable scope.
+
+  The normalized weight is cached by graph, variable scope and the variables behind `W`.  Reuse
+  copies of a layer (built again with `reuse=True`, by the same component or a new one) get the
+  same tensor, so the power iteration runs once per `session.run` and `u` is assigned exactly once.
+  Inside a while loop or cond nothing is cached, a tensor from there cannot be used outside it.
+  """
+  graph = tf.get_default_graph()
+  key = None
+  if graph._get_control_flow_context() is None:
+    key = (tf.get_variable_scope().name, _weight_variables(W))
+  cache = _shared_weights.setdefault(graph, {})
+  if key in cache:
+    return cache[key]
+
+  W_shape = W.shape.as_list()
+  W_reshaped = tf.reshape(W, [-1, W_shape[-1]])
+  u = tf.get_variable("u", [1, W_shape[-1]], dtype=W.dtype.base_dtype, initializer=tf.truncated_normal_initializer(), trainable=False)
+
+  u_hat = u
+  v_hat = None
+  for i in range(iterations):
+    v_hat = tf.nn.l2_normalize(tf.matmul(u_hat, tf.transpose(W_reshaped)), [0,1])
+    u_hat = tf.nn.l2_normalize(tf.matmul(v_hat, W_reshaped), [0,1])
+
+  sigma = tf.matmul(tf.matmul(v_hat, W_reshaped), tf.transpose(u_hat))
+  with tf.control_dependencies([u.assign(u_hat)]):
+    W_bar = tf.reshape(W_reshaped / sigma, W_shape)
+  if key is not None:
+    cache[key] = W_bar
+  return W_bar
@@ -38,19 +38,21 @@ class GANOptimizer(optimizer.Optimizer):
 
   def _create_slots(self, var_list):
     super()._create_slots(var_list)
-    d_vars = [v for v in var_list if v in self.gan.d_vars()]
-    g_vars = [v for v in var_list if v in self.gan.g_vars()]
+    roles = self.gan.variable_roles()
+    d_vars = [v for v in var_list if v in roles.d_vars]
+    g_vars = [v for v in var_list if v in roles.g_vars]
     self.d_optimizer._create_slots(d_vars)
     self.g_optimizer._create_slots(g_vars)
-    missing_vars = [v for v in var_list if v not in self.gan.g_vars() + self.gan.d_vars()]
+    missing_vars = [v for v in var_list if v not in roles.g_vars and v not in roles.d_vars]
     if len(missing_vars) > 0:
         print("Error, GANOptimizer does not know how to handle missing variables (not in d_vars or g_vars)", missing_vars)
         raise("Error, GANOptimizer does not know how to handle missing variables (not in d_vars or g_vars)")
 
   def _apply_dense(self, grad, var):
-    if var in self.gan.d_vars():
+    roles = self.gan.variable_roles()
+    if var in roles.d_vars:
         return self.d_optimizer._apply_dense(grad, var)
-    elif var in self.gan.g_vars():
+    elif var in roles.g_vars:
         return self.g_optimizer._apply_dense(grad, var)
     raise("Unable to handle", var)
 
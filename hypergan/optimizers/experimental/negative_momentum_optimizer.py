@@ -35,11 +35,12 @@ class NegativeMomentumOptimizer(optimizer.Optimizer):
     g_vars = []
     d_grads = []
     g_grads = []
+    roles = self.gan.variable_roles()
     for grad,var in grads_and_vars:
-        if var in self.gan.d_vars():
+        if var in roles.d_vars:
             d_vars += [var]
             d_grads += [grad]
-        elif var in self.gan.g_vars():
+        elif var in roles.g_vars:
             g_vars += [var]
             g_grads += [grad]
         else:
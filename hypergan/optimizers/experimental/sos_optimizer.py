@@ -36,10 +36,11 @@ class SOSOptimizer(optimizer.Optimizer):
     d_vars = []
     g_vars = []
     all_grads = [ g for g, _ in grads_and_vars ]
+    roles = self.gan.variable_roles()
     for grad,var in grads_and_vars:
-        if var in self.gan.d_vars():
+        if var in roles.d_vars:
             d_vars += [var]
-        elif var in self.gan.g_vars():
+        elif var in roles.g_vars:
             g_vars += [var]
         else:
             raise("Couldn't find var in g_vars or d_vars")
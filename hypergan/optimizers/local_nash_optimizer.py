@@ -49,11 +49,12 @@ class LocalNashOptimizer(optimizer.Optimizer):
     if self.config.beta is not None:
         beta = self.gan.configurable_param(self.config.beta)
 
+    roles = self.gan.variable_roles()
     for grad,var in grads_and_vars:
-        if var in self.gan.d_vars():
+        if var in roles.d_vars:
             d_vars += [var]
             d_grads += [grad]
-        elif var in self.gan.g_vars():
+        elif var in roles.g_vars:
             g_vars += [var]
             g_grads += [grad]
         else:
@@ -154,10 +155,11 @@ class LocalNashOptimizer(optimizer.Optimizer):
     d_vars = []
     g_vars = []
     all_grads = [ g for g, _ in grads_and_vars ]
+    roles = self.gan.variable_roles()
     for grad,var in grads_and_vars:
-        if var in self.gan.d_vars():
+        if var in roles.d_vars:
             d_vars += [var]
-        elif var in self.gan.g_vars():
+        elif var in roles.g_vars:
             g_vars += [var]
         else:
             raise("Couldn't find var in g_vars or d_vars")
@@ -0,0 +1,84 @@
+# Restores checkpoints whose variable shapes may not match the graph
+import os
+import numpy as np
+import tensorflow as tf
+
+def fit_to_shape(saved, current):
+    """
+    Returns `current` with its leading corner overwritten by `saved`.  Dimensions where the
+    checkpoint is larger are truncated; where it is smaller the current values are kept.
+    """
+    value = np.array(current, copy=True)
+    region = tuple(slice(0, min(a, b)) for a, b in zip(saved.shape, current.shape))
+    value[region] = saved[region]
+    return value
+
+class RestorePlan:
+    """ Which variables of a checkpoint restore directly, which need resizing and which are missing """
+    def __init__(self, save_file, variables):
+        self.reader = tf.train.NewCheckpointReader(save_file)
+        saved_shapes = self.reader.get_variable_to_shape_map()
+        self.matched = []
+        self.mismatched = []
+        self.missing = []
+        for variable in variables:
+            name = variable.op.name
+            if name not in saved_shapes:
+                self.missing.append(variable)
+            elif saved_shapes[name] == variable.get_shape().as_list():
+                self.matched.append(variable)
+            else:
+                print(" (load) Shapes do not match, extra reinitialized", name, variable.get_shape().as_list(), " vs loaded ", saved_shapes[name])
+                self.mismatched.append(variable)
+
+class RestorePlanner:
+    """
+    RestorePlanner restores `variables` from checkpoints that may have been written by a
+    differently sized graph, such as an earlier stage of progressive growing.
+
+    The plan for a checkpoint is computed once per file and modification time.  Matching
+    variables are restored with a cached Saver.  Mismatched ones are truncated or padded on
+    the host and assigned with one placeholder fed op per variable, so repeated loads add
+    nothing to the graph.
+    """
+    def __init__(self, variables):
+        self.variables = variables
+        self.plans = {}
+        self.savers = {}
+        self.assigns = {}
+
+    def plan(self, save_file):
+        key = (save_file, os.path.getmtime(save_file + ".index"))
+        if key not in self.plans:
+            self.plans = {key: RestorePlan(save_file, self.variables)}
+        return self.plans[key]
+
+    def saver(self, variables):
+        key = tuple(v.op.name for v in variables)
+        if key not in self.savers:
+            self.savers[key] = tf.train.Saver(variables)
+        return self.savers[key]
+
+    def assign(self, variable):
+        if variable not in self.assigns:
+            with tf.name_scope("restore_planner"):
+                value = tf.placeholder(variable.dtype.base_dtype, variable.get_shape())
+                self.assigns[variable] = (value, tf.assign(variable, value))
+        return self.assigns[variable]
+
+    def restore(self, session, save_file):
+        plan = self.plan(save_file)
+        if len(plan.matched) > 0:
+            self.saver(plan.matched).restore(session, save_file)
+        if len(plan.mismatched) == 0:
+            return plan
+
+        currents = session.run(plan.mismatched)
+        feed_dict = {}
+        ops = []
+        for variable, current in zip(plan.mismatched, currents):
+            value, op = self.assign(variable)
+            feed_dict[value] = fit_to_shape(plan.reader.get_tensor(variable.op.name), current)
+            ops.append(op)
+        session.run(ops, feed_dict)
+        return plan
@@ -1,12 +1,16 @@
 import numpy as np
 import tensorflow as tf
-from PIL import Image
 from hypergan.viewer import GlobalViewer
+from hypergan.samplers.sample_writer import to_uint8, write_image
 
 class BaseSampler:
+    writer = None
+
     def __init__(self, gan, samples_per_row=8, session=None):
         self.gan = gan
         self.samples_per_row = samples_per_row
+        self._callables = {}
+        self._buffers = {}
 
     def _sample(self):
         raise "raw _sample method called.  You must override this"
@@ -26,8 +30,7 @@ class BaseSampler:
 
             width = min(gan.batch_size(), self.samples_per_row)
             width = min(width, np.shape(data)[0])
-            stacks = [np.hstack(data[i*width:i*width+width]) for i in range(np.shape(data)[0]//width)]
-            sample_data = np.vstack(stacks)
+            sample_data = self.grid(data, np.shape(data)[0]//width, width)
             self.plot(sample_data, path, save_samples)
             sample_name = 'generator'
             samples = [[sample_data, sample_name]]
@@ -35,6 +38,58 @@ class BaseSampler:
             return [{'image':path, 'label':'sample'} for sample_data, sample_filename in samples]
 
 
+    def buffer(self, name, shape, dtype):
+        """ A preallocated array, reused between calls while `shape` and `dtype` stay the same """
+        shape = tuple(shape)
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer
+
+    def grid(self, data, rows, columns, name="grid"):
+        """ Tiles the first `rows*columns` images of `data` into one image, written into a preallocated buffer """
+        data = np.asarray(data)
+        if rows * columns == 1:
+            return data[0]
+        n, h, w, c = data.shape
+        grid = self.buffer(name, [rows * h, columns * w, c], data.dtype)
+        np.copyto(grid.reshape([rows, h, columns, w, c]), data[:rows*columns].reshape([rows, columns, h, w, c]).transpose([0, 2, 1, 3, 4]))
+        return grid
+
+    def generate(self, z_t, g_t, z, feed_dict={}):
+        """
+        Runs `g_t` for every row of `z`, fed to `z_t`, and returns the stacked results.
+
+        When the batch dimension of `z_t` is dynamic this is a single run.  Otherwise `z` is fed a
+        batch at a time through a cached callable, with the last batch padded.
+        """
+        batch = z_t.get_shape().as_list()[0]
+        feeds = list(feed_dict.keys())
+        count = len(z)
+        if batch is None or batch >= count:
+            if batch is not None and batch > count:
+                z = np.concatenate([z, np.zeros([batch - count] + list(z.shape[1:]), dtype=z.dtype)])
+            return self.run_callable(g_t, [z_t] + feeds, [z] + list(feed_dict.values()))[:count]
+
+        out = None
+        for start in range(0, count, batch):
+            zi = z[start:start+batch]
+            if len(zi) < batch:
+                zi = np.concatenate([zi, np.zeros([batch - len(zi)] + list(z.shape[1:]), dtype=z.dtype)])
+            g = self.run_callable(g_t, [z_t] + feeds, [zi] + list(feed_dict.values()))
+            if out is None:
+                out = self.buffer("generate", [count] + list(g.shape[1:]), g.dtype)
+            n = min(batch, count - start)
+            out[start:start+n] = g[:n]
+        return out
+
+    def run_callable(self, fetch, feeds, values):
+        key = (fetch, tuple(feeds))
+        if key not in self._callables:
+            self._callables[key] = self.gan.session.make_callable(fetch, feed_list=feeds)
+        return self._callables[key](*values)
+
     def replace_none(self, t):
         """
         This method replaces None with 0.
@@ -43,23 +98,11 @@ class BaseSampler:
         return tf.where(tf.is_nan(t),tf.zeros_like(t),t)
 
     def plot(self, image, filename, save_sample, regularize=True):
-        """ Plot an image."""
-        if regularize:
-            image = np.minimum(image, 1)
-            image = np.maximum(image, -1)
-        image = np.squeeze(image)
-        if np.shape(image)[2] == 4:
-            fmt = "RGBA"
-        else:
-            fmt = "RGB"
-        # Scale to 0..255.
-        imin, imax = image.min(), image.max()
-        image = (image - imin) * 255. / (imax - imin) + .5
-        image = image.astype(np.uint8)
+        """ Plot an image.  With a `writer` set, normalization, encoding and the viewer update happen in the background """
+        if self.writer is not None:
+            self.writer.submit(self.gan, image, filename, save_sample, regularize)
+            return
+        image = to_uint8(image, regularize)
         if save_sample:
-            try:
-                Image.fromarray(image, fmt).save(filename)
-            except Exception as e:
-                print("Warning: could not sample to ", filename, ".  Please check permissions and make sure the path exists")
-                print(e)
+            write_image(image, filename)
         GlobalViewer.update(self.gan, image)
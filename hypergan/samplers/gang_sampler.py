@@ -23,7 +23,8 @@ class GangSampler(BaseSampler):
         if self.xs is None:
             self.xs = [sess.run([gan.latent.sample]) for i in range(self.samples)]
 
-        current_g = sess.run(gan.trainer.all_g_vars)
+        trainer = gan.trainer
+        current_g = trainer.g_pool.snapshot(sess)
         
         stacks = []
         def _samples():
@@ -39,14 +40,16 @@ class GangSampler(BaseSampler):
                 #cs.append(sess.run(gan.autoencoded_x,feed_dict))
             return np.vstack(cs)
 
-        stacks.append(_samples())
-        for sg in gan.trainer.sgs:
-            gan.trainer.assign_g(sg)
+        try:
             stacks.append(_samples())
-        for i in range((gan.trainer.config.nash_memory_size or 10) - len(stacks)):
-            stacks.append(_samples())
-
-        gan.trainer.assign_g(current_g)
+            for sg in trainer.sgs:
+                trainer.assign_g(sg)
+                stacks.append(_samples())
+            for i in range((trainer.config.nash_memory_size or 10) - len(stacks)):
+                stacks.append(_samples())
+        finally:
+            trainer.assign_g(current_g)
+            trainer.g_pool.release(current_g)
 
         images = np.vstack([np.hstack(s) for s in stacks])
 
@@ -21,18 +21,8 @@ class GridSampler(BaseSampler):
         z = np.reshape(z, [32,2])
         #z = np.mgrid[-0.499:0.499:0.3, -0.499:0.499:0.13].reshape(2,-1).T
         #z = np.mgrid[-0.299:0.299:0.15, -0.299:0.299:0.075].reshape(2,-1).T
-        needed = 32 / gan.batch_size()
-        gs = []
-        for i in range(int(needed)):
-            zi = z[i*gan.batch_size():(i+1)*gan.batch_size()]
-            g = gan.session.run(gan.generator.sample, feed_dict={z_t: zi, gan.inputs.x: self.x})
-            gs.append(g)
-        g = np.hstack(gs)
-        xshape = gan.ops.shape(gan.inputs.x)
-        g = np.reshape(gs, [4, 8, xshape[1], xshape[2], xshape[3]])
-        g = np.concatenate(g, axis=1)
-        g = np.concatenate(g, axis=1)
-        g = np.expand_dims(g, axis=0)
+        g = self.generate(z_t, gan.generator.sample, z, feed_dict={gan.inputs.x: self.x})
+        g = np.expand_dims(self.grid(g, 4, 8, name="grid_sampler"), axis=0)
         x_hat = gan.session.run(gan.autoencoded_x, feed_dict={gan.inputs.x: self.x})
         #e = gan.session.run(gan.encoder.sample, feed_dict={gan.inputs.x: g})
 
@@ -0,0 +1,25 @@
+import numpy as np
+
+class LatentBank:
+    """
+    A fixed bank of latent samples shared by every sampler of a gan.  Samplers asking for the
+    same number of points get the same latents, and the latent distribution is only evaluated
+    when the bank has to grow.  Use `latent_bank(gan)`.
+    """
+    def __init__(self, gan):
+        self.gan = gan
+        self.z = None
+
+    def get(self, count):
+        """ The first `count` latent samples """
+        while self.z is None or len(self.z) < count:
+            z = self.gan.session.run(self.gan.latent.sample)
+            self.z = z if self.z is None else np.concatenate([self.z, z])
+        return self.z[:count]
+
+def latent_bank(gan):
+    bank = getattr(gan, "_latent_bank", None)
+    if bank is None:
+        bank = LatentBank(gan)
+        gan._latent_bank = bank
+    return bank
@@ -0,0 +1,94 @@
+# Encodes and writes samples off the training thread
+import os
+import queue
+import threading
+import numpy as np
+from PIL import Image
+from hypergan.viewer import GlobalViewer
+
+def to_uint8(image, regularize=True):
+    """ Clips to [-1, 1] when `regularize` is set, then scales the image min..max to 0..255 """
+    if regularize:
+        image = np.minimum(image, 1)
+        image = np.maximum(image, -1)
+    image = np.squeeze(image)
+    imin, imax = image.min(), image.max()
+    image = (image - imin) * 255. / (imax - imin) + .5
+    return image.astype(np.uint8)
+
+def write_image(image, filename):
+    """ Encodes a uint8 image as PNG, JPEG or WebP (chosen by the extension of `filename`) """
+    if len(np.shape(image)) == 3 and np.shape(image)[2] == 4:
+        fmt = "RGBA"
+    elif len(np.shape(image)) == 3:
+        fmt = "RGB"
+    else:
+        fmt = "L"
+    try:
+        pil_image = Image.fromarray(image, fmt)
+        if os.path.splitext(filename)[1].lower() in [".jpg", ".jpeg"] and fmt == "RGBA":
+            pil_image = pil_image.convert("RGB")
+        pil_image.save(filename)
+    except Exception as e:
+        print("Warning: could not sample to ", filename, ".  Please check permissions and make sure the path exists")
+        print(e)
+
+class SampleWriter:
+    """
+    SampleWriter takes raw sample arrays from the training thread and normalizes, encodes and
+    writes them on a background thread.
+
+    The queue holds at most `max_queue` samples.  When it is full new samples are dropped
+    (counted in `dropped`) instead of blocking training.  The viewer has to be driven from the
+    main thread, so the newest written frame is kept until `update_viewer` is called.
+    """
+    def __init__(self, max_queue=4):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.latest = None
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name="sample-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, gan, image, filename, save_sample, regularize=True):
+        """ Queues a copy of `image`.  Returns False if it was dropped """
+        try:
+            self.queue.put_nowait((gan, np.array(image, copy=True), filename, save_sample, regularize))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                gan, image, filename, save_sample, regularize = item
+                image = to_uint8(image, regularize)
+                if save_sample:
+                    write_image(image, filename)
+                with self.lock:
+                    self.latest = (gan, image)
+                self.written += 1
+            finally:
+                self.queue.task_done()
+
+    def update_viewer(self):
+        """ Shows the newest written frame, call from the main thread """
+        with self.lock:
+            latest, self.latest = self.latest, None
+        if latest is not None:
+            GlobalViewer.update(*latest)
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.update_viewer()
+        if self.dropped > 0:
+            print("[sampler] Wrote", self.written, "samples, dropped", self.dropped, "under backpressure")
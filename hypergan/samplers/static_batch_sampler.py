@@ -1,4 +1,5 @@
 from hypergan.samplers.base_sampler import BaseSampler
+from hypergan.samplers.latent_bank import latent_bank
 from hypergan.train_hooks.experimental.imle_train_hook import IMLETrainHook
 import numpy as np
 import tensorflow as tf
@@ -21,32 +22,20 @@ class StaticBatchSampler(BaseSampler):
     def _sample(self):
         gan = self.gan
         z_t = gan.latent.sample
-        inputs_t = gan.inputs.x
-        needed = int(self.rows*self.columns / gan.batch_size())
+        count = self.rows*self.columns
 
         if self.z is None:
-            self.z = [gan.latent.sample.eval() for i in range(needed)]
-            self.z = np.reshape(self.z, [self.rows*self.columns, -1])
+            self.z = latent_bank(gan).get(count)
+            self.z = np.reshape(self.z, [count, -1])
 
-        z = self.z
-        gs = []
-        for i in range(int(needed)):
-            zi = z[i*gan.batch_size():(i+1)*gan.batch_size()]
-            g = gan.session.run(self.g_t, feed_dict={z_t: zi})
-            gs.append(g)
+        g = self.generate(z_t, self.g_t, self.z)
         for t in self.gan.trainer.train_hooks:
             if isinstance(t, IMLETrainHook):
                 for j in range(t.config.memory_size):
-                    gs[j*2][0] = gan.session.run(t.gi[j].sample)
-                    gs[j*2+1][0] = gan.session.run(t.x_matched[j])
-        g = np.hstack(gs)
-        xshape = gan.ops.shape(gan.inputs.x)
-        g = np.reshape(gs, [self.rows, self.columns, xshape[1], xshape[2], xshape[3]])
-        g = np.concatenate(g, axis=1)
-        g = np.concatenate(g, axis=1)
-        g = np.expand_dims(g, axis=0)
+                    g[j*2*gan.batch_size()] = gan.session.run(t.gi[j].sample)[0]
+                    g[(j*2+1)*gan.batch_size()] = gan.session.run(t.x_matched[j])[0]
+        g = self.grid(g, self.rows, self.columns, name="static_batch")
 
         return {
-            'generator': g
+            'generator': np.expand_dims(g, axis=0)
         }
-
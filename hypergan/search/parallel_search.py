@@ -0,0 +1,286 @@
+import json
+import math
+import os
+import pickle
+import queue
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import numpy as np
+import tensorflow as tf
+
+from hypergan.gan_component import ValidationException
+from hypergan.trainers.metrics_reporter import HistoryMetricsReporter
+from hypergan.trainers.parallel_evaluator import send
+
+class Trial:
+    def __init__(self, id, config, rung=-1, steps=0, score=None, status="active", seconds=0.0):
+        self.id = id
+        self.config = config
+        self.rung = rung
+        self.steps = steps
+        self.score = score
+        self.status = status
+        self.seconds = seconds
+
+class ResultsStore:
+    """
+    SQLite store of search trials.  Each trial keeps its pickled configuration, the last rung it
+    completed, its score there and its status: `active`, `stopped`, `failed` or `done`.
+    The promotion decided after each rung is kept too.  Reopening the same file resumes the search.
+    """
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS trials (
+            id INTEGER PRIMARY KEY, config BLOB, config_json TEXT, rung INTEGER, steps INTEGER,
+            score REAL, status TEXT, seconds REAL)""")
+        self.db.execute("CREATE TABLE IF NOT EXISTS promotions (rung INTEGER PRIMARY KEY, trials TEXT, kept TEXT)")
+        self.db.commit()
+
+    def add(self, config):
+        with self.lock:
+            cursor = self.db.execute("INSERT INTO trials (config, config_json, rung, steps, score, status, seconds) VALUES (?, ?, -1, 0, NULL, 'active', 0)",
+                    (pickle.dumps(config), json.dumps(config, default=str)))
+            self.db.commit()
+            return Trial(cursor.lastrowid, config)
+
+    def update(self, trial):
+        with self.lock:
+            self.db.execute("UPDATE trials SET rung=?, steps=?, score=?, status=?, seconds=? WHERE id=?",
+                    (trial.rung, trial.steps, trial.score, trial.status, trial.seconds, trial.id))
+            self.db.commit()
+
+    def trials(self):
+        with self.lock:
+            rows = self.db.execute("SELECT id, config, rung, steps, score, status, seconds FROM trials ORDER BY id").fetchall()
+        return [Trial(id, pickle.loads(config), rung, steps, score, status, seconds) for id, config, rung, steps, score, status, seconds in rows]
+
+    def promotion(self, rung):
+        """ (trial ids ranked at `rung`, trial ids kept) or None if `rung` has not been promoted """
+        with self.lock:
+            row = self.db.execute("SELECT trials, kept FROM promotions WHERE rung=?", (rung,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), json.loads(row[1])
+
+    def add_promotion(self, rung, trials, kept):
+        with self.lock:
+            self.db.execute("INSERT INTO promotions (rung, trials, kept) VALUES (?, ?, ?)", (rung, json.dumps(trials), json.dumps(kept)))
+            self.db.commit()
+
+    def export_csv(self, path):
+        """ Writes `id,status,rung,steps,score,seconds,config` rows, best score first """
+        trials = sorted(self.trials(), key=lambda t: (t.score is None, t.score))
+        with open(path, "w") as f:
+            f.write("id,status,rung,steps,score,seconds,config\n")
+            for t in trials:
+                f.write(",".join([str(t.id), t.status, str(t.rung), str(t.steps), str(t.score), "%.1f" % t.seconds, json.dumps(json.dumps(t.config, default=str))]) + "\n")
+
+    def close(self):
+        self.db.close()
+
+class ParallelSearch:
+    """
+    ParallelSearch trains configurations from `search.random_config()` concurrently in worker
+    processes and stops the weakest early with successive halving.
+
+    Rung `k` trains every surviving trial to `min_steps * eta^k` steps (capped at `max_steps`),
+    continuing from the checkpoint of the previous rung.  After each rung the best `1/eta` of the
+    trials by score go on, the rest are stopped.
+
+    * `inputs` is an importable callable `inputs(config)` returning the gan inputs.  It is pickled
+      by reference and called in the workers.
+    * `metric` is a trainer metric name such as `g_loss`, or an importable callable `metric(gan)`.
+      The score is its mean over the last `window` metric reports of a rung.  Lower is better.
+    * `store` is a ResultsStore.  Finished rungs are recorded as they complete, so running the
+      search again with the same store resumes where it stopped.
+    * `devices`, if set, is a list of `CUDA_VISIBLE_DEVICES` values assigned to workers round robin.
+    """
+    def __init__(self, search, inputs, store, trials=16, min_steps=1000, max_steps=16000, eta=3, workers=2,
+            metric="g_loss", window=10, save_path="saves/search", devices=None):
+        if eta < 2:
+            raise ValidationException("eta must be at least 2")
+        self.search = search
+        self.inputs = inputs
+        self.store = store
+        self.trial_count = trials
+        self.eta = eta
+        self.workers = workers
+        self.metric = metric
+        self.window = window
+        self.save_path = save_path
+        self.devices = devices
+        self.budgets = []
+        budget = min_steps
+        while budget < max_steps:
+            self.budgets.append(budget)
+            budget *= eta
+        self.budgets.append(max_steps)
+
+    def save_file(self, trial):
+        return os.path.join(os.path.expanduser(self.save_path), "trial-%d" % trial.id, "model.ckpt")
+
+    def run(self):
+        """ Runs (or resumes) the search and returns the trials, best first """
+        trials = self.store.trials()
+        for i in range(len(trials), self.trial_count):
+            trials.append(self.store.add(self.search.random_config()))
+
+        for rung, budget in enumerate(self.budgets):
+            pending = [t for t in self.store.trials() if t.status == "active" and t.rung < rung]
+            if len(pending) > 0:
+                print("[search] Rung %d: training %d trials to %d steps" % (rung, len(pending), budget))
+                self.run_jobs([(t, rung, budget) for t in pending])
+            if rung == len(self.budgets) - 1:
+                for t in self.store.trials():
+                    if t.status == "active":
+                        t.status = "done"
+                        self.store.update(t)
+            else:
+                self.promote(rung)
+
+        return sorted(self.store.trials(), key=lambda t: (t.status != "done", t.score is None, t.score))
+
+    def promote(self, rung):
+        """
+        Keeps the best `1/eta` of the trials that completed `rung`.  The decision is recorded in the
+        store and only applied again on resume, when kept trials may have moved on to later rungs.
+        """
+        decision = self.store.promotion(rung)
+        if decision is None:
+            finished = [t for t in self.store.trials() if t.rung == rung and t.status == "active"]
+            finished = sorted(finished, key=lambda t: t.score)
+            keep = max(1, int(math.ceil(len(finished) / float(self.eta))))
+            decision = ([t.id for t in finished], [t.id for t in finished[:keep]])
+            self.store.add_promotion(rung, *decision)
+        ranked, kept = decision
+        for t in self.store.trials():
+            if t.id in ranked and t.id not in kept and t.status == "active":
+                t.status = "stopped"
+                self.store.update(t)
+        print("[search] Rung %d: %d of %d trials promoted" % (rung, len(kept), len(ranked)))
+
+    def run_jobs(self, jobs):
+        tasks = queue.Queue()
+        for job in jobs:
+            tasks.put(job)
+        processes = [self.start_worker(i) for i in range(min(self.workers, len(jobs)))]
+
+        def _dispatch(process):
+            while True:
+                try:
+                    trial, rung, budget = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    send(process.stdin, (trial.config, self.inputs, self.save_file(trial), budget, self.metric, self.window))
+                    status, result = pickle.load(process.stdout)
+                except (EOFError, IOError) as e:
+                    status, result = "error", "Search worker exited: " + str(e)
+                self.record(trial, rung, status, result)
+                if status == "error" and process.poll() is not None:
+                    return
+
+        threads = [threading.Thread(target=_dispatch, args=(process,)) for process in processes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for process in processes:
+            try:
+                send(process.stdin, None)
+                process.stdin.close()
+            except IOError:
+                pass
+            process.wait()
+
+    def record(self, trial, rung, status, result):
+        if status == "error":
+            print("[search] Trial", trial.id, "failed:", result)
+            trial.status = "failed"
+        else:
+            steps, score, seconds = result
+            trial.steps = steps
+            trial.score = score
+            trial.seconds += seconds
+            trial.rung = rung
+            if score is None or not np.isfinite(score):
+                trial.status = "failed"
+            print("[search] Trial %d rung %d: score %s after %d steps (%.1fs)" % (trial.id, rung, str(score), steps, seconds))
+        self.store.update(trial)
+
+    def start_worker(self, i):
+        env = dict(os.environ)
+        if self.devices:
+            env["CUDA_VISIBLE_DEVICES"] = str(self.devices[i % len(self.devices)])
+        return subprocess.Popen([sys.executable, "-m", "hypergan.search.parallel_search"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+
+def metrics_reporter(gan, metric):
+    """ Attaches a HistoryMetricsReporter to the trainer that reports `metric`.  Raises if no trainer does """
+    trainer = gan.trainer.metrics_trainer() if hasattr(gan.trainer, "metrics_trainer") else None
+    if trainer is None:
+        raise ValidationException(type(gan.trainer).__name__ + " does not report metrics.  Score trials with a callable metric instead of '" + metric + "'")
+    if metric not in gan.metrics():
+        raise ValidationException("Unknown metric '" + metric + "'.  The trainer reports " + ", ".join(sorted(gan.metrics().keys())))
+    reporter = HistoryMetricsReporter(trainer)
+    trainer.metrics_reporter = reporter
+    return reporter
+
+def train_trial(config, inputs, save_file, budget, metric, window):
+    """
+    Trains one trial in a fresh graph up to `budget` steps.  Returns (steps, score, seconds).
+    The score is NaN, and nothing is saved, when the discriminator output went NaN.
+    """
+    import hypergan as hg
+    start = time.time()
+    graph = tf.Graph()
+    with graph.as_default():
+        gan = hg.GAN(config, inputs=inputs(config))
+        try:
+            reporter = None if callable(metric) else metrics_reporter(gan, metric)
+            gan.load(save_file)
+            steps = gan.session.run(gan.steps)
+            while steps < budget:
+                gan.step()
+                steps += 1
+            if np.any(np.isnan(gan.session.run(gan.loss.d_fake))):
+                # BaseGAN.save would exit the worker
+                print("[search] NaN detected after", steps, "steps")
+                score = float("nan")
+            elif callable(metric):
+                score = float(metric(gan))
+            else:
+                values = [metrics[metric] for step, metrics in reporter.history[-window:] if metric in metrics]
+                score = float(np.mean(values)) if len(values) > 0 else None
+            if score is not None and np.isfinite(score):
+                gan.save(save_file)
+        finally:
+            if hasattr(gan.trainer, "close"):
+                gan.trainer.close()
+            gan.session.close()
+    return steps, score, time.time() - start
+
+def worker_main():
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # stdout carries results, send prints to stderr
+    sys.stdout = sys.stderr
+    while True:
+        try:
+            job = pickle.load(stdin)
+        except EOFError:
+            return
+        if job is None:
+            return
+        try:
+            send(stdout, ("ok", train_trial(*job)))
+        except Exception:
+            send(stdout, ("error", traceback.format_exc()))
+
+if __name__ == "__main__":
+    worker_main()
@@ -0,0 +1,259 @@
+# Batched HTTP inference for trained generators
+import base64
+import collections
+import io
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+import urllib.request
+import numpy as np
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from PIL import Image
+
+from hypergan.bulk_generator import to_pixels
+from hypergan.gan_component import ValidationException
+
+class Request:
+    def __init__(self, z):
+        self.z = z
+        self.start = time.time()
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class GANServer:
+    """
+    GANServer generates images from latent vectors with dynamic batching.
+
+    Requests are queued and a single thread runs them through the generator.  It waits up to
+    `max_wait` seconds for more requests to fill the model's batch size, so concurrent clients
+    share one `session.run`.  Only the generator is run, through a cached callable, so no
+    training ops are evaluated.
+
+    Latents are fed to `gan.latent.z`, the raw latent before projections, when the latent
+    distribution has one.  Seeds draw that latent with the distribution's `numpy_sample` from
+    `numpy.random.RandomState(seed)`.  `hypergan serve` builds the gan with `inference=True`, so
+    the graph holds no discriminator, loss or trainer.
+    """
+    def __init__(self, gan, max_wait=0.002, history=10000):
+        self.gan = gan
+        self.max_wait = max_wait
+        self.z_t = getattr(gan.latent, "z", None)
+        if self.z_t is None:
+            self.z_t = gan.latent.sample
+        self.g_t = gan.generator.sample
+        self.batch_size = self.z_t.get_shape().as_list()[0] or gan.batch_size()
+        self.z_shape = self.z_t.get_shape().as_list()[1:]
+        self.generate_batch = gan.session.make_callable(self.g_t, feed_list=[self.z_t])
+        self.queue = queue.Queue()
+        self.latencies = collections.deque(maxlen=history)
+        self.batches = 0
+        self.images = 0
+        self.started = time.time()
+        self.thread = threading.Thread(target=self.run, name="gan-server", daemon=True)
+        self.thread.start()
+
+    def seed_latent(self, seed):
+        return self.gan.latent.numpy_sample(self.z_shape, np.random.RandomState(seed))
+
+    def generate(self, z=None, seeds=None):
+        """ Returns generated images for latent vectors `z` or `seeds`.  Blocks until they are ready """
+        if z is None:
+            z = [self.seed_latent(seed) for seed in (seeds or [])]
+        z = np.reshape(np.asarray(z, dtype=np.float32), [-1] + self.z_shape)
+        if len(z) == 0:
+            raise ValidationException("Nothing to generate.  Send `z` or `seeds`.")
+        request = Request(z)
+        self.queue.put(request)
+        request.event.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            requests = [first]
+            count = len(first.z)
+            deadline = time.time() + self.max_wait
+            stop = False
+            while count < self.batch_size:
+                try:
+                    request = self.queue.get(timeout=max(deadline - time.time(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                requests.append(request)
+                count += len(request.z)
+            self.run_requests(requests)
+            if stop:
+                return
+
+    def run_requests(self, requests):
+        try:
+            z = np.concatenate([r.z for r in requests])
+            images = []
+            for start in range(0, len(z), self.batch_size):
+                zi = z[start:start+self.batch_size]
+                n = len(zi)
+                if n < self.batch_size:
+                    zi = np.concatenate([zi, np.zeros([self.batch_size - n] + self.z_shape, dtype=zi.dtype)])
+                images.append(self.generate_batch(zi)[:n])
+                self.batches += 1
+            images = np.concatenate(images)
+            offset = 0
+            for r in requests:
+                r.result = images[offset:offset+len(r.z)]
+                offset += len(r.z)
+        except Exception as e:
+            for r in requests:
+                r.error = e
+        now = time.time()
+        for r in requests:
+            self.latencies.append(now - r.start)
+            if r.error is None:
+                self.images += len(r.z)
+            r.event.set()
+
+    def report(self):
+        """ Latency percentiles (milliseconds) and throughput since the server started """
+        latencies = np.array(self.latencies) * 1000.
+        elapsed = time.time() - self.started
+        report = {
+            "requests": len(latencies),
+            "images": self.images,
+            "batches": self.batches,
+            "images_per_batch": self.images / float(max(self.batches, 1)),
+            "images_per_second": self.images / max(elapsed, 1e-9)
+        }
+        if len(latencies) > 0:
+            for p in [50, 95, 99]:
+                report["p%d_ms" % p] = float(np.percentile(latencies, p))
+        return report
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+def encode_png(image):
+    """ PNG bytes of a generator output in [-1, 1], mapped to pixels the same way as `hypergan generate` """
+    pixels = to_pixels(image)
+    if pixels.shape[-1] == 1:
+        pixels = np.squeeze(pixels, axis=-1)
+    out = io.BytesIO()
+    Image.fromarray(pixels).save(out, format="PNG")
+    return out.getvalue()
+
+class GANRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /generate with a JSON body of `{"z": [[...], ...]}` or `{"seeds": [1, 2]}`.  Responds with
+    `{"images": [base64 png, ...]}`, or raw float32 `.npy` bytes when `"format": "npy"` is set.
+
+    GET /stats returns `GANServer.report()`.
+    """
+    def do_GET(self):
+        if self.path != "/stats":
+            return self.send_error(404)
+        self.respond(200, "application/json", json.dumps(self.server.gan_server.report()).encode("utf-8"))
+
+    def do_POST(self):
+        if self.path != "/generate":
+            return self.send_error(404)
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8") or "{}")
+            images = self.server.gan_server.generate(z=body.get("z"), seeds=body.get("seeds"))
+        except (ValueError, ValidationException) as e:
+            return self.respond(400, "application/json", json.dumps({"error": str(e)}).encode("utf-8"))
+        except Exception as e:
+            return self.respond(500, "application/json", json.dumps({"error": type(e).__name__ + ": " + str(e)}).encode("utf-8"))
+        if body.get("format") == "npy":
+            out = io.BytesIO()
+            np.save(out, images)
+            return self.respond(200, "application/octet-stream", out.getvalue())
+        encoded = [base64.b64encode(encode_png(image)).decode("ascii") for image in images]
+        self.respond(200, "application/json", json.dumps({"images": encoded}).encode("utf-8"))
+
+    def respond(self, status, content_type, data):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def http_server(gan_server, host="127.0.0.1", port=8080, socket=None):
+    """ An HTTP server for `gan_server` on host:port, or on the unix socket `socket` """
+    if socket is not None:
+        if os.path.exists(socket):
+            os.remove(socket)
+        server = ThreadingUnixHTTPServer(socket, GANRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), GANRequestHandler)
+    server.gan_server = gan_server
+    return server
+
+def load_test(url, requests=200, concurrency=8, images_per_request=1, seed=0):
+    """
+    Sends `requests` seed requests to `url` (such as http://127.0.0.1:8080) from `concurrency`
+    client threads.  Returns client side latency percentiles (milliseconds) and throughput.
+    """
+    pending = queue.Queue()
+    for i in range(requests):
+        pending.put(i)
+    latencies = []
+    errors = []
+
+    def _client():
+        while True:
+            try:
+                i = pending.get_nowait()
+            except queue.Empty:
+                return
+            seeds = [seed + i * images_per_request + j for j in range(images_per_request)]
+            body = json.dumps({"seeds": seeds, "format": "npy"}).encode("utf-8")
+            start = time.time()
+            try:
+                request = urllib.request.Request(url + "/generate", data=body, headers={"Content-Type": "application/json"})
+                urllib.request.urlopen(request).read()
+                latencies.append(time.time() - start)
+            except Exception as e:
+                errors.append(e)
+
+    start = time.time()
+    threads = [threading.Thread(target=_client) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    latencies = np.array(latencies) * 1000.
+    report = {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "requests_per_second": len(latencies) / elapsed,
+        "images_per_second": len(latencies) * images_per_request / elapsed
+    }
+    if len(latencies) > 0:
+        for p in [50, 95, 99]:
+            report["p%d_ms" % p] = float(np.percentile(latencies, p))
+    return report
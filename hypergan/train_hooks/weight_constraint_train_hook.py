@@ -12,172 +12,185 @@ import tensorflow as tf
 import hyperchamber as hc
 import inspect
 import numpy as np
+import time
 from hypergan.train_hooks.base_train_hook import BaseTrainHook
 
 class WeightConstraintTrainHook(BaseTrainHook):
+  """
+  Applies weight constraints (`ortho`, `ortho2`, `lipschitz`, `l2nn`, `l2nn-d`) every
+  `constraint_every` steps.
+
+  Variables are chosen by role (`roles`, default generator, discriminator and encoder), so
+  optimizer slots are never constrained.  Same-shaped variables are stacked and constrained
+  in one batched op, and each variable is read and assigned once per application, with its
+  constraints applied in order.
+
+  `constraint_every` is a step count or a dict from constraint name to step count, so cheap
+  constraints can run often and `ortho` rarely.  With `timing` set, the average time of each
+  cadence group is printed every `timing` applications.
+  """
+  CONSTRAINTS = ["ortho", "ortho2", "lipschitz", "l2nn", "l2nn-d"]
+
   def after_create(self):
     self.max = self.gan.configurable_param(self.config.max)
     self.decay = self.gan.configurable_param(self.config.decay)
-    allvars = self.gan.variables()
-    self.update_weight_constraints = [self._update_weight_constraint(v,i) for i,v in enumerate(allvars)]
-    self.update_weight_constraints = [v for v in self.update_weight_constraints if v is not None]
-
-  def _update_ortho(self,v,i):
-    s = self.gan.ops.shape(v)
-    if len(s) == 4 and s[0] == s[1]:
-      w=v
-      newv = []
-      #s = self.ops.shape(v_transpose)
-      #identity = tf.reshape(identity, [s[0],s[1],1,1])
-      #identity = tf.tile(identity, [1,1,s[2],s[3]])
-      w = tf.transpose(w, perm=[2,3,0,1])
-      for i in range(self.config.iterations or 3):
-          wt = tf.transpose(w, perm=[1,0,2,3])
-          w2 = tf.reshape(w,[-1, s[0],s[1]])
-          wt2 = tf.reshape(wt,[-1, s[0],s[1]])
-          wtw = tf.matmul(wt2,w2)
-          eye = tf.eye(s[0],s[1])
-          eye = tf.tile(eye, [1,s[2]*s[3]])
-          eye = tf.reshape(eye, self.gan.ops.shape(w))
-          wtw = tf.reshape(wtw, self.gan.ops.shape(w))
-          qk = eye - wtw
-          w = w * (eye + 0.5*qk)
-      w = tf.transpose(w, perm=[2,3,0,1])
-      newv = w
-      newv=(1.0+self.decay)*v - self.decay*(newv)
-      newv = tf.reshape(newv,self.ops.shape(v))
-      return tf.assign(v, newv)
-    else:
-      return None
-
-
-  def _update_ortho2(self,v,i):
-    if len(v.shape) == 4:
-      w=v
-      w = tf.transpose(w, perm=[2,3,0,1])
-      identity = tf.cast(tf.diag(np.ones(self.ops.shape(w)[0])), tf.float32)
-      wt = tf.transpose(w, perm=[1,0,2,3])
-      #s = self.ops.shape(v_transpose)
-      #identity = tf.reshape(identity, [s[0],s[1],1,1])
-      #identity = tf.tile(identity, [1,1,s[2],s[3]])
-      newv = tf.matmul(w, tf.matmul(wt,w))
-      newv = tf.reshape(newv,self.ops.shape(v))
-      newv = tf.transpose(newv, perm=[2,3,0,1])
-      newv=(1+self.decay)*v - self.decay*(newv)
-
-      return tf.assign(v, newv)
-    return None
-  def _update_lipschitz(self,v,i):
-    config = self.config
-    if len(v.shape) > 1:
-      k = self.config.weight_constraint_k or 100.0000
-      wi_hat = v
-      if len(v.shape) == 4:
-        #fij = tf.reduce_sum(tf.abs(wi_hat),  axis=[0,1])
-        fij = wi_hat
-        fij = tf.reduce_sum(tf.abs(fij),  axis=[1])
-        fij = tf.reduce_max(fij,  axis=[0])
-      else:
-        fij = wi_hat
+    self.timings = {}
+    roles = self.gan.variable_roles()
+    allowed = self.config.roles or ["generator", "discriminator", "encoder"]
+    variables = [v for v in self.gan.variables() if roles.role(v) in allowed]
 
-      if self.config.ortho_pnorm == "inf":
-        wp = tf.reduce_max(tf.reduce_sum(tf.abs(fij), axis=0), axis=0)
+    # cadence -> shape -> [(variables, [constraint, ...])]
+    cadences = {}
+    for constraint in (self.config.constraints or self.config.weight_constraint or []):
+      if constraint not in self.CONSTRAINTS:
+        print("[weight_constraint] Unknown constraint", constraint)
+        continue
+      every = self.cadence(constraint)
+      for v in variables:
+        if constraint == "l2nn-d" and roles.role(v) != "discriminator":
+          continue
+        shape = tuple(self.ops.shape(v))
+        if not self.applies(constraint, shape):
+          continue
+        groups = cadences.setdefault(every, {}).setdefault(shape, {})
+        groups.setdefault(v, []).append(constraint)
+
+    self.update_weight_constraints = {}
+    for every, shapes in cadences.items():
+      updates = []
+      for shape, constraints_by_var in shapes.items():
+        # variables with the same shape and the same constraint list share one batched op
+        batches = {}
+        for v, constraints in constraints_by_var.items():
+          batches.setdefault(tuple(constraints), []).append(v)
+        for constraints, vs in batches.items():
+          updates.append(self.fused_update(vs, constraints))
+      self.update_weight_constraints[every] = tf.group(*updates)
+      print("[weight_constraint] every %d steps: %d variables in %d fused ops" % (every, sum([len(c) for c in shapes.values()]), len(updates)))
+
+  def cadence(self, constraint):
+    every = self.config.constraint_every or 100
+    if hasattr(every, "get"):
+      return int(every.get(constraint, every.get("default", 100)))
+    return int(every)
+
+  def applies(self, constraint, s):
+    if constraint in ["ortho", "l2nn", "l2nn-d"]:
+      return len(s) == 4 and s[0] == s[1]
+    if constraint == "ortho2":
+      return len(s) == 4
+    if constraint == "lipschitz":
+      return len(s) > 1
+    return False
+
+  def fused_update(self, variables, constraints):
+    """ Stacks `variables` into one `[n] + shape` tensor, applies `constraints` in order and assigns the results back """
+    w = tf.stack([v.value() for v in variables])
+    s = self.ops.shape(variables[0])
+    for constraint in constraints:
+      if constraint == "ortho":
+        w = self._update_ortho(w, s)
+      elif constraint == "ortho2":
+        w = self._update_ortho2(w, s)
+      elif constraint == "lipschitz":
+        w = self._update_lipschitz(w, s)
       else:
-        # conv
-        wp = tf.reduce_max(tf.reduce_sum(tf.abs(fij), axis=1), axis=0)
-      ratio = (1.0/tf.maximum(1.0, wp/k))
-      
-      if self.config.weight_bounce:
-        bounce = tf.minimum(1.0, tf.ceil(wp/k-0.999))
-        ratio -= tf.maximum(0.0, bounce) * 0.2
-
-      if self.config.weight_scaleup:
-        up = tf.minimum(1.0, tf.ceil(0.02-wp/k))
-        ratio += tf.maximum(0.0, up) * k/wp * 0.2
-
-      wi = ratio*(wi_hat)
-      #self.gan.metrics['wi'+str(i)]=wp
-      #self.gan.metrics['wk'+str(i)]=ratio
-      #self.gan.metrics['bouce'+str(i)]=bounce
-      return tf.assign(v, wi)
-    return None
-
-  def _update_l2nn(self,v,i):
+        w = self._update_l2nn(w, s)
+    return tf.group(*[tf.assign(v, wi) for v, wi in zip(variables, tf.unstack(w))])
+
+  def _update_ortho(self,v,s):
+    w = tf.transpose(v, perm=[0,3,4,1,2])
+    wshape = [s[2],s[3],s[0],s[1]]
+    eye = tf.eye(s[0],s[1], dtype=v.dtype)
+    eye = tf.tile(eye, [1,s[2]*s[3]])
+    eye = tf.reshape(eye, wshape)
+    for i in range(self.config.iterations or 3):
+        wt = tf.transpose(w, perm=[0,2,1,3,4])
+        w2 = tf.reshape(w,[-1, s[0],s[1]])
+        wt2 = tf.reshape(wt,[-1, s[0],s[1]])
+        wtw = tf.matmul(wt2,w2)
+        wtw = tf.reshape(wtw, [-1] + wshape)
+        qk = eye - wtw
+        w = w * (eye + 0.5*qk)
+    newv = tf.transpose(w, perm=[0,3,4,1,2])
+    return (1.0+self.decay)*v - self.decay*(newv)
+
+  def _update_ortho2(self,v,s):
+    w = tf.transpose(v, perm=[0,3,4,1,2])
+    wt = tf.transpose(w, perm=[0,2,1,3,4])
+    newv = tf.matmul(w, tf.matmul(wt,w))
+    newv = tf.reshape(newv,[-1] + s)
+    newv = tf.transpose(newv, perm=[0,3,4,1,2])
+    return (1+self.decay)*v - self.decay*(newv)
+
+  def _update_lipschitz(self,v,s):
     config = self.config
-    s = self.gan.ops.shape(v)
-    if len(v.shape) == 4 and s[0] == s[1]:
-      w=v
-      wt = tf.transpose(w, perm=[1,0,2,3])
-      w2 = tf.reshape(w,[-1, s[0],s[1]])
-      wt2 = tf.reshape(wt,[-1, s[0],s[1]])
-      wtw = tf.matmul(wt2,w2)
-      wwt = tf.matmul(w2,wt2)
-      wtw = tf.reshape(wtw, [-1, self.ops.shape(v)[-1]])
-      wwt = tf.reshape(wwt, [-1, self.ops.shape(v)[-1]])
+    k = self.config.weight_constraint_k or 100.0000
+    wi_hat = v
+    if len(s) == 4:
+      fij = wi_hat
+      fij = tf.reduce_sum(tf.abs(fij),  axis=[2])
+      fij = tf.reduce_max(fij,  axis=[1])
+    else:
+      fij = wi_hat
+
+    if self.config.ortho_pnorm == "inf":
+      wp = tf.reduce_max(tf.reduce_sum(tf.abs(fij), axis=1), axis=1)
     else:
-      #w = v
-      #w = tf.reshape(w, [-1, self.ops.shape(v)[-1]])
-      #wt = tf.transpose(w)
-      #wtw = tf.matmul(wt,w)
-      #wwt = tf.matmul(w,wt)
-      return None
+      # conv
+      wp = tf.reduce_max(tf.reduce_sum(tf.abs(fij), axis=2), axis=1)
+    ratio = (1.0/tf.maximum(1.0, wp/k))
+
+    if self.config.weight_bounce:
+      bounce = tf.minimum(1.0, tf.ceil(wp/k-0.999))
+      ratio -= tf.maximum(0.0, bounce) * 0.2
+
+    if self.config.weight_scaleup:
+      up = tf.minimum(1.0, tf.ceil(0.02-wp/k))
+      ratio += tf.maximum(0.0, up) * k/wp * 0.2
+
+    # one ratio per stacked variable (per output channel for 3d weights)
+    ratio = tf.reshape(ratio, [self.ops.shape(v)[0]] + [1 for d in s[:-1]] + [-1])
+    return ratio*(wi_hat)
+
+  def _update_l2nn(self,v,s):
+    w=v
+    wt = tf.transpose(w, perm=[0,2,1,3,4])
+    w2 = tf.reshape(w,[-1, s[0],s[1]])
+    wt2 = tf.reshape(wt,[-1, s[0],s[1]])
+    wtw = tf.matmul(wt2,w2)
+    wwt = tf.matmul(w2,wt2)
+    n = self.ops.shape(v)[0]
+    wtw = tf.reshape(wtw, [n, -1, s[-1]])
+    wwt = tf.reshape(wwt, [n, -1, s[-1]])
     def _r(m):
-      s = self.ops.shape(m)
       m = tf.abs(m)
-      m = tf.reduce_sum(m, axis=0,keep_dims=True)
-      m = tf.reduce_max(m, axis=1,keep_dims=True)
-      #m = tf.tile(m,[s[0],s[1],1,1])
+      m = tf.reduce_sum(m, axis=1,keep_dims=True)
+      m = tf.reduce_max(m, axis=2,keep_dims=True)
       return m
     bw = tf.minimum(_r(wtw), _r(wwt))
-    #self.gan.add_metric('bw', tf.reduce_mean(bw))
-    #wi = v-(tf.sign(v)*bw)#
+    bw = tf.reshape(bw, [n] + [1 for d in s])
     wi = (v/bw)
     if self.decay is not None:
       wi = (1-self.decay)*v+(self.decay*wi)
-    wi = tf.reshape(wi, self.ops.shape(v))
-    return tf.assign(v, wi)
-
-  def _update_weight_constraint(self,v,i):
-    if "Adam" in v.name or "AMSGrad" in v.name or "RMS" in v.name or "Adadelta" in v.name:
-      print("> skipping(name)", v.name)
-      return None
+    return wi
 
-    config = self.config
-    #skipped = [gan.generator.ops.weights[0], gan.generator.ops.weights[-1], gan.discriminator.ops.weights[0], gan.discriminator.ops.weights[-1]]
-    #skipped = [gan.discriminator.ops.weights[-1]]
-    skipped=[]
-    for skip in skipped:
-      if self.ops.shape(v) == self.ops.shape(skip):
-        print("Skipping constraints on", v)
-        return None
-    constraints = self.config.constraints or self.config.weight_constraint or []
-    result = []
-    if "ortho" in constraints:
-      result.append(self._update_ortho(v,i))
-    if "ortho2" in constraints:
-      result.append(self._update_ortho2(v,i))
-    if "lipschitz" in constraints:
-      result.append(self._update_lipschitz(v,i))
-    if "l2nn" in constraints:
-      result.append(self._update_l2nn(v,i))
-    if "l2nn-d" in constraints:
-      if v in d_vars:
-        result.append(self._update_l2nn(v,i))
-    result = [r for r in result if r is not None]
-    if(len(result) == 0):
-      return None
-    return result
+  def apply_constraints(self, step, feed_dict):
+    for every, update in self.update_weight_constraints.items():
+      if step % every != 0:
+        continue
+      start = time.time()
+      self.gan.session.run(update, feed_dict)
+      count, total = self.timings.get(every, (0, 0.0))
+      count, total = count + 1, total + time.time() - start
+      self.timings[every] = (count, total)
+      if self.config.timing and count % int(self.config.timing) == 0:
+        print("[weight_constraint] every %d steps: %.1fms average over %d applications" % (every, total * 1000. / count, count))
 
   def before_step(self, step, feed_dict):
-    if self.config.order == "after":
-        pass
-    else:
-        if ((step % (self.config.constraint_every or 100)) == 0):
-            #print("Applying weight constraint (pre)")
-            self.gan.session.run(self.update_weight_constraints, feed_dict)
+    if self.config.order != "after":
+      self.apply_constraints(step, feed_dict)
 
   def after_step(self, step, feed_dict):
     if self.config.order == "after":
-        if ((step % (self.config.constraint_every or 100)) == 0):
-            #print("Applying weight constraint (post)")
-            self.gan.session.run(self.update_weight_constraints, feed_dict)
+      self.apply_constraints(step, feed_dict)
@@ -8,6 +8,17 @@ from hypergan.trainers.base_trainer import BaseTrainer
 TINY = 1e-12
 
 class AlternatingTrainer(BaseTrainer):
+    """
+    Steps D `d_update_steps` times, then G.
+
+    With `fused: true` all `d_update_steps` D updates and the G update run in a single
+    session.run on one input batch.  Each update after the first differentiates a copy of
+    the loss that reads the discriminator after the previous update, so the order and the
+    gradients are those of the unfused loop.  The discriminator's part of the forward pass
+    is built once more per extra update.
+    """
+    reports_metrics = True
+
     def _create(self):
         gan = self.gan
         config = self.config
@@ -24,8 +35,8 @@ class AlternatingTrainer(BaseTrainer):
         g_optimizer = self.gan.create_optimizer(g_optimizer)
         d_optimizer = self.gan.create_optimizer(d_optimizer)
         
-        d_grads = tf.gradients(d_loss, gan.trainable_d_vars())
-        g_grads = tf.gradients(g_loss, gan.trainable_g_vars())
+        d_grads = self.gradients(d_loss, gan.trainable_d_vars())
+        g_grads = self.gradients(g_loss, gan.trainable_g_vars())
         apply_vec_g = list(zip((g_grads), (gan.trainable_g_vars()))).copy()
         apply_vec_d = list(zip((d_grads), (gan.trainable_d_vars()))).copy()
         self.g_loss = g_loss
@@ -33,6 +44,18 @@ class AlternatingTrainer(BaseTrainer):
         self.gan.trainer = self
         g_optimizer_t = g_optimizer.apply_gradients(apply_vec_g, global_step=self.global_step)
         d_optimizer_t = d_optimizer.apply_gradients(apply_vec_d, global_step=self.global_step)
+        if config.fused:
+            # the first D update is d_optimizer_t, every later step reads the weights it left
+            update_t = d_optimizer_t
+            for i in range((config.d_update_steps or 1) - 1):
+                d_loss_i, d_reads = self.reread(d_loss, gan.trainable_d_vars(), update_t)
+                d_grads_i = self.gradients(d_loss_i, d_reads)
+                update_t = d_optimizer.apply_gradients(list(zip(d_grads_i, gan.trainable_d_vars())), global_step=self.global_step)
+            g_loss_i, _ = self.reread(g_loss, gan.trainable_d_vars(), update_t)
+            g_grads_i = self.gradients(g_loss_i, gan.trainable_g_vars())
+            self.fused_step_t = g_optimizer.apply_gradients(list(zip(g_grads_i, gan.trainable_g_vars())), global_step=self.global_step)
+        else:
+            self.fused_step_t = None
 
         self.d_optimizer = d_optimizer
         self.d_optimizer_t = d_optimizer_t
@@ -41,6 +64,16 @@ class AlternatingTrainer(BaseTrainer):
 
         return g_optimizer, d_optimizer
 
+    def reread(self, loss, variables, update_t):
+        """
+        A copy of `loss` that reads `variables` after `update_t` has run, and those reads.
+        Only the part of the graph downstream of the variables is copied.
+        """
+        with tf.control_dependencies([update_t]):
+            reads = [v.read_value() for v in variables]
+        loss = tf.contrib.graph_editor.graph_replace(loss, dict(zip([v.value() for v in variables], reads)))
+        return loss, reads
+
     def variables(self):
         return self.ops.variables() + self.d_optimizer.variables() + self.g_optimizer.variables()
 
@@ -48,18 +81,13 @@ class AlternatingTrainer(BaseTrainer):
         gan = self.gan
         sess = gan.session
         config = self.config
-        loss = gan.loss
-        metrics = gan.metrics()
-
-        d_loss, g_loss = loss.sample
 
         self.before_step(self.current_step, feed_dict)
-        for i in range(config.d_update_steps or 1):
-            sess.run([self.d_optimizer_t], feed_dict)
-
-        metric_values = sess.run([self.g_optimizer_t] + self.output_variables(metrics), feed_dict)[1:]
+        if self.fused_step_t is not None:
+            self.run_optimizer(self.fused_step_t, feed_dict)
+        else:
+            for i in range(config.d_update_steps or 1):
+                sess.run([self.d_optimizer_t], feed_dict)
+            self.run_optimizer(self.g_optimizer_t, feed_dict)
         self.after_step(self.current_step, feed_dict)
 
-        if self.current_step % 10 == 0:
-            print(str(self.output_string(metrics) % tuple([self.current_step] + metric_values)))
-
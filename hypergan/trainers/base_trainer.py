@@ -1,14 +1,21 @@
-from hypergan.gan_component import GANComponent
+from hypergan.gan_component import GANComponent, ValidationException
+from hypergan.trainers.metrics_reporter import PrintMetricsReporter
 import hyperchamber as hc
 import tensorflow as tf
 import inspect
 
 class BaseTrainer(GANComponent):
+    # trainers that send their metrics to `metrics_reporter`
+    reports_metrics = False
+
     def __init__(self, gan, config, d_vars=None, g_vars=None, name="BaseTrainer"):
         self.current_step = 0
         self.g_vars = g_vars
         self.d_vars = d_vars
         self.train_hooks = []
+        self.metrics_reporter = None
+        self.last_metrics = {}
+        self._callables = {}
         
         GANComponent.__init__(self, gan, config, name=name)
 
@@ -26,6 +33,7 @@ class BaseTrainer(GANComponent):
         self.global_step = tf.train.get_global_step()
         self.d_lr = d_lr
         self.g_lr = g_lr
+        self.metrics_reporter = (config.metrics_reporter or PrintMetricsReporter)(self)
         for hook_config in (config.hooks or []):
             hook_config = hc.lookup_functions(hook_config.copy())
             defn = {k: v for k, v in hook_config.items() if k in inspect.getargspec(hook_config['class']).args}
@@ -49,9 +57,47 @@ class BaseTrainer(GANComponent):
     def step(self, feed_dict={}):
         with self.gan.graph.as_default():
             step = self._step(feed_dict)
-        self.current_step += 1
+        self.current_step += self.steps_per_run()
         return step
 
+    def steps_per_run(self):
+        """ Optimizer steps taken by each call to `step`.  Trainers that support `steps_per_run` override this. """
+        return 1
+
+    def gradients(self, loss, var_list):
+        """
+        `tf.gradients` with static loss scaling.  With `loss_scale: N` the loss is multiplied by N before
+        differentiating and the gradients divided by N, which keeps small gradients from underflowing
+        when components compute in reduced precision (`compute_dtype`).
+        """
+        loss_scale = self.config.loss_scale
+        if not loss_scale:
+            return tf.gradients(loss, var_list)
+        grads = tf.gradients(loss * loss_scale, var_list)
+        return [None if grad is None else tf.cast(grad, var.dtype.base_dtype) / loss_scale for grad, var in zip(grads, var_list)]
+
+    def metrics_trainer(self):
+        """ This trainer or the trainer it wraps that reports metrics.  None if no trainer does """
+        trainer = self
+        while trainer is not None and not getattr(trainer, "reports_metrics", False):
+            trainer = getattr(trainer, "_delegate", None)
+        return trainer
+
+    def close(self):
+        """ Releases anything the trainer holds outside the graph, such as worker processes """
+        pass
+
+    def reject_loss_scale(self):
+        """ Trainers that compute their updates without `gradients` call this, so `loss_scale` is never silently ignored """
+        if self.config.loss_scale:
+            raise ValidationException(self.__class__.__name__ + " does not support loss_scale")
+
+    def create_delegate(self, defn, *args, **kw_args):
+        """ Creates the trainer this trainer wraps.  `loss_scale` is passed on unless the delegate sets its own """
+        if self.config.loss_scale and defn.get("loss_scale") is None:
+            defn = hc.Config(dict(defn, loss_scale=self.config.loss_scale))
+        return self.gan.create_component(defn, *args, **kw_args)
+
     def required(self):
         return "".split()
 
@@ -69,6 +115,54 @@ class BaseTrainer(GANComponent):
         return [metrics[k] for k in sorted(metrics.keys())]
 
 
+    def metrics_every(self):
+        """ How often metrics are fetched, in steps.  `metrics_every: 0` disables fetching. """
+        if self.config.metrics_every is None:
+            return 10
+        return self.config.metrics_every
+
+    def should_fetch_metrics(self):
+        every = self.metrics_every()
+        return every > 0 and self.current_step % every < self.steps_per_run()
+
+    def run_callable(self, fetches, feed_dict):
+        """
+        `session.run` through a cached `Session.make_callable`.  Skips the per call fetch and feed
+        processing, which dominates step time on small models.
+        """
+        key = (self._fetch_key(fetches), tuple(feed_dict.keys()))
+        if key not in self._callables:
+            self._callables[key] = self.gan.session.make_callable(fetches, feed_list=list(feed_dict.keys()))
+        return self._callables[key](*feed_dict.values())
+
+    def _fetch_key(self, fetches):
+        # list fetches are not hashable
+        if isinstance(fetches, (list, tuple)):
+            return (type(fetches),) + tuple(self._fetch_key(f) for f in fetches)
+        return fetches
+
+    def run_optimizer(self, optimize_t, feed_dict):
+        """
+        Runs `optimize_t`.  Metrics are only fetched (and reported) on `metrics_every` steps,
+        all other steps run just the optimizer op.
+
+        Returns the metric values or None if they were not fetched.
+        """
+        sess = self.gan.session
+        if not self.should_fetch_metrics():
+            self.run_callable(optimize_t, feed_dict)
+            return None
+
+        metrics = self.gan.metrics()
+        metric_values = sess.run([optimize_t] + self.output_variables(metrics), feed_dict)[1:]
+        self.report_metrics(metrics, metric_values)
+        return metric_values
+
+    def report_metrics(self, metrics, metric_values):
+        self.last_metrics = dict(zip(sorted(metrics.keys()), metric_values))
+        if self.metrics_reporter is not None:
+            self.metrics_reporter.report(self.current_step, self.last_metrics)
+
     def before_step(self, step, feed_dict):
         for component in self.train_hooks:
             component.before_step(step, feed_dict)
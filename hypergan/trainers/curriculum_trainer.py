@@ -18,7 +18,7 @@ class CurriculumTrainer(BaseTrainer):
     def create(self):
         self.curriculum = self.config.curriculum
         self.curriculum_index = 0
-        self._delegate = self.gan.create_component(self.config.delegate)
+        self._delegate = self.create_delegate(self.config.delegate)
 
     def variables(self):
         return self._delegate.variables()
@@ -17,7 +17,7 @@ class DepthTrainer(BaseTrainer):
         self.ema = [ tf.Variable(_v) for _v in variables ]
         self.store_v = [ _v.assign(_v2) for _v,_v2 in zip(self.ema, variables) ]
         self.combine = [ _v.assign((config.decay or 0.1) *_ema + (1.-(config.decay or 0.1))*_new) for _v, _ema, _new in zip(variables, self.ema, variables)]
-        self._delegate = self.gan.create_component(config.trainer, d_vars=self.d_vars, g_vars=self.g_vars)
+        self._delegate = self.create_delegate(config.trainer, d_vars=self.d_vars, g_vars=self.g_vars)
         self.reset_optimizer_t = tf.variables_initializer(self._delegate.variables())
         self.depth_step = 0
         self.fitness = -self.gan.loss.d_fake
@@ -37,8 +37,8 @@ class ConsensusTrainer(BaseTrainer):
         allloss = d_loss + g_loss
         allvars = d_vars + g_vars
 
-        d_grads = tf.gradients(d_loss, d_vars)
-        g_grads = tf.gradients(g_loss, g_vars)
+        d_grads = self.gradients(d_loss, d_vars)
+        g_grads = self.gradients(g_loss, g_vars)
 
         grads = d_grads + g_grads
 
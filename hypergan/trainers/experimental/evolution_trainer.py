@@ -9,6 +9,7 @@ TINY = 1e-12
 
 class EvolutionTrainer(BaseTrainer):
     def _create(self):
+        self.reject_loss_scale()
         gan = self.gan
         generator = self.gan.generator
         config = self.config
@@ -15,6 +15,7 @@ class MultiStepTrainer(BaseTrainer):
         BaseTrainer.__init__(self, gan, config)
 
     def _create(self):
+        self.reject_loss_scale()
         gan = self.gan
         config = self.config
         losses = self.losses
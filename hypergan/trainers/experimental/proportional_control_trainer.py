@@ -7,6 +7,7 @@ from hypergan.trainers.base_trainer import BaseTrainer
 class ProportionalControlTrainer(BaseTrainer):
 
     def _create(self):
+        self.reject_loss_scale()
         d_loss = gan.graph.d_loss
         g_loss = gan.graph.g_loss
         g_lr = np.float32(config.g_learn_rate)
@@ -17,7 +17,7 @@ class QualifiedStepTrainer(BaseTrainer):
         variables = self.gan.d_vars() + self.gan.g_vars()
         self.ema = [ tf.Variable(_v) for _v in variables ]
         self.store_v = [ _v.assign(_v2) for _v,_v2 in zip(self.ema, variables) ]
-        self._delegate = self.gan.create_component(config.trainer, d_vars=self.d_vars, g_vars=self.g_vars, loss=self.loss)
+        self._delegate = self.create_delegate(config.trainer, d_vars=self.d_vars, g_vars=self.g_vars, loss=self.loss)
         self._delegate.create()
         self.slot_vars_g = self._delegate.slot_vars_g
         self.slot_vars_d = self._delegate.slot_vars_g
@@ -24,7 +24,7 @@ class FitnessTrainer(BaseTrainer):
         loss = gan.loss
         d_vars = gan.d_vars()
         g_vars = gan.g_vars()
-        self._delegate = self.gan.create_component(config.trainer)
+        self._delegate = self.create_delegate(config.trainer)
         ftype = config.type
 
         if(ftype == 'fail2'):
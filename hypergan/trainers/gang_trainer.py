@@ -9,8 +9,13 @@ import sys
 import gc
 import os
 import random
+import time
 
+from hypergan.trainers import nash_solver
 from hypergan.trainers.base_trainer import BaseTrainer
+from hypergan.trainers.parallel_evaluator import ParallelEvaluator
+from hypergan.trainers.payoff_engine import PayoffEngine
+from hypergan.trainers.strategy_pool import StrategyPool
 
 TINY = 1e-12
 
@@ -26,7 +31,7 @@ class GangTrainer(BaseTrainer):
         self.priority_gs = []
 
 
-        self._delegate = self.gan.create_component(config.rbbr, d_vars=d_vars, g_vars=g_vars)
+        self._delegate = self.create_delegate(config.rbbr, d_vars=d_vars, g_vars=g_vars)
         self.optimizer = self._delegate
 
         print("VARS  ___", self.optimizer.variables())
@@ -160,21 +165,24 @@ class GangTrainer(BaseTrainer):
             shape = self.ops.shape(x)
             return tf.random_uniform(shape, minval=-0.01, maxval=0.01)
 
-        self.ug = None#gan.session.run(g_vars)
-        self.ud = None#gan.session.run(d_vars)
-        self.pg = [tf.zeros_like(v) for v in g_vars]
-        self._assign_g = [v.assign(pv) for v,pv in zip(g_vars, self.pg)]
-        self.pd = [tf.zeros_like(v) for v in d_vars]
-        self._assign_d = [v.assign(pv) for v,pv in zip(d_vars, self.pd)]
-        self.pm = tf.zeros([1])
-        self.assign_add_d = [v.assign(pv*self.pm+v) for v,pv in zip(d_vars, self.pd)]
-        self.assign_add_g = [v.assign(pv*self.pm+v) for v,pv in zip(g_vars, self.pg)]
+        # Strategies (sgs, sds, ug, ud) are ids into the on-device strategy pools
+        self.ug = None
+        self.ud = None
         self.mutate_g = [v.assign(random_like(v)+v) for v in d_vars]
         self.mutate_d = [v.assign(random_like(v)+v) for v in g_vars]
 
         self.sgs = []
         self.sds = []
 
+        # the memory, the candidate being added, the current mixture and one scratch copy
+        slots = config.pool_slots or (config.nash_memory_size or 10) + len(config.preload or []) + 3
+        self.g_pool = StrategyPool(g_vars, slots, spill=config.pool_spill, name="gang_g_strategies")
+        self.d_pool = StrategyPool(d_vars, slots, spill=config.pool_spill, name="gang_d_strategies")
+        self.payoff_engine = PayoffEngine(gan, self.g_pool, self.d_pool, test_points=config.fitness_test_points or 10)
+        self.parallel_evaluator = None
+        self.parallel_evaluations = 0
+        self.last_speedup = None
+
         self.last_fitness_step = 0
 
     def required(self):
@@ -190,25 +198,26 @@ class GangTrainer(BaseTrainer):
         return list(np.flip(ds, axis=0)) # most recent
 
     def destructive_mixture_g(self, priority_g):
-        g_vars = self.all_g_vars
-        self.gan.session.run(self._assign_g, {}) # zero
-        for i, s in enumerate(self.sgs):
-            self.add_g(priority_g[i], s)
-        return self.gan.session.run(g_vars)
+        """ Mixes the generator strategies into the live variables.  Returns None, meaning the live variables """
+        self.g_pool.mix(self.gan.session, self.sgs, priority_g)
+        return None
 
     def destructive_mixture_d(self, priority_d):
-        d_vars = self.all_d_vars
-        self.gan.session.run(self._assign_d, {}) # zero
-        for i, s in enumerate(self.sds):
-            self.add_d(priority_d[i], s)
-        return self.gan.session.run(d_vars)
+        self.d_pool.mix(self.gan.session, self.sds, priority_d)
+        return None
 
     def nash_memory(self, sg, sd, ug, ud):
-        is_sd_nan = np.isnan(np.sum(np.sum(v) for v in sg))
-        is_sg_nan = np.isnan(np.sum(np.sum(v) for v in sd))
+        """
+        Adds the strategies `sg` and `sd` to the memory and returns the (g, d) strategy ids to
+        continue training from.  None means the mixture already in the live variables.
+        """
+        is_sd_nan = self.g_pool.has_nan(self.gan.session, sg)
+        is_sg_nan = self.d_pool.has_nan(self.gan.session, sd)
 
         if is_sd_nan or is_sg_nan:
             print("NAN detected, falling back to best candidate")
+            self.g_pool.release(sg)
+            self.d_pool.release(sd)
             return [self.sgs[0], self.sds[0]]
         
         #zs = [ self.gan.session.run(self.gan.fitness_inputs()) for i in range(self.config.fitness_test_points or 10)]
@@ -221,8 +230,7 @@ class GangTrainer(BaseTrainer):
         self.sds = [sd] + self.sds
 
         if isinstance(self.gang_loss, list):
-            a = self.payoff_matrix(self.sgs, self.sds, xs, zs, self.gang_loss[0])
-            b = self.payoff_matrix(self.sgs, self.sds, xs, zs, self.gang_loss[1])
+            a, b = self.payoff_matrices(self.sgs, self.sds, self.gang_loss)
             print("Payoffa:", a)
             print("Payoffb:", b)
         else:
@@ -231,6 +239,14 @@ class GangTrainer(BaseTrainer):
             if np.min(a) == np.max(a) or np.isnan(np.sum(a)):
                 print("WARNING: Degenerate game, skipping")
                 print(a)
+                # the pools are fixed size, drop the oldest strategies past the memory size
+                memory_size = self.config.nash_memory_size or 10
+                for dropped in self.sgs[memory_size:]:
+                    self.g_pool.release(dropped)
+                for dropped in self.sds[memory_size:]:
+                    self.d_pool.release(dropped)
+                self.sgs = self.sgs[:memory_size]
+                self.sds = self.sds[:memory_size]
                 self.priority_ds = list(np.zeros(len(self.sds)))
                 self.priority_gs = list(np.zeros(len(self.sgs)))
                 return [ug, ud]
@@ -242,6 +258,8 @@ class GangTrainer(BaseTrainer):
 
         if is_a_nan or is_b_nan:
             print("NAN detected in payoff matrix, falling back to best candidate")
+            self.g_pool.release(self.sgs[0])
+            self.d_pool.release(self.sds[0])
             self.sgs = self.sgs[1:]
             self.sds = self.sds[1:]
             return [self.sgs[0], self.sds[0]]
@@ -269,26 +287,31 @@ class GangTrainer(BaseTrainer):
         self.priority_ds = [x[0] for x in sorted_sds]
         sorted_sds = [s[1] for s in sorted_sds]
         sorted_sgs = [s[1] for s in sorted_sgs]
+        for dropped in sorted_sgs[memory_size:]:
+            self.g_pool.release(dropped)
+        for dropped in sorted_sds[memory_size:]:
+            self.d_pool.release(dropped)
         self.sgs = sorted_sgs[:memory_size]
         self.sds = sorted_sds[:memory_size]
         self.priority_gs = self.priority_gs[:memory_size]
         self.priority_ds = self.priority_ds[:memory_size]
 
         if self.config.use_crossover:
-            new_ug = self.crossover(self.sgs[0],self.sgs[1])
-            new_ud = self.crossover(self.sds[0],self.sds[1])
+            new_ug = self.crossover(self.g_pool, self.sgs[0],self.sgs[1])
+            new_ud = self.crossover(self.d_pool, self.sds[0],self.sds[1])
 
+        usage = [self.g_pool.memory_usage(), self.d_pool.memory_usage()]
+        print("[gang] strategy pools: %d/%d strategies, %.1fMB device, %.1fMB spilled to host" % (
+            usage[0]["strategies"], usage[1]["strategies"],
+            sum([u["device_bytes"] for u in usage]) / 1e6,
+            sum([u["host_bytes"] for u in usage]) / 1e6))
 
         return [new_ug, new_ud]
 
-    def crossover(self, s1, s2):
-        strat = list(s1)
-        for i,layer in enumerate(s2):
-            mask = np.random.rand(*layer.shape)
-            if self.config.crossover_random == None:
-                mask = np.around(mask)
-            strat[i]=mask*layer + (1-mask)*strat[i]
-        return strat
+    def crossover(self, pool, s1, s2):
+        """ Crosses over strategies `s1` and `s2` into the live variables.  Returns None, meaning the live variables """
+        pool.crossover(self.gan.session, s1, s2, round_mask=self.config.crossover_random == None)
+        return None
 
     def softmax(self, x):
         e_x = np.exp(x - np.max(x))
@@ -309,7 +332,21 @@ class GangTrainer(BaseTrainer):
             result = self.destructive_mixture_d(p)
             return p, result
 
-        if self.config.nash_method == 'support':
+        nash_method = self.config.nash_method
+        if nash_method is None and len(sgs) > 10:
+            # enumeration grows combinatorially with the memory size
+            nash_method = 'regret_matching'
+
+        if nash_method in nash_solver.SOLVERS:
+            start = time.time()
+            warm_start = [[0] + list(self.priority_gs), [0] + list(self.priority_ds)]
+            u = nash_solver.solve(nash_method, payoffa, payoffb,
+                    iterations=config.nash_iterations or 1000,
+                    seconds=config.nash_seconds,
+                    warm_start=warm_start)
+            print("[gang] %s nash mixture in %.3fs, exploitability %.5f" % (nash_method, time.time() - start, nash_solver.exploitability(payoffa, payoffb, u[0], u[1])))
+
+        elif nash_method == 'support':
             try:
                 u = next(nash.Game(payoffa, payoffb).support_enumeration())
             except(StopIteration):
@@ -318,7 +355,7 @@ class GangTrainer(BaseTrainer):
                 u[0][0]=1.
                 u[1][0]=1.
 
-        elif self.config.nash_method == 'lemke':
+        elif nash_method == 'lemke':
             u = next(nash.Game(payoffa, payoffb).lemke_howson_enumeration())
 
         else:
@@ -345,12 +382,65 @@ class GangTrainer(BaseTrainer):
         return u
 
     def payoff_matrix(self, sgs, sds, xs, zs, method=None):
-        self._payoff_matrix = np.zeros([len(sgs), len(sds)])
-        result = self._payoff_matrix
-        for i, sg in enumerate(sgs):
-            for j, sd in enumerate(sds):
-                result[i, j]=self.fitness_score(sg, sd, xs, zs, method) # todo fitness ?
-        return result
+        self._payoff_matrix = self.payoff_matrices(sgs, sds, [method if method is not None else self.gang_loss])[0]
+        return self._payoff_matrix
+
+    def payoff_matrices(self, sgs, sds, methods):
+        """
+        Payoff matrices for each of `methods`, evaluated together by the PayoffEngine or, with
+        `parallel_workers` set, by a pool of worker processes.
+        """
+        if self.config.parallel_workers:
+            return self.parallel_payoff_matrices(sgs, sds, methods)
+        results = self.payoff_engine.payoff_matrices(sgs, sds, methods)
+        print("[gang] %dx%d payoff in %.2fs" % (len(sgs), len(sds), self.payoff_engine.last_seconds))
+        return results
+
+    def parallel_payoff_matrices(self, sgs, sds, methods):
+        """
+        The payoff matrices from the ParallelEvaluator.  The second matrix after the workers start
+        (the first warms them up) is also timed through the PayoffEngine, and the speedup is
+        reported as serial seconds over parallel seconds.  `parallel_speedup_every: N` repeats
+        the comparison every N matrices.
+        """
+        session = self.gan.session
+        engine = self.payoff_engine
+        if self.parallel_evaluator is None or self.parallel_evaluator.fetches != methods:
+            if self.parallel_evaluator is not None:
+                self.parallel_evaluator.close()
+            workers = None if self.config.parallel_workers is True else self.config.parallel_workers
+            self.parallel_evaluator = ParallelEvaluator(session.graph, [self.all_g_vars, self.all_d_vars], methods, [engine.x] + engine.latent, workers=workers)
+            self.parallel_evaluations = 0
+        start = time.time()
+        # each strategy is sent once, the workers pair them up
+        g_values = [self.g_pool.export(session, s) for s in sgs]
+        d_values = [self.d_pool.export(session, s) for s in sds]
+        scores = self.parallel_evaluator.evaluate([g_values, d_values], engine.evaluation_batch())
+        parallel_seconds = time.time() - start
+        print("[gang] %dx%d payoff in %.2fs on %d workers (%.1f workers busy)" % (len(sgs), len(sds), parallel_seconds, self.parallel_evaluator.workers, self.parallel_evaluator.last_utilization))
+        self.parallel_evaluations += 1
+        every = self.config.parallel_speedup_every
+        if self.parallel_evaluations == 2 or (every and self.parallel_evaluations % every == 0):
+            self.measure_speedup(sgs, sds, methods, parallel_seconds)
+        return [scores[:, :, i] for i in range(len(methods))]
+
+    def measure_speedup(self, sgs, sds, methods, parallel_seconds):
+        """ Evaluates the same matrix with the serial PayoffEngine and reports its time over `parallel_seconds` """
+        session = self.gan.session
+        # the engine leaves its last strategies assigned, the parallel path must not
+        live = self.all_g_vars + self.all_d_vars
+        values = session.run(live)
+        self.payoff_engine.payoff_matrices(sgs, sds, methods)
+        for v, value in zip(live, values):
+            v.load(value, session)
+        serial_seconds = self.payoff_engine.last_seconds
+        self.last_speedup = serial_seconds / max(parallel_seconds, 1e-9)
+        print("[gang] %dx%d payoff: serial %.2fs, parallel %.2fs, %.2fx speedup on %d workers" % (len(sgs), len(sds), serial_seconds, parallel_seconds, self.last_speedup, self.parallel_evaluator.workers))
+
+    def close(self):
+        if self.parallel_evaluator is not None:
+            self.parallel_evaluator.close()
+            self.parallel_evaluator = None
 
     def fitness_score(self, g, d, xs, zs, method=None):
         self.assign_gd(g,d)
@@ -359,7 +449,6 @@ class GangTrainer(BaseTrainer):
         if method == None:
             method = self.gang_loss
         for i in range(test_points):
-            df, dr = self.gan.session.run([self.gan.loss.d_fake, self.gan.loss.d_real])
             fitness = self.gan.session.run(method)
             sum_fitness += np.average(fitness)
         #for x, z in zip(xs, zs):
@@ -379,36 +468,26 @@ class GangTrainer(BaseTrainer):
         self.assign_g(g)
         self.assign_d(d)
 
+    def assign_values(self, g, d):
+        """ Loads host arrays `g` and `d` into the live variables """
+        session = self.gan.session
+        for pool, values in [[self.g_pool, g], [self.d_pool, d]]:
+            strategy = pool.upload(session, values)
+            pool.load(session, strategy)
+            pool.release(strategy)
+
     def assign_g(self, g):
-        fg = {}
-        for v, t in zip(g, self.pg):
-            fg[t] = v
-        self.gan.session.run(self._assign_g, fg)
+        """ Loads generator strategy `g` into the live variables.  None leaves them as they are """
+        if g is not None:
+            self.g_pool.load(self.gan.session, g)
 
     def assign_d(self, d):
-        fd = {}
-        for v, t in zip(d, self.pd):
-            fd[t] = v
-        self.gan.session.run(self._assign_d, fd)
-
-    def add_g(self, pm, g):
-        fg = {}
-        for v, t in zip(g, self.pg):
-            fg[t] = v
-        fg[self.pm] = np.reshape(pm, [1])
-        self.gan.session.run(self.assign_add_g, fg)
-
-    def add_d(self, pm, d):
-        fd = {}
-        for v, t in zip(d, self.pd):
-            fd[t] = v
-        fd[self.pm] = np.reshape(pm, [1])
-
-        self.gan.session.run(self.assign_add_d, fd)
+        if d is not None:
+            self.d_pool.load(self.gan.session, d)
 
     def train_g_on_sds(self):
         gan = self.gan
-        cd = gan.session.run(self._delegate.d_vars)
+        cd = self.d_pool.snapshot(gan.session)
         gl = np.zeros(self._delegate.g_loss.shape)
         dl = np.zeros(self._delegate.d_loss.shape)
         for i,sd in enumerate(self.sds):
@@ -426,10 +505,11 @@ class GangTrainer(BaseTrainer):
             feed_dict[t]=v
         _ = gan.session.run([self._delegate.g_optimizer], feed_dict)
         self.assign_d(cd)
+        self.d_pool.release(cd)
 
     def train_d_on_sgs(self):
         gan = self.gan
-        cg = gan.session.run(self._delegate.g_vars)
+        cg = self.g_pool.snapshot(gan.session)
         for i,sg in enumerate(self.sgs):
             p= self.priority_gs[i]
             if(p == 0):
@@ -440,6 +520,7 @@ class GangTrainer(BaseTrainer):
             print("Train strategy", i, "P", p, "GL", _gl, "DL", _dl)
 
         self.assign_g(cg)
+        self.g_pool.release(cg)
 
   
     def _step(self, feed_dict):
@@ -452,10 +533,10 @@ class GangTrainer(BaseTrainer):
         g_vars = self.all_g_vars
         
         if self.ug == None:
-            self.ug = gan.session.run(g_vars)
-            self.ud = gan.session.run(d_vars)
-            self.sgs.append(self.ug)
-            self.sds.append(self.ud)
+            self.ug = self.g_pool.snapshot(sess)
+            self.ud = self.d_pool.snapshot(sess)
+            self.sgs.append(self.g_pool.snapshot(sess))
+            self.sds.append(self.d_pool.snapshot(sess))
             self.priority_gs = [1]
             self.priority_ds = [1]
             if self.config.preload:
@@ -467,10 +548,8 @@ class GangTrainer(BaseTrainer):
                     if not self.gan.load(save_file):
                         sys.exit("Could not load " + save_file)
                     print("Assigning to sds")
-                    preload_ug = gan.session.run(g_vars)
-                    preload_ud = gan.session.run(d_vars)
-                    self.sgs.append(preload_ug)
-                    self.sds.append(preload_ud)
+                    self.sgs.append(self.g_pool.snapshot(sess))
+                    self.sds.append(self.d_pool.snapshot(sess))
                     self.priority_gs += [0]
                     self.priority_ds += [0]
  
@@ -488,18 +567,27 @@ class GangTrainer(BaseTrainer):
         self.last_fitness_step=self._delegate.current_step
         #print("Step", self._delegate.current_step+1)
         if (gan.step_count+1) % (config.mix_steps or 100) == 0:
-            sg = gan.session.run(g_vars)
-            sd = gan.session.run(d_vars)
+            sg = self.g_pool.snapshot(sess)
+            sd = self.d_pool.snapshot(sess)
             if config.nash_memory:
                 print("ENAMBLING NASH MEM", len(self.sgs))
                 ug, ud = self.nash_memory(sg, sd, self.ug, self.ud)
                 print("/ENAMBLING NASH MEM", len(self.sgs))
             else:
                 decay = config.decay or 0.5
-                ug = [ (o*decay + n*(1-decay)) for o, n in zip(sg, self.ug) ]
-                ud = [ (o*decay + n*(1-decay)) for o, n in zip(sd, self.ud) ]
+                self.g_pool.blend(sess, self.ug, decay)
+                self.d_pool.blend(sess, self.ud, decay)
+                self.g_pool.release(sg)
+                self.d_pool.release(sd)
+                ug, ud = None, None
 
             if config.recreate:
+                # the pools belong to this graph, carry the strategies over on the host
+                g_strategies = [self.g_pool.export(sess, s) for s in self.sgs]
+                d_strategies = [self.d_pool.export(sess, s) for s in self.sds]
+                self.assign_gd(ug, ud)
+                ug, ud = sess.run([self.all_g_vars, self.all_d_vars])
+                self.close()
                 gan.train_coordinator.request_stop()
                 gan.train_coordinator.join(gan.input_threads)
                 gan.session.close()
@@ -527,8 +615,8 @@ class GangTrainer(BaseTrainer):
                 newgan.cli = self.gan.cli
                 newgan.cli.sampler = None
                 gan.cli.sampler = None
-                newgan.trainer.sds = self.sds
-                newgan.trainer.sgs = self.sgs
+                newgan.trainer.sgs = [newgan.trainer.g_pool.upload(newgan.session, values) for values in g_strategies]
+                newgan.trainer.sds = [newgan.trainer.d_pool.upload(newgan.session, values) for values in d_strategies]
                 newgan.train_coordinator = tf.train.Coordinator()
                 self.sds = None
                 self.sgs = None
@@ -553,7 +641,7 @@ class GangTrainer(BaseTrainer):
                 gan=None
                 gc.collect()
                 newgan.input_threads = tf.train.start_queue_runners(sess=newgan.session, coord=newgan.train_coordinator)
-                newgan.trainer.assign_gd(ug, ud)
+                newgan.trainer.assign_values(ug, ud)
                 return
 
             self.assign_gd(ug, ud)
@@ -562,8 +650,10 @@ class GangTrainer(BaseTrainer):
                 print("Mutating child")
                 self.gan.session.run([self.mutate_d, self.mutate_g])
 
-            self.ug = gan.session.run(self.all_g_vars)
-            self.ud = gan.session.run(self.all_d_vars)
+            self.g_pool.release(self.ug)
+            self.d_pool.release(self.ud)
+            self.ug = self.g_pool.snapshot(sess)
+            self.ud = self.d_pool.snapshot(sess)
             if self.current_step < (config.reset_before_step or 0):
                 gan.session.run(tf.global_variables_initializer())
 
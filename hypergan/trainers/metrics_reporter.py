@@ -0,0 +1,32 @@
+class MetricsReporter:
+    """
+    Receives metric values fetched by a trainer.
+
+    Trainers only fetch metrics every `metrics_every` steps.  Set `metrics_reporter`
+    in the trainer config to a subclass to route them somewhere else.
+    """
+    def __init__(self, trainer):
+        self.trainer = trainer
+
+    def report(self, step, metrics):
+        """
+            step:int the trainer step the metrics were fetched on
+            metrics:dict metric name : value
+        """
+        pass
+
+class PrintMetricsReporter(MetricsReporter):
+    """ Prints metrics to stdout.  This is the default reporter. """
+    def report(self, step, metrics):
+        values = [metrics[k] for k in sorted(metrics.keys())]
+        print(str(self.trainer.output_string(metrics) % tuple([step] + values)))
+
+class HistoryMetricsReporter(PrintMetricsReporter):
+    """ Prints metrics and keeps every report in `self.history` as (step, metrics) """
+    def __init__(self, trainer):
+        super().__init__(trainer)
+        self.history = []
+
+    def report(self, step, metrics):
+        self.history.append((step, dict(metrics)))
+        super().report(step, metrics)
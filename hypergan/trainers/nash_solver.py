@@ -0,0 +1,85 @@
+import time
+import numpy as np
+from hypergan.gan_component import ValidationException
+
+def normalize(p, size):
+    """ `p` as a probability vector of length `size`, uniform when it is missing or sums to zero """
+    if p is None:
+        return np.ones([size]) / size
+    p = np.maximum(np.reshape(np.asarray(p, dtype=np.float64), [-1]), 0)
+    if len(p) != size or p.sum() <= 0:
+        return np.ones([size]) / size
+    return p / p.sum()
+
+def exploitability(payoff_a, payoff_b, x, y):
+    """ How much the row and column players could gain in total by deviating from (x, y).  0 at a Nash equilibrium """
+    return (np.max(payoff_a.dot(y)) - x.dot(payoff_a).dot(y)) + (np.max(x.dot(payoff_b)) - x.dot(payoff_b).dot(y))
+
+def regret_matching(payoff_a, payoff_b, iterations=1000, seconds=None, warm_start=None, tolerance=1e-4, check_every=50):
+    """
+    Regret matching+ with linearly weighted averaging.  The row player maximizes `payoff_a`,
+    the column player `payoff_b`.  Converges to a Nash equilibrium for zero-sum games.
+
+    Stops after `iterations`, after `seconds`, or once the exploitability of the average
+    strategies is below `tolerance`.  `warm_start` is a (row, column) mixture pair, such as
+    the previous solution.  Returns (row mixture, column mixture).
+    """
+    n, m = payoff_a.shape
+    warm_start = warm_start or [None, None]
+    x = normalize(warm_start[0], n)
+    y = normalize(warm_start[1], m)
+    regret_x = x.copy()
+    regret_y = y.copy()
+    average_x = x.copy()
+    average_y = y.copy()
+    total_weight = 1.0
+    start = time.time()
+    for t in range(1, iterations + 1):
+        ux = payoff_a.dot(y)
+        regret_x = np.maximum(regret_x + ux - x.dot(ux), 0)
+        x = normalize(regret_x, n)
+        uy = x.dot(payoff_b)
+        regret_y = np.maximum(regret_y + uy - uy.dot(y), 0)
+        y = normalize(regret_y, m)
+
+        average_x += (t + 1) * x
+        average_y += (t + 1) * y
+        total_weight += t + 1
+        if t % check_every == 0:
+            if exploitability(payoff_a, payoff_b, average_x / total_weight, average_y / total_weight) < tolerance:
+                break
+            if seconds is not None and time.time() - start > seconds:
+                break
+    return average_x / total_weight, average_y / total_weight
+
+def fictitious_play(payoff_a, payoff_b, iterations=1000, seconds=None, warm_start=None, tolerance=1e-4, check_every=50):
+    """
+    Fictitious play: each player best responds to the empirical mixture of the other.  Takes
+    the same budgets and warm start as `regret_matching`.
+    """
+    n, m = payoff_a.shape
+    warm_start = warm_start or [None, None]
+    counts_x = normalize(warm_start[0], n)
+    counts_y = normalize(warm_start[1], m)
+    start = time.time()
+    for t in range(1, iterations + 1):
+        x = counts_x / counts_x.sum()
+        y = counts_y / counts_y.sum()
+        counts_x[np.argmax(payoff_a.dot(y))] += 1
+        counts_y[np.argmax(x.dot(payoff_b))] += 1
+        if t % check_every == 0:
+            if exploitability(payoff_a, payoff_b, counts_x / counts_x.sum(), counts_y / counts_y.sum()) < tolerance:
+                break
+            if seconds is not None and time.time() - start > seconds:
+                break
+    return counts_x / counts_x.sum(), counts_y / counts_y.sum()
+
+SOLVERS = {
+    "regret_matching": regret_matching,
+    "fictitious_play": fictitious_play
+}
+
+def solve(method, payoff_a, payoff_b, **kwargs):
+    if method not in SOLVERS:
+        raise ValidationException("Unknown nash solver '" + str(method) + "'.  Choose one of " + ", ".join(sorted(SOLVERS.keys())))
+    return SOLVERS[method](np.asarray(payoff_a, dtype=np.float64), np.asarray(payoff_b, dtype=np.float64), **kwargs)
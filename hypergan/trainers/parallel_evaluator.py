@@ -0,0 +1,173 @@
+import itertools
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import numpy as np
+import tensorflow as tf
+
+def send(stream, obj):
+    pickle.dump(obj, stream, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.flush()
+
+class ParallelEvaluator:
+    """
+    ParallelEvaluator scores combinations of candidate weight sets in a pool of worker processes.
+
+    Each worker is a separate python process holding its own session and a copy of the graph,
+    imported from a MetaGraphDef of `graph`.  `groups` is a list of variable lists, such as
+    `[g_vars, d_vars]`.  `evaluate` scores every combination of one candidate per group on the
+    same `batch` (a list of value lists for `feeds`), as the mean of each of `fetches` over the batch.
+
+    Every candidate is sent to each worker once per `evaluate`, the workers then receive only
+    the indexes of the combinations to score and reassign a group only when its candidate changes.
+
+    Workers run on the CPU with one thread each.  Each is a full tensorflow process with its
+    own copy of the graph, so `workers` defaults to a small fixed number.
+    """
+    DEFAULT_WORKERS = 2
+
+    def __init__(self, graph, groups, fetches, feeds, workers=None):
+        self.workers = workers or self.DEFAULT_WORKERS
+        self.groups = groups
+        self.fetches = fetches
+        self.feeds = feeds
+        self.last_seconds = None
+        self.last_utilization = None
+
+        meta_graph = tf.train.export_meta_graph(graph=graph, clear_devices=True).SerializeToString()
+        setup = (meta_graph, [[v.op.name for v in variables] for variables in groups], [t.name for t in fetches], [t.name for t in feeds])
+        env = dict(os.environ)
+        env["CUDA_VISIBLE_DEVICES"] = ""
+        self.processes = []
+        for i in range(self.workers):
+            process = subprocess.Popen([sys.executable, "-m", "hypergan.trainers.parallel_evaluator"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+            send(process.stdin, setup)
+            self.processes.append(process)
+        print("[evaluator] Started", self.workers, "evaluation workers")
+
+    def evaluate(self, candidates, batch):
+        """
+        `candidates` holds a list of candidate value lists for each group.  Returns a
+        `[len(candidates[0]), ..., len(candidates[-1]), len(fetches)]` array of scores.
+        """
+        start = time.time()
+        shape = [len(c) for c in candidates]
+        combinations = list(itertools.product(*[range(n) for n in shape]))
+        tasks = queue.Queue()
+        for i in range(len(combinations)):
+            tasks.put(i)
+        results = [None for c in combinations]
+        errors = []
+
+        def _dispatch(process):
+            try:
+                send(process.stdin, ("candidates", candidates, batch))
+            except IOError as e:
+                errors.append("Evaluation worker exited: " + str(e))
+                return
+            while len(errors) == 0:
+                try:
+                    i = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    send(process.stdin, ("score", combinations[i]))
+                    status, result = pickle.load(process.stdout)
+                except (EOFError, IOError) as e:
+                    errors.append("Evaluation worker exited: " + str(e))
+                    return
+                if status == "error":
+                    errors.append(result)
+                    return
+                results[i] = result
+
+        threads = [threading.Thread(target=_dispatch, args=(process,)) for process in self.processes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if len(errors) > 0:
+            raise Exception("[evaluator] " + errors[0])
+
+        self.last_seconds = time.time() - start
+        # busy worker seconds per second of wall time, GangTrainer measures the speedup over the PayoffEngine
+        work_seconds = sum([seconds for scores, seconds in results])
+        self.last_utilization = work_seconds / max(self.last_seconds, 1e-9)
+        return np.reshape(np.array([scores for scores, seconds in results]), shape + [len(self.fetches)])
+
+    def close(self):
+        for process in self.processes:
+            try:
+                send(process.stdin, None)
+                process.stdin.close()
+            except IOError:
+                pass
+            process.wait()
+        self.processes = []
+
+class EvaluationWorker:
+    """ The worker side of ParallelEvaluator """
+    def __init__(self, meta_graph, group_names, fetch_names, feed_names):
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            meta_graph_def = tf.MetaGraphDef()
+            meta_graph_def.ParseFromString(meta_graph)
+            tf.train.import_meta_graph(meta_graph_def)
+            variables = dict([(v.op.name, v) for v in tf.global_variables() + tf.local_variables()])
+            self.groups = [[variables[name] for name in names] for names in group_names]
+            self.values = [[tf.placeholder(v.dtype.base_dtype, v.get_shape()) for v in group] for group in self.groups]
+            self.assigns = [tf.group(*[tf.assign(v, value) for v, value in zip(group, values)]) for group, values in zip(self.groups, self.values)]
+            self.fetches = [self.graph.get_tensor_by_name(name) for name in fetch_names]
+            self.feeds = [self.graph.get_tensor_by_name(name) for name in feed_names]
+            config = tf.ConfigProto(intra_op_parallelism_threads=1, inter_op_parallelism_threads=1)
+            self.session = tf.Session(graph=self.graph, config=config)
+            self.session.run(tf.global_variables_initializer())
+        self.candidates = None
+        self.batch = None
+        self.loaded = None
+
+    def set_candidates(self, candidates, batch):
+        self.candidates = candidates
+        self.batch = batch
+        self.loaded = [None for group in self.groups]
+
+    def score(self, indexes):
+        start = time.time()
+        for group, index in enumerate(indexes):
+            if self.loaded[group] != index:
+                self.session.run(self.assigns[group], dict(zip(self.values[group], self.candidates[group][index])))
+                self.loaded[group] = index
+        total = np.zeros([len(self.fetches)])
+        for point in self.batch:
+            total += [np.average(v) for v in self.session.run(self.fetches, dict(zip(self.feeds, point)))]
+        return total / float(len(self.batch)), time.time() - start
+
+def worker_main():
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    # stdout carries results, send prints to stderr
+    sys.stdout = sys.stderr
+    worker = EvaluationWorker(*pickle.load(stdin))
+    while True:
+        try:
+            task = pickle.load(stdin)
+        except EOFError:
+            return
+        if task is None:
+            return
+        if task[0] == "candidates":
+            # no reply, the scores that follow report any error
+            worker.set_candidates(*task[1:])
+            continue
+        try:
+            send(stdout, ("ok", worker.score(*task[1:])))
+        except Exception:
+            send(stdout, ("error", traceback.format_exc()))
+
+if __name__ == "__main__":
+    worker_main()
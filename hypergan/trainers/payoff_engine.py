@@ -0,0 +1,87 @@
+import time
+import numpy as np
+import tensorflow as tf
+
+class PayoffEngine:
+    """
+    PayoffEngine evaluates the GANG payoff matrix of generator strategies against
+    discriminator strategies.
+
+    * One evaluation batch (`test_points` batches of x and latent samples) is drawn per matrix
+      and shared by every pair.
+    * Strategies are swapped in from `StrategyPool`s on the device, each generator and each
+      discriminator once per matrix.
+    * The generator and the methods are copied once per test point, reading that point from
+      stacked placeholders.  Each generator strategy is one `session.run` for the samples of
+      every test point, and each cell one discriminator-only `session.run` averaging the
+      methods over all of them.
+    """
+    def __init__(self, gan, g_pool, d_pool, test_points=10):
+        self.gan = gan
+        self.g_pool = g_pool
+        self.d_pool = d_pool
+        self.test_points = test_points
+        self.sample = gan.generator.sample
+        self.latent = gan.fitness_inputs() if hasattr(gan, "fitness_inputs") else [gan.latent.sample]
+        self.x = gan.inputs.x
+        self.last_seconds = None
+        self.points = None
+        self.samples = None
+        self.methods = {}
+
+    def create_points(self):
+        """ `[test_points] + shape` placeholders for x, the latent and the generator samples, and the per point samples """
+        def _stacked(t):
+            return tf.placeholder(t.dtype.base_dtype, [self.test_points] + t.get_shape().as_list())
+        self.points = [_stacked(t) for t in [self.x] + self.latent]
+        self.stacked_sample = _stacked(self.sample)
+        samples = [self.replace(self.sample, i, [self.x] + self.latent) for i in range(self.test_points)]
+        self.samples = tf.stack(samples)
+
+    def replace(self, target, i, sources):
+        """ A copy of `target` reading test point `i` of the stacked placeholders for `sources` """
+        stacked = dict(zip([self.x] + self.latent + [self.sample], self.points + [self.stacked_sample]))
+        return tf.contrib.graph_editor.graph_replace(target, dict([(t, stacked[t][i]) for t in sources]))
+
+    def batched_methods(self, methods):
+        """ The mean of each of `methods` over every test point, built once per list of methods """
+        key = tuple([m.name for m in methods])
+        if key not in self.methods:
+            # the generator is not copied, its samples are fed
+            sources = [self.x, self.sample]
+            copies = [self.replace(methods, i, sources) for i in range(self.test_points)]
+            self.methods[key] = [tf.reduce_mean(tf.stack([tf.reduce_mean(copy[j]) for copy in copies])) for j in range(len(methods))]
+        return self.methods[key]
+
+    def evaluation_batch(self):
+        session = self.gan.session
+        return [session.run([self.x] + self.latent) for i in range(self.test_points)]
+
+    def payoff_matrices(self, g_strategies, d_strategies, methods):
+        """
+        Returns one `[len(g_strategies), len(d_strategies)]` matrix per tensor in `methods`.  Each entry
+        is the mean of the method over the evaluation batch.  Leaves the last evaluated
+        strategies assigned, callers restore the strategy they want afterwards.
+        """
+        start = time.time()
+        session = self.gan.session
+        if self.points is None:
+            self.create_points()
+        batched = self.batched_methods(methods)
+        batch = self.evaluation_batch()
+        feed_dict = dict([(p, np.stack([point[i] for point in batch])) for i, p in enumerate(self.points)])
+
+        samples = []
+        for g_strategy in g_strategies:
+            self.g_pool.load(session, g_strategy)
+            samples.append(session.run(self.samples, feed_dict))
+
+        results = [np.zeros([len(g_strategies), len(d_strategies)]) for method in methods]
+        for j, d_strategy in enumerate(d_strategies):
+            self.d_pool.load(session, d_strategy)
+            for i in range(len(g_strategies)):
+                feed_dict[self.stacked_sample] = samples[i]
+                for result, value in zip(results, session.run(batched, feed_dict)):
+                    result[i, j] = value
+        self.last_seconds = time.time() - start
+        return results
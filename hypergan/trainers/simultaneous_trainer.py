@@ -8,7 +8,15 @@ from hypergan.trainers.base_trainer import BaseTrainer
 TINY = 1e-12
 
 class SimultaneousTrainer(BaseTrainer):
-    """ Steps G and D simultaneously """
+    """
+    Steps G and D simultaneously
+
+    `steps_per_run: N` runs N optimizer steps per `step` call.  Train hooks and metrics
+    are only run at the boundaries.  The steps are still N cached session calls, each with
+    its own forward pass, so this amortizes the Python side of a step, not the session.run.
+    """
+    reports_metrics = True
+
     def _create(self):
         gan = self.gan
         config = self.config
@@ -26,8 +34,8 @@ class SimultaneousTrainer(BaseTrainer):
         d_vars = self.d_vars or self.gan.d_vars()
         g_vars = self.g_vars or self.gan.g_vars()
 
-        d_grads = tf.gradients(d_loss, d_vars)
-        g_grads = tf.gradients(g_loss, g_vars)
+        d_grads = self.gradients(d_loss, d_vars)
+        g_grads = self.gradients(g_loss, g_vars)
         apply_vec = list(zip((d_grads + g_grads), (d_vars + g_vars))).copy()
         self.gan.gradient_mean = sum([tf.reduce_mean(tf.abs(grad)) for grad in d_grads+g_grads])/len(d_grads+g_grads)
         self.g_loss = g_loss
@@ -41,19 +49,13 @@ class SimultaneousTrainer(BaseTrainer):
     def required(self):
         return "".split()
 
-    def _step(self, feed_dict):
-        gan = self.gan
-        sess = gan.session
-        config = self.config
-        loss = gan.loss
-        metrics = gan.metrics()
-
-        d_loss, g_loss = loss.sample
+    def steps_per_run(self):
+        return self.config.steps_per_run or 1
 
+    def _step(self, feed_dict):
         self.before_step(self.current_step, feed_dict)
-        metric_values = sess.run([self.optimize_t] + self.output_variables(metrics), feed_dict)[1:]
+        for i in range(self.steps_per_run() - 1):
+            self.run_callable(self.optimize_t, feed_dict)
+        self.run_optimizer(self.optimize_t, feed_dict)
         self.after_step(self.current_step, feed_dict)
 
-        if self.current_step % 10 == 0:
-            print(str(self.output_string(metrics) % tuple([self.current_step] + metric_values)))
-
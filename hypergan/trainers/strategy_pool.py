@@ -0,0 +1,183 @@
+import zlib
+import numpy as np
+import tensorflow as tf
+from hypergan.gan_component import ValidationException
+
+class StrategyPool:
+    """
+    StrategyPool keeps snapshots ("strategies") of `variables` on the device.
+
+    Each variable gets a non-trainable `[slots] + shape` stack.  Snapshotting, swapping a
+    strategy into the live variables, mixing, blending and crossover are graph ops, so
+    weights only cross the host boundary when they are exported or spilled.  The stacks are
+    local variables and are not saved with the model.
+
+    Strategies are referred to by integer ids.  With `spill` set, when every device slot is
+    in use the least recently used strategy is zlib compressed to host memory and brought
+    back when it is needed.
+    """
+    def __init__(self, variables, slots, spill=False, name="strategy_pool"):
+        self.variables = list(variables)
+        self.slots = slots
+        self.spill = spill
+        self.next_id = 0
+        self.clock = 0
+        self.resident = {}  # id -> device slot
+        self.spilled = {}   # id -> compressed host arrays
+        self.last_used = {}
+        self.free_slots = list(range(slots))
+        self.initialized = False
+
+        self.slot = tf.placeholder(tf.int32, [], name=name+"_slot")
+        self.other_slot = tf.placeholder(tf.int32, [], name=name+"_other_slot")
+        self.weights = tf.placeholder(tf.float32, [slots], name=name+"_weights")
+        self.decay = tf.placeholder(tf.float32, [], name=name+"_decay")
+        self.round_mask = tf.placeholder_with_default(True, [], name=name+"_round_mask")
+        with tf.variable_scope(name + "_dontsave"):
+            self.stacks = [tf.get_variable("stack_%d" % i, [slots] + v.get_shape().as_list(), dtype=v.dtype.base_dtype,
+                    initializer=tf.zeros_initializer(), trainable=False, collections=[tf.GraphKeys.LOCAL_VARIABLES])
+                    for i, v in enumerate(self.variables)]
+        self.values = [tf.placeholder(v.dtype.base_dtype, v.get_shape()) for v in self.variables]
+        self.initializer = tf.variables_initializer(self.stacks)
+
+        pairs = list(zip(self.variables, self.stacks))
+        self.store_op = tf.group(*[tf.scatter_update(s, [self.slot], tf.expand_dims(v, 0)) for v, s in pairs])
+        self.upload_op = tf.group(*[tf.scatter_update(s, [self.slot], tf.expand_dims(value, 0)) for s, value in zip(self.stacks, self.values)])
+        self.load_op = tf.group(*[v.assign(s[self.slot]) for v, s in pairs])
+        self.export_t = [s[self.slot] for s in self.stacks]
+        self.has_nan_t = tf.reduce_any([tf.reduce_any(tf.is_nan(s[self.slot])) for s in self.stacks if s.dtype.is_floating])
+        self.zero_op = tf.group(*[v.assign(tf.zeros_like(v)) for v in self.variables if v.dtype.base_dtype.is_floating])
+        self.mix_add_op = tf.group(*[v.assign_add(self.weighted_sum(s)) for v, s in pairs if v.dtype.base_dtype.is_floating])
+        self.blend_op = tf.group(*[v.assign(self.interpolate(v, s[self.slot], self.decay)) for v, s in pairs if v.dtype.base_dtype.is_floating])
+        self.crossover_op = tf.group(*[v.assign(self.crossover_mask(s[self.slot], s[self.other_slot])) for v, s in pairs])
+
+    def weighted_sum(self, stack):
+        return tf.tensordot(tf.cast(self.weights, stack.dtype), stack, axes=1)
+
+    def interpolate(self, a, b, decay):
+        decay = tf.cast(decay, a.dtype)
+        return a * decay + b * (1 - decay)
+
+    def crossover_mask(self, a, b):
+        if not a.dtype.is_floating:
+            return a
+        mask = tf.random_uniform(tf.shape(a), dtype=a.dtype)
+        rounded = tf.cast(self.round_mask, a.dtype)
+        mask = rounded * tf.round(mask) + (1 - rounded) * mask
+        return mask * b + (1 - mask) * a
+
+    def init(self, session):
+        if not self.initialized:
+            session.run(self.initializer)
+            self.initialized = True
+
+    def allocate_slot(self, session, pinned=[]):
+        if len(self.free_slots) > 0:
+            return self.free_slots.pop(0)
+        candidates = [i for i in self.resident if i not in pinned]
+        if not self.spill or len(candidates) == 0:
+            raise ValidationException("Strategy pool is full (" + str(self.slots) + " slots).  Increase the pool size or enable spilling.")
+        victim = min(candidates, key=lambda i: self.last_used[i])
+        slot = self.resident.pop(victim)
+        values = session.run(self.export_t, {self.slot: slot})
+        self.spilled[victim] = [(v.shape, v.dtype, zlib.compress(v.tobytes(), 1)) for v in values]
+        return slot
+
+    def touch(self, strategy):
+        self.clock += 1
+        self.last_used[strategy] = self.clock
+
+    def ensure_resident(self, session, strategy, pinned=[]):
+        """ Returns the device slot of `strategy`, restoring it from host memory if it was spilled """
+        self.init(session)
+        self.touch(strategy)
+        if strategy in self.resident:
+            return self.resident[strategy]
+        if strategy not in self.spilled:
+            raise ValidationException("Unknown strategy " + str(strategy))
+        slot = self.allocate_slot(session, pinned + [strategy])
+        values = [np.frombuffer(zlib.decompress(data), dtype=dtype).reshape(shape) for shape, dtype, data in self.spilled.pop(strategy)]
+        self.upload_slot(session, slot, values)
+        self.resident[strategy] = slot
+        return slot
+
+    def upload_slot(self, session, slot, values):
+        feed_dict = dict(zip(self.values, values))
+        feed_dict[self.slot] = slot
+        session.run(self.upload_op, feed_dict)
+
+    def new_strategy(self, session):
+        self.init(session)
+        strategy = self.next_id
+        self.next_id += 1
+        self.resident[strategy] = self.allocate_slot(session)
+        self.touch(strategy)
+        return strategy
+
+    def snapshot(self, session):
+        """ Stores the live variables as a new strategy and returns its id """
+        strategy = self.new_strategy(session)
+        session.run(self.store_op, {self.slot: self.resident[strategy]})
+        return strategy
+
+    def upload(self, session, values):
+        """ Stores host arrays `values` as a new strategy and returns its id """
+        strategy = self.new_strategy(session)
+        self.upload_slot(session, self.resident[strategy], values)
+        return strategy
+
+    def export(self, session, strategy):
+        """ Host arrays of `strategy` """
+        return session.run(self.export_t, {self.slot: self.ensure_resident(session, strategy)})
+
+    def release(self, strategy):
+        if strategy in self.resident:
+            self.free_slots.append(self.resident.pop(strategy))
+        self.spilled.pop(strategy, None)
+        self.last_used.pop(strategy, None)
+
+    def load(self, session, strategy):
+        """ Assigns `strategy` to the live variables """
+        session.run(self.load_op, {self.slot: self.ensure_resident(session, strategy)})
+
+    def has_nan(self, session, strategy):
+        return session.run(self.has_nan_t, {self.slot: self.ensure_resident(session, strategy)})
+
+    def mix(self, session, strategies, weights):
+        """ Sets the live variables to the weighted sum of `strategies` """
+        self.init(session)
+        session.run(self.zero_op)
+        pending = [(s, w) for s, w in zip(strategies, weights) if w != 0]
+        while len(pending) > 0:
+            vector = np.zeros([self.slots], dtype=np.float32)
+            remaining = []
+            for strategy, weight in pending:
+                if strategy in self.resident or len(vector.nonzero()[0]) == 0:
+                    vector[self.ensure_resident(session, strategy)] = weight
+                else:
+                    remaining.append((strategy, weight))
+            session.run(self.mix_add_op, {self.weights: vector})
+            pending = remaining
+
+    def blend(self, session, strategy, decay):
+        """ Sets the live variables to `live * decay + strategy * (1 - decay)` """
+        session.run(self.blend_op, {self.slot: self.ensure_resident(session, strategy), self.decay: decay})
+
+    def crossover(self, session, a, b, round_mask=True):
+        """ Sets the live variables to a random per-weight mix of strategies `a` and `b` """
+        slot_a = self.ensure_resident(session, a, [b])
+        slot_b = self.ensure_resident(session, b, [a])
+        session.run(self.crossover_op, {self.slot: slot_a, self.other_slot: slot_b, self.round_mask: round_mask})
+
+    def nbytes(self):
+        return sum([int(np.prod(stack.get_shape().as_list())) * stack.dtype.size for stack in self.stacks])
+
+    def memory_usage(self):
+        """ Device bytes reserved by the stacks and compressed host bytes of spilled strategies """
+        return {
+            "strategies": len(self.resident) + len(self.spilled),
+            "resident": len(self.resident),
+            "spilled": len(self.spilled),
+            "device_bytes": self.nbytes(),
+            "host_bytes": sum([sum([len(data) for shape, dtype, data in arrays]) for arrays in self.spilled.values()])
+        }
@@ -0,0 +1,45 @@
+# Hashed variable membership for optimizers, trainers and train hooks
+import tensorflow as tf
+
+ROLES = ["latent", "encoder", "generator", "discriminator"]
+
+class VariableRoles:
+    """
+    VariableRoles indexes the variables of a GAN by role: `generator`, `discriminator`,
+    `encoder`, `latent` or `other`.
+
+    `d_vars` and `g_vars` are sets, so `var in roles.d_vars` is O(1).  The trainable lists keep
+    the order of `gan.d_vars()` and `gan.g_vars()`.  Build it with `gan.variable_roles()`, which
+    caches it until components or variables are added.
+    """
+    def __init__(self, gan):
+        d_vars = gan.d_vars()
+        g_vars = gan.g_vars()
+        self.d_vars = set(d_vars)
+        self.g_vars = set(g_vars)
+        self.roles = {}
+        for role in ROLES:
+            component = getattr(gan, role, None)
+            if component is not None and hasattr(component, "variables"):
+                for v in component.variables():
+                    self.roles.setdefault(v, role)
+        for v in d_vars:
+            self.roles.setdefault(v, "discriminator")
+        for v in g_vars:
+            self.roles.setdefault(v, "generator")
+
+        trainable = set(tf.trainable_variables())
+        self.trainable_d_vars = unique([v for v in d_vars if v in trainable])
+        self.trainable_g_vars = unique([v for v in g_vars if v in trainable])
+
+    def role(self, var):
+        return self.roles.get(var, "other")
+
+def unique(variables):
+    seen = set()
+    result = []
+    for v in variables:
+        if v not in seen:
+            seen.add(v)
+            result.append(v)
+    return result
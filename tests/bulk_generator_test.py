@@ -0,0 +1,29 @@
+import os
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+from hypergan.bulk_generator import BulkGenerator, to_pixels
+from hypergan.inputs.image_pack import ImagePack
+from tests.mocks import mock_gan
+
+class BulkGeneratorTest(tf.test.TestCase):
+    def test_to_pixels(self):
+        self.assertAllEqual(to_pixels(np.array([-2., -1., 0., 1.])), [0, 0, 128, 255])
+
+    def test_generate_files(self):
+        with self.test_session():
+            gan = mock_gan(batch_size=2)
+            output = tempfile.mkdtemp()
+            BulkGenerator(gan, workers=2).generate(5, output, format="png", seed=1)
+            self.assertEqual(sorted(os.listdir(output)), ["%08d.png" % i for i in range(5)])
+
+    def test_generate_pack(self):
+        with self.test_session():
+            gan = mock_gan(batch_size=2)
+            output = os.path.join(tempfile.mkdtemp(), "generated.pack")
+            BulkGenerator(gan).generate(3, output, seed=1, pack=True)
+            self.assertEqual(ImagePack(output).count, 3)
+
+if __name__ == "__main__":
+    tf.test.main()
@@ -0,0 +1,23 @@
+import os
+import tempfile
+import tensorflow as tf
+from hypergan.checkpoint_manager import CheckpointManager, latest_checkpoint
+from tests.mocks import mock_gan
+
+class CheckpointManagerTest(tf.test.TestCase):
+    def test_save_and_rotate(self):
+        with self.test_session():
+            gan = mock_gan()
+            gan.session.run(tf.global_variables_initializer())
+            save_file = os.path.join(tempfile.mkdtemp(), "model.ckpt")
+            manager = CheckpointManager(gan, save_file, keep=2)
+            for i in range(3):
+                gan.session.run(gan.increment_step)
+                self.assertTrue(manager.save())
+            manager.close()
+            self.assertEqual(latest_checkpoint(save_file), save_file + "-3")
+            self.assertFalse(os.path.isfile(save_file + "-1.index"))
+            self.assertTrue(gan.load(save_file))
+
+if __name__ == "__main__":
+    tf.test.main()
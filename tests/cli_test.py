@@ -25,8 +25,21 @@ class CliTest(tf.test.TestCase):
             gan = mock_gan()
             args = hc.Config({"size": "1"})
             cli = hg.CLI(gan, args)
+            self.assertEqual(cli.writer, None)
             cli.run()
             self.assertEqual(cli.gan, gan)
+            self.assertEqual(cli.writer, None)
+
+    def test_sample_writer_closed(self):
+        with self.test_session():
+            gan = mock_gan()
+            args = hc.Config({"size": "1", "steps": 1, "method": "train", "save_every": -1})
+            cli = hg.CLI(gan, args)
+            cli.sample('/tmp/test-sample.png')
+            writer = cli.writer
+            self.assertNotEqual(writer, None)
+            cli.close_writer()
+            self.assertFalse(writer.thread.is_alive())
 
     def test_step(self):
         with self.test_session():
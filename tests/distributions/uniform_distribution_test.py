@@ -56,6 +56,16 @@ class UniformDistributionTest(tf.test.TestCase):
         with self.test_session():
             projections = subject.create()
             self.assertEqual(int(projections.get_shape()[1]), len(config['projections'])*config['z'])
- 
+
+    def test_numpy_sample(self):
+        with self.test_session():
+            # `min: 0` falls back to -1, the same range the graph draws from
+            self.assertEqual(distribution.bounds(), (-1, 1))
+            a = distribution.numpy_sample([3, 2], np.random.RandomState(1))
+            b = distribution.numpy_sample([3, 2], np.random.RandomState(1))
+            self.assertAllEqual(a, b)
+            self.assertEqual(a.dtype, np.float32)
+            self.assertTrue(np.all(a >= -1) and np.all(a <= 1))
+
 if __name__ == "__main__":
     tf.test.main()
@@ -10,5 +10,17 @@ class GanTest(tf.test.TestCase):
         config = hg.Configuration.load('default.json')
         self.assertIs(type(mock_gan(config=config)), hg.gans.standard_gan.StandardGAN)
 
+    def test_variable_roles(self):
+        with self.test_session():
+            gan = mock_gan()
+            roles = gan.variable_roles()
+            self.assertIs(roles, gan.variable_roles())
+            d_var = gan.discriminator.variables()[0]
+            self.assertIn(d_var, roles.d_vars)
+            self.assertNotIn(d_var, roles.g_vars)
+            self.assertEqual(roles.role(d_var), "discriminator")
+            self.assertEqual(roles.role(gan.global_step), "other")
+            self.assertEqual(set(gan.trainable_d_vars()), set(gan.d_vars()).intersection(tf.trainable_variables()))
+
 if __name__ == "__main__":
     tf.test.main()
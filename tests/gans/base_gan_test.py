@@ -6,6 +6,8 @@ from hypergan.search.default_configurations import DefaultConfigurations
 from hypergan.gans.base_gan import BaseGAN
 from hypergan.generators.resizable_generator import ResizableGenerator
 import hypergan as hg
+import os
+import tempfile
 import tensorflow as tf
 import hyperchamber as hc
 import numpy as np
@@ -17,6 +19,17 @@ from tests.mocks import MockDiscriminator, mock_gan, MockInput
 default_config = hg.Configuration.default()
 
 class BaseGanTest(tf.test.TestCase):
+    def test_rebuild_seconds(self):
+        with self.test_session():
+            gan = mock_gan()
+            save_file = os.path.join(tempfile.mkdtemp(), "model.ckpt")
+            gan.save(save_file)
+            # components write tensors into their config, the source config stays plain
+            self.assertNotIn("loss", gan.source_config["trainer"]["optimizer"])
+            self.assertGreater(gan.rebuild_seconds(save_file), 0)
+            with self.assertRaises(ValidationException):
+                gan.rebuild_seconds(os.path.join(tempfile.mkdtemp(), "missing.ckpt"))
+
     def test_constructor(self):
         with self.test_session():
             gan = BaseGAN(inputs = MockInput())
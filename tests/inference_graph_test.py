@@ -0,0 +1,54 @@
+import os
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+from hypergan.inference_graph import freeze_inference_graph, load_inference_graph, compare_latency, random_feed
+
+class InferenceGraphTest(tf.test.TestCase):
+    def test_freeze_and_load(self):
+        with self.test_session() as sess:
+            z = tf.reshape(tf.random_uniform([2, 3]), [2, 3], name="z")
+            w = tf.Variable(tf.ones([3, 4]))
+            y = tf.matmul(z, w, name="y")
+            loss = tf.reduce_mean(y)
+            train = tf.train.GradientDescentOptimizer(0.1).minimize(loss)
+            sess.run(tf.global_variables_initializer())
+
+            graph_def = freeze_inference_graph(sess, [z], [y])
+            ops = set([node.op for node in graph_def.node])
+            self.assertNotIn("VariableV2", ops)
+            self.assertNotIn("ApplyGradientDescent", ops)
+
+            path = os.path.join(tempfile.mkdtemp(), "frozen.pb")
+            with open(path, "wb") as f:
+                f.write(graph_def.SerializeToString())
+            frozen, inputs, outputs = load_inference_graph(path, ["z"], ["y"])
+            value = np.ones([2, 3], dtype=np.float32)
+            self.assertAllClose(frozen.run(outputs, {inputs[0]: value})[0], sess.run(y, {z: value}))
+            frozen.close()
+
+            report = compare_latency(sess, [z], [y], path, runs=2)
+            self.assertIn("frozen_startup", report)
+
+    def test_unknown_dimensions(self):
+        with self.test_session() as sess:
+            z = tf.placeholder(tf.float32, [None, 3], name="z")
+            unknown = tf.placeholder(tf.float32, [None, None], name="unknown")
+            w = tf.Variable(tf.ones([3, 4]))
+            y = tf.matmul(z, w, name="y")
+            sess.run(tf.global_variables_initializer())
+
+            feed_dict = random_feed([z, unknown], batch_size=2)
+            self.assertEqual(list(feed_dict.keys()), [z])
+            self.assertEqual(feed_dict[z].shape, (2, 3))
+
+            graph_def = freeze_inference_graph(sess, [z], [y])
+            path = os.path.join(tempfile.mkdtemp(), "frozen.pb")
+            with open(path, "wb") as f:
+                f.write(graph_def.SerializeToString())
+            report = compare_latency(sess, [z], [y], path, runs=2, batch_size=2)
+            self.assertIn("frozen_latency", report)
+
+if __name__ == "__main__":
+    tf.test.main()
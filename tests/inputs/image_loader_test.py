@@ -1,5 +1,8 @@
 import hypergan as hg
+import numpy as np
 import tensorflow as tf
+import tempfile
+from PIL import Image
 from hypergan.gan_component import ValidationException
 from hypergan.inputs.image_loader import ImageLoader
 import os
@@ -61,5 +64,52 @@ class ImageLoaderTest(tf.test.TestCase):
             loader.create(fixture_path('white'), width=4, height=4, format='png')
             self.assertEqual(loader.file_count, 1)
 
+    def test_load_fixture_pipeline_options(self):
+        with self.test_session():
+            loader = ImageLoader(1)
+            loader.create(fixture_path(), width=4, height=4, format='png', resize=True, parallel_calls=2, prefetch=2, shuffle_buffer=1, interleave=2)
+            self.assertEqual(int(loader.x.get_shape()[1]), 4)
+            self.assertEqual(loader.input_wait, None)
+
+    def test_load_fixture_input_stats(self):
+        with self.test_session() as sess:
+            loader = ImageLoader(1)
+            loader.create(fixture_path(), width=4, height=4, format='png', resize=True, input_stats=True)
+            sess.run(loader.x)
+            self.assertEqual(loader.input_wait.count, 1)
+
+    def test_load_fixture_multiple_formats(self):
+        with self.test_session():
+            loader = ImageLoader(1)
+            loader.create(fixture_path(), width=4, height=4, format='jpg,png', resize=True)
+            self.assertEqual(loader.file_count, 2)
+            self.assertEqual(int(loader.x.get_shape()[1]), 4)
+
+    def test_load_fixture_all_formats(self):
+        with self.test_session():
+            loader = ImageLoader(1)
+            loader.create(fixture_path(), width=4, height=4, format='all', resize=True)
+            self.assertEqual(loader.file_count, 2)
+
+    def test_decode_mixed_formats(self):
+        directory = tempfile.mkdtemp()
+        Image.new('RGB', (4, 4), (255, 255, 255)).save(os.path.join(directory, 'white.png'))
+        Image.new('RGB', (4, 4), (0, 0, 0)).save(os.path.join(directory, 'black.jpg'))
+        with self.test_session() as sess:
+            loader = ImageLoader(1)
+            parse = loader.image_parser(channels=3, format='jpg,png', width=4, height=4)
+            filename = tf.placeholder(tf.string, [])
+            image = parse(filename)
+            white = sess.run(image, {filename: os.path.join(directory, 'white.png')})
+            black = sess.run(image, {filename: os.path.join(directory, 'black.jpg')})
+            self.assertEqual(white.shape, (4, 4, 3))
+            self.assertAllClose(white, np.full([4, 4, 3], 255.), atol=2)
+            self.assertAllClose(black, np.zeros([4, 4, 3]), atol=2)
+
+    def test_load_unknown_format(self):
+        with self.assertRaises(ValidationException):
+            loader = ImageLoader(1)
+            loader.create(fixture_path(), width=4, height=4, format='tiff')
+
 if __name__ == "__main__":
     tf.test.main()
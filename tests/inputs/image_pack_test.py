@@ -0,0 +1,51 @@
+import hypergan as hg
+import tensorflow as tf
+import tempfile
+import os
+from hypergan.gan_component import ValidationException
+from hypergan.inputs.image_loader import ImageLoader
+import numpy as np
+from hypergan.inputs.image_pack import ImagePack, PackWriter, pack_directory
+from tests.inputs.image_loader_test import fixture_path
+
+class ImagePackTest(tf.test.TestCase):
+    def pack(self, **kw_args):
+        output = os.path.join(tempfile.mkdtemp(), "fixtures.pack")
+        return pack_directory(fixture_path(), output=output, width=4, height=4, resize=True, format='png', **kw_args)
+
+    def test_pack(self):
+        pack = ImagePack(self.pack())
+        self.assertEqual(pack.count, 2)
+        self.assertEqual(pack.shape(), [4, 4, 3])
+        self.assertEqual(list(pack.gather([1, 0]).shape), [2, 4, 4, 3])
+
+    def test_pack_shards(self):
+        pack = ImagePack(self.pack(shard_size=1))
+        self.assertEqual(len(pack.shards), 2)
+        self.assertEqual(list(pack.gather([1, 0]).shape), [2, 4, 4, 3])
+
+    def test_pack_writer(self):
+        output = os.path.join(tempfile.mkdtemp(), "written.pack")
+        writer = PackWriter(output, 5, 2, 2, 1, shard_size=2)
+        writer.write(np.zeros([3, 2, 2, 1], dtype=np.uint8))
+        writer.write(np.ones([2, 2, 2, 1], dtype=np.uint8))
+        writer.close(source="test")
+        pack = ImagePack(output)
+        self.assertEqual(pack.count, 5)
+        self.assertEqual(len(pack.shards), 3)
+        self.assertAllEqual(pack.gather([2, 3])[:, 0, 0, 0], [0, 1])
+
+    def test_load_pack(self):
+        with self.test_session():
+            loader = ImageLoader(2)
+            loader.create(self.pack(), width=4, height=4)
+            self.assertEqual(loader.file_count, 2)
+            self.assertEqual(int(loader.x.get_shape()[1]), 4)
+
+    def test_load_pack_wrong_size(self):
+        with self.assertRaises(ValidationException):
+            loader = ImageLoader(2)
+            loader.create(self.pack(), width=8, height=8)
+
+if __name__ == "__main__":
+    tf.test.main()
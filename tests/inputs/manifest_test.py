@@ -0,0 +1,67 @@
+import tensorflow as tf
+import tempfile
+import shutil
+import os
+import time
+import numpy as np
+from PIL import Image
+from unittest.mock import patch
+from hypergan.inputs.manifest import Manifest
+from tests.inputs.image_loader_test import fixture_path
+
+class ManifestTest(tf.test.TestCase):
+    def dataset(self):
+        directory = os.path.join(tempfile.mkdtemp(), "data")
+        shutil.copytree(fixture_path(), directory)
+        return directory
+
+    def test_dataset_files(self):
+        directory = self.dataset()
+        files = Manifest(directory).dataset_files('png')
+        self.assertEqual(files, [directory+"/black/image.png", directory+"/white/image.png"])
+        self.assertTrue(os.path.isfile(os.path.join(directory, Manifest.FILENAME)))
+
+    def test_dimensions(self):
+        directory = self.dataset()
+        manifest = Manifest(directory)
+        manifest.dataset_files('png')
+        description = manifest.scan("black")["files"]["image.png"]
+        self.assertNotEqual(description["width"], None)
+        self.assertNotEqual(description["height"], None)
+
+    def test_incremental(self):
+        directory = self.dataset()
+        Manifest(directory).dataset_files('png')
+        shutil.copyfile(os.path.join(directory, "white/image.png"), os.path.join(directory, "white/image2.png"))
+        files = Manifest(directory).dataset_files('png')
+        self.assertEqual(len(files), 3)
+
+    def test_rewritten_in_place(self):
+        directory = self.dataset()
+        white = os.path.join(directory, "white")
+        settled = time.time() - 100
+        os.utime(white, (settled, settled))
+        Manifest(directory).dataset_files('png')
+        Image.fromarray(np.zeros([5, 7, 3], dtype=np.uint8)).save(os.path.join(white, "image.png"))
+        os.utime(white, (settled, settled))
+        manifest = Manifest(directory)
+        manifest.dataset_files('png')
+        description = manifest.scan("white")["files"]["image.png"]
+        self.assertEqual((description["width"], description["height"]), (7, 5))
+
+    def test_read_only_dataset(self):
+        directory = self.dataset()
+        cache = tempfile.mkdtemp()
+        with patch.dict(os.environ, {"XDG_CACHE_HOME": cache}), patch("os.access", return_value=False):
+            manifest = Manifest(directory)
+            manifest.dataset_files('png')
+        self.assertTrue(manifest.path.startswith(cache))
+        self.assertTrue(os.path.isfile(manifest.path))
+        self.assertFalse(os.path.isfile(os.path.join(directory, Manifest.FILENAME)))
+
+    def test_format(self):
+        directory = self.dataset()
+        self.assertEqual(Manifest(directory).dataset_files('jpg'), [])
+
+if __name__ == "__main__":
+    tf.test.main()
@@ -0,0 +1,28 @@
+import tensorflow as tf
+from hypergan.gan_component import ValidationException
+from hypergan.layer_spec import layer_spec, ParamExpression
+
+class LayerSpecTest(tf.test.TestCase):
+    def test_parse(self):
+        spec = layer_spec("conv 64 stride=2 gain=0.5 activation=null")
+        self.assertEqual(spec.op, "conv")
+        self.assertEqual(spec.args, (64,))
+        self.assertEqual(dict(spec.options), {"stride": 2, "gain": 0.5, "activation": "null"})
+
+    def test_param_expression(self):
+        spec = layer_spec("linear 1 lambda=decay(range=1:0 steps=100)")
+        self.assertEqual(dict(spec.options)["lambda"], ParamExpression("decay(range=1:0 steps=100)"))
+
+    def test_cached(self):
+        self.assertIs(layer_spec("linear 32"), layer_spec("linear 32"))
+
+    def test_unknown_op(self):
+        with self.assertRaises(ValidationException):
+            layer_spec("lienar 32", {"linear": None})
+
+    def test_unbalanced(self):
+        with self.assertRaises(ValidationException):
+            layer_spec("linear 1 lambda=decay(range=1:0")
+
+if __name__ == "__main__":
+    tf.test.main()
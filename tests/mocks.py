@@ -4,8 +4,8 @@ import hypergan as hg
 
 from hypergan.gan_component import GANComponent
 
-def mock_gan(batch_size=1, y=1, config=None):
-    mock_config = config or hc.Config({
+def mock_config():
+    return hc.Config({
         "latent": {
             "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
             "max": 1,
@@ -53,7 +53,50 @@ def mock_gan(batch_size=1, y=1, config=None):
 
         }
     })
-    return hg.GAN(config=mock_config, inputs=MockInput(batch_size=batch_size, y=y))
+
+def mock_gan(batch_size=1, y=1, config=None):
+    return hg.GAN(config=config or mock_config(), inputs=MockInput(batch_size=batch_size, y=y))
+
+def mock_gang_gan(batch_size=1):
+    """ A mock gan trained by a GangTrainer with a nash memory of 2 """
+    config = hc.Config({
+        "latent": {
+            "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
+            "max": 1,
+            "min": -1,
+            "projections": [
+              "function:hypergan.distributions.uniform_distribution.identity"
+            ],
+            "z": 16
+        },
+        "generator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "defaults": {"activation": "tanh", "initializer": "he_normal"},
+            "layers": ["linear 32*32*1 activation=null"]
+        },
+        "discriminator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "defaults": {"activation": "tanh", "initializer": "he_normal"},
+            "layers": ["linear 1 activation=null"]
+        },
+        "loss": {
+            "class": "function:hypergan.losses.ragan_loss.RaganLoss",
+            "reduce": "reduce_mean"
+        },
+        "trainer": {
+            "class": "function:hypergan.trainers.gang_trainer.GangTrainer",
+            "nash_memory": True,
+            "nash_memory_size": 2,
+            "rbbr": {
+                "class": "function:hypergan.trainers.alternating_trainer.AlternatingTrainer",
+                "optimizer": {
+                    "class": "function:tensorflow.python.training.adam.AdamOptimizer",
+                    "learn_rate": 1e-4
+                }
+            }
+        }
+    })
+    return mock_gan(batch_size=batch_size, config=config)
 
 class MockDiscriminator(GANComponent):
     def create(self):
@@ -1,6 +1,7 @@
 import tensorflow as tf
 import hypergan as hg
 from hypergan.ops.tensorflow.ops import TensorflowOps
+from hypergan.ops.tensorflow.sn import shared_spectral_normed_weight
 
 from unittest.mock import MagicMock
 
@@ -36,6 +37,40 @@ class OpsTest(tf.test.TestCase):
         with self.test_session():
             self.assertEqual(ops.parse_dtype('float32'), tf.float32)
 
+    def test_compute_dtype(self):
+        with self.test_session():
+            mixed = TensorflowOps({"compute_dtype": "float16"})
+            net = mixed.linear(tf.constant(1., shape=[1, 3]), 2)
+            self.assertEqual(net.dtype, tf.float16)
+            self.assertEqual(mixed.weights[-1].dtype.base_dtype, tf.float32)
+            self.assertEqual(mixed.cast_output(net).dtype, tf.float32)
+
+    def test_shared_spectral_norm(self):
+        with tf.Graph().as_default(), self.test_session():
+            sn = TensorflowOps({"layer_regularizer": "spectral_norm"})
+            net = tf.constant(1., shape=[1, 4, 4, 2])
+            a = sn.conv2d(net, 3, 3, 1, 1, 2)
+            sn.reuse()
+            b = sn.conv2d(net, 3, 3, 1, 1, 2)
+            sn.stop_reuse()
+            u = [v for v in tf.global_variables() if v.op.name.endswith("/u")][0]
+            # the initializer assign lives under the variable's own name scope
+            assigns = [op for op in tf.get_default_graph().get_operations()
+                    if op.type == "Assign" and op.inputs[0].op == u.op and not op.name.startswith(u.op.name + "/")]
+            self.assertEqual(len(assigns), 1)
+            self.assertEqual(a.op.inputs[0].op.inputs[1], b.op.inputs[0].op.inputs[1])
+
+    def test_shared_spectral_norm_key(self):
+        with tf.Graph().as_default(), self.test_session():
+            with tf.variable_scope("layer", reuse=tf.AUTO_REUSE):
+                w1 = tf.get_variable("w1", [3, 3, 2, 2])
+                w2 = tf.get_variable("w2", [3, 3, 2, 2])
+                a = shared_spectral_normed_weight(w1)
+                self.assertIs(shared_spectral_normed_weight(w1), a)
+                self.assertIsNot(shared_spectral_normed_weight(w2), a)
+                looped = tf.while_loop(lambda i: i < 2, lambda i: i + tf.cast(tf.reduce_sum(shared_spectral_normed_weight(w1)) * 0, tf.int32) + 1, [tf.constant(0)])
+                self.assertIs(shared_spectral_normed_weight(w1), a)
+
     def test_shape(self):
         with self.test_session():
             self.assertEqual(ops.shape(tf.constant(1)), [])
@@ -0,0 +1,35 @@
+import os
+import tempfile
+import numpy as np
+import tensorflow as tf
+from hypergan.restore_planner import RestorePlanner, fit_to_shape
+
+class RestorePlannerTest(tf.test.TestCase):
+    def test_fit_to_shape(self):
+        saved = np.ones([2, 3])
+        current = np.zeros([3, 2])
+        self.assertAllEqual(fit_to_shape(saved, current), [[1, 1], [1, 1], [0, 0]])
+
+    def test_restore_mismatched(self):
+        save_file = os.path.join(tempfile.mkdtemp(), "model.ckpt")
+        with tf.Graph().as_default():
+            w = tf.Variable(tf.ones([2, 2]), name="w")
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                tf.train.Saver([w]).save(sess, save_file)
+
+        with tf.Graph().as_default() as graph:
+            w = tf.Variable(tf.zeros([3, 2]), name="w")
+            b = tf.Variable(tf.zeros([1]), name="b")
+            planner = RestorePlanner([w, b])
+            with tf.Session() as sess:
+                sess.run(tf.global_variables_initializer())
+                plan = planner.restore(sess, save_file)
+                op_count = len(graph.get_operations())
+                planner.restore(sess, save_file)
+                self.assertEqual(op_count, len(graph.get_operations()))
+                self.assertEqual(plan.missing, [b])
+                self.assertAllEqual(sess.run(w), [[1, 1], [1, 1], [0, 0]])
+
+if __name__ == "__main__":
+    tf.test.main()
@@ -0,0 +1,22 @@
+import tensorflow as tf
+import numpy as np
+
+from hypergan.samplers.gang_sampler import GangSampler
+from tests.mocks import mock_gang_gan
+
+class GangSamplerTest(tf.test.TestCase):
+    def test_sample_restores_generator(self):
+        with self.test_session():
+            gan = mock_gang_gan()
+            gan.step()
+            trainer = gan.trainer
+            before = gan.session.run(trainer.all_g_vars)
+            strategies = trainer.g_pool.memory_usage()["strategies"]
+            sampler = GangSampler(gan)
+            sampler.sample("/tmp/gang_sampler_test.png", False)
+            for a, b in zip(before, gan.session.run(trainer.all_g_vars)):
+                self.assertAllEqual(a, b)
+            self.assertEqual(trainer.g_pool.memory_usage()["strategies"], strategies)
+
+if __name__ == "__main__":
+    tf.test.main()
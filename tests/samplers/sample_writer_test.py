@@ -0,0 +1,27 @@
+import os
+import tempfile
+import numpy as np
+import tensorflow as tf
+
+from hypergan.samplers.sample_writer import SampleWriter, to_uint8
+
+class SampleWriterTest(tf.test.TestCase):
+    def test_to_uint8(self):
+        image = to_uint8(np.array([[[-2.], [0.], [1.]]]))
+        self.assertEqual(image.dtype, np.uint8)
+        self.assertAllEqual(image, [0, 128, 255])
+
+    def test_writes_in_background(self):
+        path = tempfile.mkdtemp()
+        writer = SampleWriter(max_queue=8)
+        image = np.random.uniform(-1, 1, [8, 8, 3])
+        for ext in ["png", "jpg", "webp"]:
+            self.assertTrue(writer.submit(None, image, os.path.join(path, "sample." + ext), True))
+        writer.flush()
+        for ext in ["png", "jpg", "webp"]:
+            self.assertTrue(os.path.isfile(os.path.join(path, "sample." + ext)))
+        self.assertEqual(writer.written, 3)
+        writer.close()
+
+if __name__ == "__main__":
+    tf.test.main()
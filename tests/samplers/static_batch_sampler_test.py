@@ -16,5 +16,24 @@ class StaticBatchSamplerTest(tf.test.TestCase):
             sampler = StaticBatchSampler(gan)
             self.assertEqual(sampler._sample()['generator'].shape[-1], 1)
 
+    def test_grid(self):
+        with self.test_session():
+            gan = mock_gan()
+            sampler = StaticBatchSampler(gan)
+            data = np.arange(6*2*3*1).reshape([6, 2, 3, 1])
+            grid = sampler.grid(data, 2, 3)
+            self.assertEqual(grid.shape, (4, 9, 1))
+            self.assertAllEqual(grid[2:4, 3:6], data[4])
+            self.assertIs(sampler.grid(data, 2, 3), grid)
+
+    def test_shared_latent_bank(self):
+        with self.test_session():
+            gan = mock_gan()
+            a = StaticBatchSampler(gan)
+            b = StaticBatchSampler(gan)
+            a._sample()
+            b._sample()
+            self.assertAllEqual(a.z, b.z)
+
 if __name__ == "__main__":
     tf.test.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import tensorflow as tf
+from hypergan.gan_component import ValidationException
+from hypergan.search.parallel_search import ParallelSearch, ResultsStore, train_trial
+from tests.mocks import MockInput, mock_config
+
+class FixedSearch:
+    def __init__(self):
+        self.count = 0
+    def random_config(self):
+        self.count += 1
+        return {"trial": self.count}
+
+class ParallelSearchTest(tf.test.TestCase):
+    def test_budgets(self):
+        store = ResultsStore(os.path.join(tempfile.mkdtemp(), "search.db"))
+        search = ParallelSearch(FixedSearch(), None, store, min_steps=100, max_steps=1000, eta=3)
+        self.assertEqual(search.budgets, [100, 300, 900, 1000])
+
+    def test_resume_and_promote(self):
+        path = os.path.join(tempfile.mkdtemp(), "search.db")
+        store = ResultsStore(path)
+        for score in [3.0, 1.0, 2.0]:
+            trial = store.add({"score": score})
+            trial.rung = 0
+            trial.score = score
+            store.update(trial)
+        store.close()
+
+        store = ResultsStore(path)
+        search = ParallelSearch(FixedSearch(), None, store, eta=2)
+        search.promote(0)
+        statuses = dict([(t.config["score"], t.status) for t in store.trials()])
+        self.assertEqual(statuses, {1.0: "active", 2.0: "active", 3.0: "stopped"})
+
+        search.promote(0)
+        statuses = dict([(t.config["score"], t.status) for t in store.trials()])
+        self.assertEqual(statuses, {1.0: "active", 2.0: "active", 3.0: "stopped"})
+
+        csv = os.path.join(tempfile.mkdtemp(), "search.csv")
+        store.export_csv(csv)
+        self.assertEqual(len(open(csv).readlines()), 4)
+
+    def test_resume_after_partial_rung(self):
+        path = os.path.join(tempfile.mkdtemp(), "search.db")
+        store = ResultsStore(path)
+        for score in range(9):
+            trial = store.add({"score": score})
+            trial.rung = 0
+            trial.score = float(score)
+            store.update(trial)
+        search = ParallelSearch(FixedSearch(), None, store, eta=3)
+        search.promote(0)
+        # two of the three promoted trials finish rung 1 before the search is interrupted
+        for t in store.trials():
+            if t.config["score"] in [0, 1]:
+                t.rung = 1
+                t.score = 10.0 - t.config["score"]
+                store.update(t)
+        store.close()
+
+        store = ResultsStore(path)
+        search = ParallelSearch(FixedSearch(), None, store, eta=3)
+        search.promote(0)
+        active = sorted([t.config["score"] for t in store.trials() if t.status == "active"])
+        self.assertEqual(active, [0, 1, 2])
+        self.assertEqual(store.promotion(0), ([1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3]))
+
+    def test_train_trial_unknown_metric(self):
+        save_file = os.path.join(tempfile.mkdtemp(), "model.ckpt")
+        with self.assertRaises(ValidationException):
+            train_trial(mock_config(), lambda config: MockInput(batch_size=1), save_file, 1, "not_a_metric", 1)
+
+    def test_train_trial(self):
+        save_file = os.path.join(tempfile.mkdtemp(), "model.ckpt")
+        config = mock_config()
+        config["trainer"] = dict(config["trainer"], metrics_every=1)
+        steps, score, seconds = train_trial(config, lambda config: MockInput(batch_size=1), save_file, 2, "g_loss", 2)
+        self.assertEqual(steps, 2)
+        self.assertTrue(score is not None)
+
+if __name__ == "__main__":
+    tf.test.main()
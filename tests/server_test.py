@@ -0,0 +1,83 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from hypergan.bulk_generator import to_pixels
+from hypergan.server import GANServer, encode_png, http_server, load_test
+import hypergan as hg
+from tests.mocks import mock_gan, mock_config, MockInput
+
+class GANServerTest(tf.test.TestCase):
+    def test_generate_batches_requests(self):
+        with self.test_session():
+            gan = mock_gan(batch_size=2)
+            server = GANServer(gan, max_wait=0.05)
+            results = [None, None]
+            def _generate(i):
+                results[i] = server.generate(seeds=[i])
+            threads = [threading.Thread(target=_generate, args=(i,)) for i in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results[0].shape, (1, 32, 32, 1))
+            self.assertAllClose(server.generate(seeds=[1])[0], results[1][0])
+            self.assertEqual(server.generate(z=np.zeros([3, 128])).shape[0], 3)
+            self.assertEqual(server.report()["images"], 6)
+            server.close()
+
+    def test_inference_gan(self):
+        with self.test_session():
+            gan = hg.GAN(config=mock_config(), inputs=MockInput(batch_size=2), inference=True)
+            self.assertEqual(gan.discriminator, None)
+            self.assertEqual(gan.trainer, None)
+            server = GANServer(gan)
+            self.assertEqual(server.generate(seeds=[1, 2]).shape, (2, 32, 32, 1))
+            server.close()
+
+    def test_http(self):
+        with self.test_session():
+            gan = mock_gan(batch_size=2)
+            server = GANServer(gan)
+            httpd = http_server(server, port=0)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            report = load_test("http://%s:%d" % httpd.server_address[:2], requests=4, concurrency=2)
+            httpd.shutdown()
+            httpd.server_close()
+            server.close()
+            self.assertEqual(report["requests"], 4)
+            self.assertEqual(report["errors"], 0)
+
+    def test_encode_png(self):
+        image = np.linspace(-1, 1, 4*4*3).reshape([4, 4, 3])
+        decoded = np.array(Image.open(io.BytesIO(encode_png(image))))
+        self.assertAllEqual(decoded, to_pixels(image))
+        constant = np.array(Image.open(io.BytesIO(encode_png(np.zeros([4, 4, 1])))))
+        self.assertAllEqual(constant, np.full([4, 4], 128))
+
+    def test_http_generate_error(self):
+        with self.test_session():
+            gan = mock_gan(batch_size=2)
+            server = GANServer(gan)
+            def _fail(z):
+                raise RuntimeError("generator failed")
+            server.generate_batch = _fail
+            httpd = http_server(server, port=0)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            request = urllib.request.Request("http://%s:%d/generate" % httpd.server_address[:2], data=json.dumps({"seeds": [1]}).encode("utf-8"))
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request)
+            httpd.shutdown()
+            httpd.server_close()
+            server.close()
+            self.assertEqual(context.exception.code, 500)
+            self.assertIn("generator failed", json.loads(context.exception.read().decode("utf-8"))["error"])
+            self.assertEqual(server.report()["images"], 0)
+
+if __name__ == "__main__":
+    tf.test.main()
@@ -0,0 +1,95 @@
+import numpy as np
+import tensorflow as tf
+
+from hypergan.train_hooks.weight_constraint_train_hook import WeightConstraintTrainHook
+from tests.mocks import mock_gan
+
+DECAY = 0.5
+K = 0.5
+
+# the per-variable formulas the hook applied before its updates were fused
+def ortho(v, iterations=3):
+    s = v.shape
+    w = np.transpose(v, [2,3,0,1])
+    eye = np.reshape(np.tile(np.eye(s[0], s[1]), [1, s[2]*s[3]]), w.shape)
+    for i in range(iterations):
+        wt = np.transpose(w, [1,0,2,3])
+        wtw = np.matmul(np.reshape(wt, [-1, s[0], s[1]]), np.reshape(w, [-1, s[0], s[1]]))
+        w = w * (eye + 0.5*(eye - np.reshape(wtw, w.shape)))
+    return (1.0+DECAY)*v - DECAY*np.transpose(w, [2,3,0,1])
+
+def lipschitz(v):
+    fij = v
+    if len(v.shape) == 4:
+        fij = np.max(np.sum(np.abs(v), axis=1), axis=0)
+    wp = np.max(np.sum(np.abs(fij), axis=1), axis=0)
+    return v / max(1.0, wp/K)
+
+def l2nn(v):
+    s = v.shape
+    w2 = np.reshape(v, [-1, s[0], s[1]])
+    wt2 = np.reshape(np.transpose(v, [1,0,2,3]), [-1, s[0], s[1]])
+    def _r(m):
+        return np.max(np.sum(np.abs(np.reshape(m, [-1, s[-1]])), axis=0))
+    bw = min(_r(np.matmul(wt2, w2)), _r(np.matmul(w2, wt2)))
+    return (1-DECAY)*v + DECAY*(v/bw)
+
+class WeightConstraintTrainHookTest(tf.test.TestCase):
+    def setup_gan(self):
+        gan = mock_gan()
+        with tf.variable_scope("constrained"):
+            # a and b share a shape and are fused, c is constrained on its own
+            weights = [tf.get_variable(name, shape, initializer=tf.random_normal_initializer(0, 0.1))
+                    for name, shape in [("a", [3,3,2,2]), ("b", [3,3,2,2]), ("c", [2,2,3,3])]]
+        gan.discriminator.ops.weights += weights
+        gan.session.run(tf.variables_initializer(weights))
+        return gan, weights
+
+    def create_hook(self, gan, constraint_every):
+        hook = WeightConstraintTrainHook(gan=gan, trainer=gan.trainer, config={
+            "constraints": ["ortho", "lipschitz", "l2nn"],
+            "constraint_every": constraint_every,
+            "decay": DECAY,
+            "weight_constraint_k": K
+        })
+        hook.after_create()
+        return hook
+
+    def test_fused_matches_per_variable(self):
+        with self.test_session():
+            gan, weights = self.setup_gan()
+            hook = self.create_hook(gan, 1)
+            d_weight = gan.discriminator.ops.weights[0]
+            slots = [v for v in gan.variables() if gan.variable_roles().role(v) == "other" and len(v.shape) > 1]
+            self.assertNotEqual(slots, [])
+
+            before = gan.session.run(weights + [d_weight] + slots)
+            hook.before_step(0, {})
+            after = gan.session.run(weights + [d_weight] + slots)
+
+            for v, expected in zip(after[:3], before[:3]):
+                self.assertAllClose(v, l2nn(lipschitz(ortho(expected))), rtol=1e-4, atol=1e-6)
+            # only lipschitz applies to 2d weights
+            self.assertAllClose(after[3], lipschitz(before[3]), rtol=1e-4, atol=1e-6)
+            for slot, expected in zip(after[4:], before[4:]):
+                self.assertAllEqual(slot, expected)
+
+    def test_constraint_every_dict(self):
+        with self.test_session():
+            gan, weights = self.setup_gan()
+            hook = self.create_hook(gan, {"lipschitz": 1, "ortho": 3, "default": 2})
+            self.assertEqual(sorted(hook.update_weight_constraints.keys()), [1, 2, 3])
+
+            before = gan.session.run(weights)
+            hook.before_step(1, {})
+            after = gan.session.run(weights)
+            for v, expected in zip(after, before):
+                self.assertAllClose(v, lipschitz(expected), rtol=1e-4, atol=1e-6)
+
+            hook.before_step(3, {})
+            after_ortho = gan.session.run(weights)
+            for v, expected in zip(after_ortho, after):
+                self.assertAllClose(v, lipschitz(ortho(expected)), rtol=1e-4, atol=1e-6)
+
+if __name__ == "__main__":
+    tf.test.main()
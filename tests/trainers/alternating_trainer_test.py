@@ -5,11 +5,12 @@ import numpy as np
 from hypergan.discriminators.pyramid_discriminator import PyramidDiscriminator
 from hypergan.gan_component import ValidationException
 from hypergan.ops import TensorflowOps
-from tests.mocks import MockDiscriminator, mock_gan
+from tests.mocks import MockDiscriminator, mock_gan, mock_config
 
 from unittest.mock import MagicMock
 
 from hypergan.trainers.alternating_trainer import AlternatingTrainer
+from hypergan.trainers.metrics_reporter import HistoryMetricsReporter
 
 class AlternatingTrainerTest(tf.test.TestCase):
     def test_config(self):
@@ -40,5 +41,73 @@ class AlternatingTrainerTest(tf.test.TestCase):
             self.assertTrue('d_loss' in trainer.output_string({'d_loss':c}))
             self.assertTrue('g_loss' in trainer.output_string({'g_loss':c}))
             self.assertEqual(len(trainer.output_variables({'a': c, 'b': c})), 2)
+
+    def test_metrics_every(self):
+        with self.test_session():
+            gan = mock_gan()
+            config = {'d_learn_rate': 1e-3, 'g_learn_rate': 1e-3, 'metrics_every': 5}
+            trainer = AlternatingTrainer(gan, config)
+            self.assertEqual(trainer.metrics_every(), 5)
+            self.assertTrue(trainer.should_fetch_metrics())
+            trainer.current_step = 3
+            self.assertFalse(trainer.should_fetch_metrics())
+
+    def test_report_metrics(self):
+        with self.test_session():
+            gan = mock_gan()
+            config = {'d_learn_rate': 1e-3, 'g_learn_rate': 1e-3, 'metrics_reporter': HistoryMetricsReporter}
+            trainer = AlternatingTrainer(gan, config)
+            c = tf.constant(1)
+            trainer.report_metrics({'b': c, 'a': c}, [1.0, 2.0])
+            self.assertEqual(trainer.last_metrics, {'a': 1.0, 'b': 2.0})
+            self.assertEqual(trainer.metrics_reporter.history, [(0, {'a': 1.0, 'b': 2.0})])
+
+    def test_run_callable_list_fetches(self):
+        with self.test_session():
+            gan = mock_gan()
+            trainer = gan.trainer
+            a = tf.constant(1.)
+            b = tf.constant(2.)
+            self.assertEqual(trainer.run_callable([a, b], {}), [1., 2.])
+            self.assertEqual(trainer.run_callable([a, b], {}), [1., 2.])
+            self.assertEqual(len(trainer._callables), 1)
+
+    def test_fused_step(self):
+        with self.test_session():
+            config = mock_config()
+            config["trainer"] = dict(config["trainer"], fused=True, d_update_steps=2)
+            gan = mock_gan(config=config)
+            trainer = gan.trainer
+            sess = gan.session
+            feed_dict = {gan.latent.sample: np.random.uniform(-1, 1, gan.ops.shape(gan.latent.sample))}
+            variables = tf.global_variables()
+            start = sess.run(variables)
+            trained = gan.trainable_d_vars() + gan.trainable_g_vars()
+
+            sess.run(trainer.fused_step_t, feed_dict)
+            fused = sess.run(trained)
+
+            for v, value in zip(variables, start):
+                v.load(value, sess)
+            sess.run(trainer.d_optimizer_t, feed_dict)
+            sess.run(trainer.d_optimizer_t, feed_dict)
+            sess.run(trainer.g_optimizer_t, feed_dict)
+            for a, b in zip(fused, sess.run(trained)):
+                self.assertAllClose(a, b, rtol=1e-5, atol=1e-6)
+
+    def test_loss_scale_delegation(self):
+        with self.test_session():
+            gan = mock_gan()
+            trainer = gan.trainer
+            trainer.reject_loss_scale()
+            trainer.config.loss_scale = 128
+            with self.assertRaises(ValidationException):
+                trainer.reject_loss_scale()
+            gan.create_component = MagicMock()
+            trainer.create_delegate({'class': 'function:hypergan.trainers.alternating_trainer.AlternatingTrainer'})
+            self.assertEqual(gan.create_component.call_args[0][0]['loss_scale'], 128)
+            trainer.create_delegate({'class': 'function:hypergan.trainers.alternating_trainer.AlternatingTrainer', 'loss_scale': 8})
+            self.assertEqual(gan.create_component.call_args[0][0]['loss_scale'], 8)
+
 if __name__ == "__main__":
     tf.test.main()
@@ -0,0 +1,39 @@
+import tensorflow as tf
+import numpy as np
+
+from tests.mocks import mock_gang_gan
+
+class GangTrainerTest(tf.test.TestCase):
+    def test_degenerate_games_keep_memory_size(self):
+        with self.test_session():
+            gan = mock_gang_gan()
+            gan.step()
+            trainer = gan.trainer
+            trainer.payoff_matrix = lambda sgs, sds, xs, zs, method=None: np.zeros([len(sgs), len(sds)])
+            session = gan.session
+            for i in range(trainer.g_pool.slots + 2):
+                trainer.nash_memory(trainer.g_pool.snapshot(session), trainer.d_pool.snapshot(session), trainer.ug, trainer.ud)
+                self.assertLessEqual(len(trainer.sgs), 2)
+                self.assertLessEqual(len(trainer.sds), 2)
+            self.assertEqual(trainer.g_pool.memory_usage()["strategies"], len(trainer.sgs) + 1)
+    def test_parallel_speedup(self):
+        with self.test_session():
+            gan = mock_gang_gan()
+            trainer = gan.trainer
+            trainer.config["parallel_workers"] = 1
+            session = gan.session
+            sgs = [trainer.g_pool.snapshot(session)]
+            sds = [trainer.d_pool.snapshot(session)]
+            live = session.run(trainer.all_g_vars)
+            try:
+                for i in range(2):
+                    parallel = trainer.payoff_matrices(sgs, sds, [trainer.gang_loss])
+                self.assertEqual(trainer.parallel_evaluator.workers, 1)
+                self.assertGreater(trainer.last_speedup, 0)
+                for a, b in zip(live, session.run(trainer.all_g_vars)):
+                    self.assertAllEqual(a, b)
+            finally:
+                trainer.close()
+
+if __name__ == "__main__":
+    tf.test.main()
@@ -0,0 +1,30 @@
+import numpy as np
+import tensorflow as tf
+from hypergan.gan_component import ValidationException
+from hypergan.trainers import nash_solver
+
+rock_paper_scissors = np.array([[0, -1, 1], [1, 0, -1], [-1, 1, 0]], dtype=np.float64)
+
+class NashSolverTest(tf.test.TestCase):
+    def test_regret_matching(self):
+        x, y = nash_solver.solve("regret_matching", rock_paper_scissors, -rock_paper_scissors, iterations=5000)
+        self.assertAllClose(x, np.ones([3])/3, atol=1e-2)
+        self.assertAllClose(y, np.ones([3])/3, atol=1e-2)
+
+    def test_fictitious_play(self):
+        x, y = nash_solver.solve("fictitious_play", rock_paper_scissors, -rock_paper_scissors, iterations=5000)
+        self.assertLess(nash_solver.exploitability(rock_paper_scissors, -rock_paper_scissors, x, y), 0.1)
+
+    def test_warm_start(self):
+        a = np.random.randn(60, 60)
+        x, y = nash_solver.regret_matching(a, -a, iterations=200)
+        x2, y2 = nash_solver.regret_matching(a, -a, iterations=1, check_every=1, warm_start=[x, y])
+        self.assertEqual(x2.shape, (60,))
+        self.assertAllClose(np.sum(x2), 1.0)
+
+    def test_unknown(self):
+        with self.assertRaises(ValidationException):
+            nash_solver.solve("simplex", rock_paper_scissors, -rock_paper_scissors)
+
+if __name__ == "__main__":
+    tf.test.main()
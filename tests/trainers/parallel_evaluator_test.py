@@ -0,0 +1,35 @@
+import numpy as np
+import tensorflow as tf
+from hypergan.trainers.parallel_evaluator import ParallelEvaluator
+
+class ParallelEvaluatorTest(tf.test.TestCase):
+    def test_evaluate(self):
+        graph = tf.Graph()
+        with graph.as_default():
+            w = tf.Variable(tf.zeros([2]))
+            x = tf.placeholder(tf.float32, [2])
+            score = tf.reduce_sum(w * x)
+            evaluator = ParallelEvaluator(graph, [[w]], [score, -score], [x], workers=2)
+            try:
+                candidates = [[np.array([1., 1.])], [np.array([2., 0.])], [np.array([0., 3.])]]
+                batch = [[np.array([1., 2.])], [np.array([3., 4.])]]
+                scores = evaluator.evaluate([candidates], batch)
+                self.assertAllClose(scores, [[5., -5.], [4., -4.], [9., -9.]])
+                self.assertGreater(evaluator.last_utilization, 0)
+            finally:
+                evaluator.close()
+
+    def test_evaluate_pairs(self):
+        graph = tf.Graph()
+        with graph.as_default():
+            a = tf.Variable(tf.zeros([]))
+            b = tf.Variable(tf.zeros([]))
+            x = tf.placeholder(tf.float32, [])
+            score = a * x - b
+            evaluator = ParallelEvaluator(graph, [[a], [b]], [score], [x], workers=2)
+            try:
+                scores = evaluator.evaluate([[[1.], [2.], [3.]], [[0.], [10.]]], [[2.]])
+                self.assertEqual(scores.shape, (3, 2, 1))
+                self.assertAllClose(scores[:, :, 0], [[2., -8.], [4., -6.], [6., -4.]])
+            finally:
+                evaluator.close()
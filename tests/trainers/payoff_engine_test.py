@@ -0,0 +1,40 @@
+import tensorflow as tf
+import numpy as np
+
+from tests.mocks import mock_gang_gan
+
+class PayoffEngineTest(tf.test.TestCase):
+    def test_matches_per_test_point(self):
+        with self.test_session():
+            gan = mock_gang_gan()
+            trainer = gan.trainer
+            engine = trainer.payoff_engine
+            session = gan.session
+            sgs = [trainer.g_pool.snapshot(session)]
+            sds = [trainer.d_pool.snapshot(session)]
+            session.run([v.assign(v * 0.5) for v in trainer.all_g_vars + trainer.all_d_vars])
+            sgs.append(trainer.g_pool.snapshot(session))
+            sds.append(trainer.d_pool.snapshot(session))
+
+            batch = engine.evaluation_batch()
+            engine.evaluation_batch = lambda: batch
+            methods = [trainer.gang_loss, gan.loss.d_fake]
+            results = engine.payoff_matrices(sgs, sds, methods)
+
+            inputs = [engine.x] + engine.latent
+            for i, sg in enumerate(sgs):
+                trainer.g_pool.load(session, sg)
+                samples = [session.run(engine.sample, dict(zip(inputs, point))) for point in batch]
+                for j, sd in enumerate(sds):
+                    trainer.d_pool.load(session, sd)
+                    expected = np.zeros([len(methods)])
+                    for point, sample in zip(batch, samples):
+                        feed_dict = dict(zip(inputs, point))
+                        feed_dict[engine.sample] = sample
+                        expected += [np.average(v) for v in session.run(methods, feed_dict)]
+                    expected /= float(len(batch))
+                    for result, value in zip(results, expected):
+                        self.assertAllClose(result[i, j], value, rtol=1e-5)
+
+if __name__ == "__main__":
+    tf.test.main()
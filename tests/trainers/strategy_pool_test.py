@@ -0,0 +1,49 @@
+import numpy as np
+import tensorflow as tf
+from hypergan.gan_component import ValidationException
+from hypergan.trainers.strategy_pool import StrategyPool
+
+class StrategyPoolTest(tf.test.TestCase):
+    def test_snapshot_and_load(self):
+        with self.test_session() as sess:
+            v = tf.Variable(tf.ones([2, 3]))
+            pool = StrategyPool([v], 4)
+            sess.run(tf.global_variables_initializer())
+            strategy = pool.snapshot(sess)
+            sess.run(v.assign(tf.zeros([2, 3])))
+            pool.load(sess, strategy)
+            self.assertAllEqual(sess.run(v), np.ones([2, 3]))
+            self.assertNotIn(pool.stacks[0], tf.global_variables())
+
+    def test_mix(self):
+        with self.test_session() as sess:
+            v = tf.Variable(tf.zeros([2]))
+            pool = StrategyPool([v], 2)
+            sess.run(tf.global_variables_initializer())
+            a = pool.upload(sess, [np.array([1., 1.])])
+            b = pool.upload(sess, [np.array([3., 5.])])
+            pool.mix(sess, [a, b], [0.5, 0.5])
+            self.assertAllClose(sess.run(v), [2., 3.])
+
+    def test_spill(self):
+        with self.test_session() as sess:
+            v = tf.Variable(tf.zeros([2]))
+            pool = StrategyPool([v], 1, spill=True)
+            sess.run(tf.global_variables_initializer())
+            a = pool.upload(sess, [np.array([1., 2.])])
+            b = pool.upload(sess, [np.array([3., 4.])])
+            self.assertEqual(pool.memory_usage()["spilled"], 1)
+            pool.load(sess, a)
+            self.assertAllEqual(sess.run(v), [1., 2.])
+
+    def test_full(self):
+        with self.test_session() as sess:
+            v = tf.Variable(tf.zeros([2]))
+            pool = StrategyPool([v], 1)
+            sess.run(tf.global_variables_initializer())
+            pool.snapshot(sess)
+            with self.assertRaises(ValidationException):
+                pool.snapshot(sess)
+
+if __name__ == "__main__":
+    tf.test.main()
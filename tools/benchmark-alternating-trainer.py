@@ -0,0 +1,72 @@
+import argparse
+import time
+import hyperchamber as hc
+import hypergan as hg
+import tensorflow as tf
+
+parser = argparse.ArgumentParser(description='Compares AlternatingTrainer steps/sec with and without `fused: true`')
+
+parser.add_argument('--steps', type=int, default=500)
+parser.add_argument('--warmup', type=int, default=20)
+parser.add_argument('--batch_size', '-b', type=int, default=32)
+parser.add_argument('--d_update_steps', type=int, default=1)
+parser.add_argument('--device', type=str, default="/cpu:0")
+
+args = parser.parse_args()
+
+class RandomInput:
+    def __init__(self, batch_size):
+        self.x = tf.random_uniform([batch_size, 32, 32, 1], -1, 1)
+        self.sample = [self.x]
+
+def config(fused):
+    return hc.Config({
+        "latent": {
+            "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
+            "max": 1,
+            "min": -1,
+            "z": 128
+        },
+        "generator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "defaults": {"activation": "tanh", "initializer": "he_normal"},
+            "layers": ["linear 32*32*1 activation=null"]
+        },
+        "discriminator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "defaults": {"activation": "tanh", "initializer": "he_normal"},
+            "layers": ["linear 64", "linear 1 activation=null"]
+        },
+        "loss": {
+            "class": "function:hypergan.losses.standard_loss.StandardLoss",
+            "reduce": "reduce_mean"
+        },
+        "trainer": {
+            "class": "function:hypergan.trainers.alternating_trainer.AlternatingTrainer",
+            "d_update_steps": args.d_update_steps,
+            "fused": fused,
+            "metrics_every": 0,
+            "optimizer": {
+                "class": "function:tensorflow.python.training.adam.AdamOptimizer",
+                "learn_rate": 1e-4
+            }
+        }
+    })
+
+def steps_per_second(fused):
+    with tf.Graph().as_default():
+        gan = hg.GAN(config=config(fused), inputs=RandomInput(args.batch_size), device=args.device)
+        for i in range(args.warmup):
+            gan.step()
+        start = time.time()
+        for i in range(args.steps):
+            gan.step()
+        elapsed = time.time() - start
+        gan.session.close()
+    return args.steps / elapsed
+
+unfused = steps_per_second(False)
+fused = steps_per_second(True)
+print("[benchmark] d_update_steps=%d batch_size=%d" % (args.d_update_steps, args.batch_size))
+print("[benchmark] alternating  %.1f steps/sec" % unfused)
+print("[benchmark] fused        %.1f steps/sec (%.2fx)" % (fused, fused / unfused))
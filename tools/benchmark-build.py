@@ -0,0 +1,41 @@
+import argparse
+import time
+import hypergan as hg
+import tensorflow as tf
+
+parser = argparse.ArgumentParser(description='Times graph construction for hypergan configurations')
+
+parser.add_argument('configs', nargs='*', help='Configuration names.  Defaults to every shipped configuration.')
+parser.add_argument('--size', '-s', type=str, default='64x64x3', help='Input size as widthxheightxchannels.')
+parser.add_argument('--batch_size', '-b', type=int, default=1)
+parser.add_argument('--device', type=str, default="/cpu:0")
+
+args = parser.parse_args()
+width, height, channels = [int(x) for x in args.size.split("x")]
+
+class RandomInput:
+    def __init__(self, batch_size):
+        self.x = tf.random_uniform([batch_size, height, width, channels], -1, 1)
+        self.sample = [self.x]
+
+def build_seconds(name):
+    config = hg.Configuration.load(name + ".json", verbose=False)
+    with tf.Graph().as_default() as graph:
+        start = time.time()
+        gan = hg.GAN(config=config, inputs=RandomInput(args.batch_size), device=args.device)
+        elapsed = time.time() - start
+        ops = len(graph.get_operations())
+        variables = len(gan.variables())
+        gan.session.close()
+    return elapsed, ops, variables
+
+results = []
+for name in args.configs or hg.Configuration.list():
+    try:
+        results.append([name] + list(build_seconds(name)))
+    except Exception as e:
+        print("[benchmark] Skipping", name, type(e).__name__, e)
+
+print("[benchmark] size=%s batch_size=%d" % (args.size, args.batch_size))
+for name, elapsed, ops, variables in sorted(results, key=lambda r: -r[1]):
+    print("[benchmark] %-32s %7.2fs %7d ops %5d variables" % (name, elapsed, ops, variables))